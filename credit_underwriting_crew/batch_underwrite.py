@@ -0,0 +1,182 @@
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from credit_crew import build_credit_crew, extract_initial_credit_score
+from credit_signals import compute_signals
+from metrics_store import seller_key
+from polars_backend import BACKENDS, polars_summary
+from prompt_budget import DEFAULT_HORIZON_MONTHS, compact_markdown, compact_summary, prompt_tokens
+from summary_json import dumps_summary, escape_curly_braces
+from summary_metrics import read_csv_chunks, summarize_chunks
+from task_graph import TaskGraphRunner
+
+LEDGER_FILENAME = 'ledger.jsonl'
+REPORTS_DIRNAME = 'reports'
+
+_ledger_lock = threading.Lock()
+
+
+# Manifest rows: company, csv, base_report (relative paths resolve against the manifest's directory)
+def read_manifest(path):
+    base_dir = os.path.dirname(os.path.abspath(path))
+    entries = []
+    with open(path, newline='') as file:
+        for row in csv.DictReader(file):
+            entries.append({
+                'company': row['company'].strip(),
+                'csv': os.path.join(base_dir, row['csv'].strip()),
+                'base_report': os.path.join(base_dir, row['base_report'].strip()),
+            })
+    return entries
+
+
+# Runs in a worker process: stream the export and return the serialised summary
+def summarize_export(csv_path, backend='pandas'):
+    start = time.perf_counter()
+    if backend == 'polars':
+        summary = polars_summary(csv_path)
+    else:
+        summary = summarize_chunks(read_csv_chunks(csv_path))
+    return dumps_summary(summary, indent=4), time.perf_counter() - start
+
+
+def load_completed(out_dir):
+    completed = set()
+    path = os.path.join(out_dir, LEDGER_FILENAME)
+    if not os.path.exists(path):
+        return completed
+    with open(path) as file:
+        for line in file:
+            record = json.loads(line)
+            if record['status'] == 'ok':
+                completed.add(record['seller'])
+    return completed
+
+
+def append_ledger(out_dir, record):
+    with _ledger_lock:
+        with open(os.path.join(out_dir, LEDGER_FILENAME), 'a') as file:
+            file.write(json.dumps(record) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+
+def underwrite(entry, data_summary_str, deterministic=False, horizon_months=None, parallel_tasks=False):
+    """Run the crew for one seller and return the updated report and its prompt token count.
+
+    ``horizon_months`` switches to compact prompts showing that many months of
+    history; ``parallel_tasks`` runs independent tasks concurrently.
+    """
+    with open(entry['base_report']) as file:
+        before_report = file.read()
+    initial_credit_score, initial_rating = extract_initial_credit_score(before_report)
+    if initial_credit_score is None:
+        raise ValueError('Could not extract the initial credit score from the report.')
+
+    inputs = {
+        "company_name": entry['company'],
+        "data_summary": json.loads(data_summary_str),
+        "before_report": before_report,
+        "initial_credit_score": initial_credit_score,
+        "initial_rating": initial_rating
+    }
+    prompt_summary = data_summary_str
+    if horizon_months:
+        prompt_summary = compact_summary(inputs['data_summary'], horizon_months=horizon_months)
+        inputs['before_report'] = compact_markdown(before_report)
+
+    signals = compute_signals(inputs['data_summary']) if deterministic else None
+    # Each crew gets its own copies of the agents so concurrent runs share no state
+    crew = build_credit_crew(inputs, escape_curly_braces(prompt_summary), signals=signals).copy()
+    tokens = sum(row['total_tokens'] for row in prompt_tokens(crew))
+    runner = TaskGraphRunner(crew) if parallel_tasks else crew
+    return str(runner.kickoff(inputs=inputs)), tokens
+
+
+def run_batch(manifest_path, out_dir, preprocess_workers=None, crew_workers=4, resume=True, deterministic=False,
+              horizon_months=None, parallel_tasks=False, backend='pandas'):
+    """Underwrite every seller in the manifest and return the ledger records of this run.
+
+    Exports are summarised on a process pool; each finished summary is handed
+    to a thread pool that runs at most ``crew_workers`` crews at once. Every
+    outcome is appended to the ledger as it happens, and with ``resume`` the
+    sellers already recorded as ``ok`` are skipped. ``deterministic`` swaps the
+    analyst and QA LLM tasks for the Python signal stage, ``horizon_months``
+    enables compact prompts and ``parallel_tasks`` runs each crew as a task graph.
+    ``backend`` selects the engine that summarises the exports.
+    """
+    os.makedirs(os.path.join(out_dir, REPORTS_DIRNAME), exist_ok=True)
+    completed = load_completed(out_dir) if resume else set()
+    entries = [entry for entry in read_manifest(manifest_path) if seller_key(entry['company']) not in completed]
+    records = []
+
+    def finish(record):
+        record['finished_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        append_ledger(out_dir, record)
+        records.append(record)
+        print(f"[{len(records)}/{len(entries)}] {record['company']}: {record['status']}")
+
+    def run_crew(entry, data_summary_str, preprocess_seconds):
+        key = seller_key(entry['company'])
+        record = {'seller': key, 'company': entry['company'], 'preprocess_seconds': round(preprocess_seconds, 3)}
+        start = time.perf_counter()
+        try:
+            report, record['prompt_tokens'] = underwrite(entry, data_summary_str, deterministic, horizon_months,
+                                                          parallel_tasks)
+            report_path = os.path.join(out_dir, REPORTS_DIRNAME, key + '.md')
+            with open(report_path, 'w') as file:
+                file.write(report)
+            record.update(status='ok', report=report_path)
+        except Exception as e:
+            record.update(status='error', stage='crew', error=str(e))
+        record['crew_seconds'] = round(time.perf_counter() - start, 3)
+        finish(record)
+
+    with ProcessPoolExecutor(max_workers=preprocess_workers) as process_pool, \
+            ThreadPoolExecutor(max_workers=crew_workers) as crew_pool:
+        futures = {process_pool.submit(summarize_export, entry['csv'], backend): entry for entry in entries}
+        crew_futures = []
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                data_summary_str, preprocess_seconds = future.result()
+            except Exception as e:
+                finish({'seller': seller_key(entry['company']), 'company': entry['company'],
+                        'status': 'error', 'stage': 'preprocess', 'error': str(e)})
+                continue
+            crew_futures.append(crew_pool.submit(run_crew, entry, data_summary_str, preprocess_seconds))
+        for future in crew_futures:
+            future.result()
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-underwrite a portfolio of sellers without the Streamlit UI')
+    parser.add_argument('manifest', help='CSV with company, csv and base_report columns')
+    parser.add_argument('--out-dir', default='batch_output')
+    parser.add_argument('--preprocess-workers', type=int, default=None, help='Processes for summarising exports (default: CPU count)')
+    parser.add_argument('--crew-workers', type=int, default=4, help='Crews running concurrently')
+    parser.add_argument('--no-resume', action='store_true', help='Re-run sellers already completed in the ledger')
+    parser.add_argument('--deterministic-signals', action='store_true', help='Replace the LLM analyst and QA tasks with Python signals')
+    parser.add_argument('--compact-prompts', action='store_true', help='Send a tabular, windowed summary to the agents')
+    parser.add_argument('--horizon-months', type=int, default=DEFAULT_HORIZON_MONTHS, help='Months of history in compact prompts')
+    parser.add_argument('--backend', choices=BACKENDS, default='pandas', help='Engine for summarising exports')
+    parser.add_argument('--parallel-tasks', action='store_true', help='Run independent crew tasks concurrently')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    records = run_batch(args.manifest, args.out_dir, args.preprocess_workers, args.crew_workers,
+                        resume=not args.no_resume, deterministic=args.deterministic_signals,
+                        horizon_months=args.horizon_months if args.compact_prompts else None,
+                        parallel_tasks=args.parallel_tasks, backend=args.backend)
+    failed = sum(record['status'] != 'ok' for record in records)
+    print(f'Processed {len(records)} sellers ({failed} failed) in {time.perf_counter() - start:.1f} seconds')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import resource
+import threading
+import time
+
+import pandas as pd
+
+from bench_preprocess import summaries_match
+from polars_backend import BACKENDS, polars_summary
+from summary_json import dumps_summary
+from summary_metrics import DEFAULT_CHUNKSIZE, SummaryAggregates, prepare_frame, read_csv_chunks
+from synthetic_data import write_export_csv
+
+# Synthetic exports are written here once per size and seed, then reused
+DATA_DIR = 'bench_data'
+
+# Golden summaries the pipeline output is checked against
+GOLDEN_DIR = 'bench_golden'
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000, 50_000_000]
+
+# Above this many rows the export is streamed in chunks, as the app does for large uploads
+STREAMING_THRESHOLD_ROWS = 5_000_000
+
+# Seconds between resident memory samples
+RSS_SAMPLE_INTERVAL = 0.01
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # No /proc (e.g. macOS): fall back to the process-wide peak, in bytes there
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class PeakRSS:
+    """Samples resident memory on a background thread while the block runs."""
+
+    def __enter__(self):
+        self.peak = _rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+
+class StageTimer:
+    # Accumulates time and peak RSS per stage; a stage may run once per chunk
+    def __init__(self):
+        self.seconds = {}
+        self.peak_rss = {}
+
+    def run(self, stage, func, *args):
+        with PeakRSS() as rss:
+            start = time.perf_counter()
+            result = func(*args)
+            elapsed = time.perf_counter() - start
+        self.seconds[stage] = self.seconds.get(stage, 0) + elapsed
+        self.peak_rss[stage] = max(self.peak_rss.get(stage, 0), rss.peak)
+        return result
+
+
+def export_path(rows, seed, data_dir=DATA_DIR):
+    path = os.path.join(data_dir, f'export_{rows}_seed{seed}.csv')
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f'Generating {rows:,} synthetic order rows into {path}...')
+        write_export_csv(path, rows, seed=seed)
+    return path
+
+
+def golden_path(rows, seed, golden_dir=GOLDEN_DIR):
+    return os.path.join(golden_dir, f'summary_{rows}_seed{seed}.json')
+
+
+def benchmark_size(path, rows, chunksize=DEFAULT_CHUNKSIZE, backend='pandas'):
+    """Run the preprocessing pipeline over one export, timing every stage and metric group.
+
+    Exports up to ``STREAMING_THRESHOLD_ROWS`` are loaded whole, larger ones
+    streamed in ``chunksize`` chunks. The metric groups are timed on separate
+    aggregates fed the same prepared frames, so they do not affect the summary.
+    The polars backend runs as a single stage, since its query plan fuses them.
+    """
+    stages = StageTimer()
+    groups = StageTimer()
+    if backend == 'polars':
+        summary = stages.run('polars', polars_summary, path)
+        stages.run('serialise', dumps_summary, summary)
+        return stages, groups, summary
+
+    aggregates = SummaryAggregates()
+    group_aggregates = SummaryAggregates()
+
+    if rows > STREAMING_THRESHOLD_ROWS:
+        chunks = stages.run('read_csv', read_csv_chunks, path, chunksize)
+    else:
+        chunks = [stages.run('read_csv', pd.read_csv, path)]
+    chunk_iter = iter(chunks)
+    while True:
+        chunk = stages.run('read_csv', next, chunk_iter, None)
+        if chunk is None:
+            break
+        df = stages.run('prepare', prepare_frame, chunk)
+        stages.run('aggregate', aggregates.update, df)
+        is_return = groups.run('totals', group_aggregates.update_totals, df)
+        groups.run('skus', group_aggregates.update_skus, df)
+        groups.run('categories', group_aggregates.update_categories, df)
+        groups.run('months', group_aggregates.update_months, df, is_return)
+        del chunk, df
+
+    summary = stages.run('summarize', aggregates.to_summary)
+    stages.run('serialise', dumps_summary, summary)
+    return stages, groups, summary
+
+
+def _rows(kind, timer, rows):
+    return [
+        {
+            'kind': kind,
+            'name': name,
+            'seconds': round(seconds, 4),
+            'rows_per_second': round(rows / seconds) if seconds > 0 else None,
+            'peak_rss_mb': round(timer.peak_rss[name] / 2**20, 1),
+        }
+        for name, seconds in timer.seconds.items()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the preprocessing pipeline over synthetic exports')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Export sizes in rows')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--backend', choices=BACKENDS, default='pandas', help='Engine computing the summary')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--update-golden', action='store_true', help='Write the summaries as the new golden files')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = []
+    regressions = 0
+    for rows in args.sizes:
+        path = export_path(rows, args.seed, args.data_dir)
+        stages, groups, summary = benchmark_size(path, rows, args.chunksize, args.backend)
+        total = sum(stages.seconds.values())
+
+        # Guard against output regressions, not just slowdowns
+        golden = golden_path(rows, args.seed)
+        if args.update_golden:
+            os.makedirs(GOLDEN_DIR, exist_ok=True)
+            with open(golden, 'w') as file:
+                file.write(dumps_summary(summary) + '\n')
+            golden_status = 'updated'
+        elif os.path.exists(golden):
+            with open(golden) as file:
+                matches = summaries_match(json.load(file), summary)
+            golden_status = 'match' if matches else 'MISMATCH'
+            regressions += not matches
+        else:
+            golden_status = 'no golden file'
+
+        print(f'\n{rows:,} rows ({args.backend}): {total:.3f}s end to end ({rows / total:,.0f} rows/s), golden summary: {golden_status}')
+        print(f"{'kind':<13} {'name':<12} {'seconds':>10} {'rows/s':>14} {'peak RSS MB':>12}")
+        size_rows = _rows('stage', stages, rows) + _rows('metric_group', groups, rows)
+        for row in size_rows:
+            rate = f"{row['rows_per_second']:,}" if row['rows_per_second'] else '-'
+            print(f"{row['kind']:<13} {row['name']:<12} {row['seconds']:>10.4f} {rate:>14} {row['peak_rss_mb']:>12.1f}")
+        results.append({'rows': rows, 'seed': args.seed, 'backend': args.backend, 'seconds': round(total, 4), 'golden': golden_status, 'timings': size_rows})
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+    if regressions:
+        raise SystemExit(f'{regressions} summaries differ from their golden files')
+
+
+if __name__ == "__main__":
+    main()
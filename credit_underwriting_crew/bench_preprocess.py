@@ -0,0 +1,84 @@
+import argparse
+import ast
+import os
+import subprocess
+import time
+
+import numpy as np
+import pandas as pd
+
+from summary_metrics import SummaryAggregates, prepare_frame
+from synthetic_data import generate_export
+
+
+# The scan-by-scan preprocess_financial_data the fused engine replaced, read
+# from git rather than kept as a second copy of the metric code
+BASELINE_REF = 'd379940'
+BASELINE_FILE = 'credit_underwriter_2.py'
+BASELINE_FUNCTION = 'preprocess_financial_data'
+
+
+class _FrameInsteadOfCsv(ast.NodeTransformer):
+    # The baseline reads its argument with pd.read_csv; pass the frame through instead
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Attribute) and node.func.attr == 'read_csv':
+            return node.args[0]
+        return self.generic_visit(node)
+
+
+def load_baseline(ref=BASELINE_REF):
+    """The baseline ``preprocess_financial_data`` at ``ref``, taking a raw DataFrame instead of a CSV."""
+    source = subprocess.run(
+        ['git', 'show', f'{ref}:./{BASELINE_FILE}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), check=True, capture_output=True, text=True,
+    ).stdout
+    function = next(node for node in ast.parse(source).body
+                    if isinstance(node, ast.FunctionDef) and node.name == BASELINE_FUNCTION)
+    module = ast.Module(body=[_FrameInsteadOfCsv().visit(function)], type_ignores=[])
+    namespace = {}
+    exec(compile(ast.fix_missing_locations(module), f'{ref}:{BASELINE_FILE}', 'exec'), namespace)
+    return namespace[BASELINE_FUNCTION]
+
+
+def summaries_match(expected, actual):
+    if isinstance(expected, dict):
+        return expected.keys() == actual.keys() and all(summaries_match(expected[k], actual[k]) for k in expected)
+    if pd.isna(expected) and pd.isna(actual):
+        return True
+    return bool(np.isclose(expected, actual, rtol=1e-9, atol=1e-6))
+
+
+def time_call(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the fused metric engine with the scan-by-scan baseline')
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline-ref', default=BASELINE_REF, help='Git revision holding the scan-by-scan baseline')
+    args = parser.parse_args()
+
+    legacy_preprocess = load_baseline(args.baseline_ref)
+    print(f'Generating {args.rows:,} synthetic order rows...')
+    raw = generate_export(args.rows, seed=args.seed)
+
+    # Both sides coerce the raw columns and then compute the metrics
+    legacy_time, (_, expected) = time_call(lambda: legacy_preprocess(raw.copy()), repeat=args.repeat)
+    fused_time, actual = time_call(lambda: SummaryAggregates().update(prepare_frame(raw.copy())).to_summary(),
+                                   repeat=args.repeat)
+
+    print(f'Scan-by-scan: {legacy_time:.3f}s ({args.rows / legacy_time:,.0f} rows/s)')
+    print(f'Fused:        {fused_time:.3f}s ({args.rows / fused_time:,.0f} rows/s)')
+    print(f'Speedup:      {legacy_time / fused_time:.1f}x')
+    print(f'Summaries match: {summaries_match(expected, actual)}')
+
+
+if __name__ == "__main__":
+    main()
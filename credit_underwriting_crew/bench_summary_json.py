@@ -0,0 +1,62 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from summary_json import convert_numpy_types, dumps_summary, escape_curly_braces, summary_to_json
+from summary_metrics import SummaryAggregates, prepare_frame
+from synthetic_data import generate_export
+
+
+# Summary with per-SKU and per-day series on top of the regular metrics
+def build_summary(rows, skus, seed):
+    df = prepare_frame(generate_export(rows, seed=seed, skus=skus, days=3650))
+    summary = dict(SummaryAggregates().update(df).to_summary())
+    summary['Net Sales Per SKU (INR)'] = df.groupby('SKU ID')['Net Sales Excl Gst'].sum()
+    summary['Orders Per Day'] = df.groupby(df['Order Date'].dt.strftime('%Y-%m-%d')).size()
+    summary['Average Biggest Charge/Fee (INR)'] = np.float64(summary['Average Biggest Charge/Fee (INR)'])
+    return summary
+
+
+def walker(summary):
+    legacy = {key: value.to_dict() if isinstance(value, pd.Series) else value for key, value in summary.items()}
+    return escape_curly_braces(json.dumps(convert_numpy_types(legacy), indent=4))
+
+
+def typed(summary):
+    return escape_curly_braces(dumps_summary(summary_to_json(summary), indent=4))
+
+
+def time_call(func, arg, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare typed summary serialisation with the recursive walker')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--skus', type=int, default=50_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    summary = build_summary(args.rows, args.skus, args.seed)
+    entries = sum(len(value) if isinstance(value, (pd.Series, dict)) else 1 for value in summary.values())
+    print(f'Summary with {entries:,} entries')
+
+    walker_time, expected = time_call(walker, summary, args.repeat)
+    typed_time, actual = time_call(typed, summary, args.repeat)
+    print(f'Walker + json.dumps: {walker_time * 1000:.1f} ms')
+    print(f'Typed + dumps_summary: {typed_time * 1000:.1f} ms')
+    print(f'Speedup: {walker_time / typed_time:.1f}x')
+    print(f'Output identical: {expected == actual}')
+
+
+if __name__ == "__main__":
+    main()
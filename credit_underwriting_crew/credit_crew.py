@@ -0,0 +1,277 @@
+from dotenv import load_dotenv
+from crewai import Agent, Task, Crew, Process
+
+from credit_signals import render_signals
+from report_store import extract_credit_score
+from summary_json import escape_curly_braces
+
+# Crew construction shared by the Streamlit app and the batch runner, kept free
+# of UI imports so batch workers do not load Streamlit
+
+load_dotenv()
+
+# Define the agents with updated backstories to reflect monetary units in INR
+
+credit_decision_manager = Agent(
+    role='Credit Decision Manager',
+    goal='Oversee the credit assessment process and interface with customers',
+    backstory="""You are the customer-facing representative and orchestrator of the credit underwriting team.
+You ensure that client needs are met and coordinate the workflow among the team members.
+You have a deep understanding of the key terms and dataset structure provided, and you make sure the team interprets the data exactly as specified.
+All monetary values are in Indian Rupees (INR).""",
+    verbose=False,
+    allow_delegation=True
+)
+
+data_ingestion_analyst = Agent(
+    role='Data Ingestion and Analyst Agent',
+    goal='Analyze preprocessed financial data to prepare signals for determining creditworthiness',
+    backstory="""You specialize in handling financial data that has been preprocessed.
+You interpret the provided data exactly as specified and extract relevant features and insights for credit assessment.
+All monetary values are in Indian Rupees (INR).""",
+    verbose=False,
+    allow_delegation=False
+)
+
+credit_risk_assessment = Agent(
+    role='Credit Risk Assessment Agent',
+    goal='Evaluate the creditworthiness of entities using precise financial metrics',
+    backstory="""You are an expert in financial analysis and risk modeling.
+You use the provided metrics to assess credit risk accurately.
+Based on the available data, you will adjust the existing credit score in a context-dependent manner, focusing on what qualifies or disqualifies this business as credit-worthy.
+All monetary values are in Indian Rupees (INR).""",
+    verbose=False,
+    allow_delegation=False
+)
+
+qa_agent = Agent(
+    role='Quality Assurance Agent',
+    goal='Ensure all calculations and analyses are 100% accurate and reliable',
+    backstory="""You meticulously review outputs from other agents.
+Your attention to detail ensures that all findings are precise before they are finalized.
+You verify that the data interpretations and calculations adhere exactly to the specified dataset structure and key terms.
+Confirm that the final report meets the formatting and content requirements.
+Ensure that only information derived from the 'data_summary' is included in the updated credit report.
+Ensure that the credit score adjustment is appropriate given the initial credit score and the analysis.
+All monetary values are in Indian Rupees (INR).""",
+    verbose=False,
+    allow_delegation=False
+)
+
+def extract_initial_credit_score(before_report):
+    return extract_credit_score(before_report)
+
+# Build the report generation agent, the five tasks and the crew for one assessment.
+# With deterministic signals, the analyst (task2) and QA (task4) LLM tasks are
+# replaced by the signal table and validation checks computed in Python; the
+# assessment and report tasks then get the data summary themselves, since no
+# analyst output carries the figures to them.
+def build_credit_crew(inputs, escaped_data_summary, signals=None):
+    # Define the report_generation_agent with updated backstory
+    report_generation_agent = Agent(
+        role='Report Generation Agent',
+        goal='Compile findings into comprehensive and precise reports for stakeholders, summarizing credit assessments',
+        backstory=f"""You specialize in transforming analytical findings into clear, detailed reports.
+Your reports facilitate informed decision-making for stakeholders.
+You ensure that the reports accurately reflect the data interpretations and calculations based on the specified dataset structure and key terms.
+All monetary values are in Indian Rupees (INR).
+
+When updating the credit report, only include information that can be derived from the 'data_summary' provided.
+Do not include any information that is not present in the 'data_summary'.
+
+Adjust the credit score in a context-dependent manner, based on the initial credit score ({inputs['initial_credit_score']}) and the analysis of the alternative data.
+
+Ensure that the report uses the same credit scale and format as the original credit report.
+
+In the financial summary section, include detailed numbers, preferably in tabular form, using the alternative data. Make sure these numbers are 100% accurate.
+
+In the summary section, only provide strong positive or negative information, or things that need to be monitored.
+
+Highlight recommendations for negative signals.
+
+**Color Coding for Changes:**
+
+- **Positive Changes**: Highlight in **green**.
+- **Negative Changes**: Highlight in **red**.
+- **Neutral Changes**: Highlight in **blue**.
+
+Use HTML `<span>` tags with inline CSS styles to apply the colors. For example:
+
+- `<span style="color:green">Positive change text</span>`
+- `<span style="color:red">Negative change text</span>`
+- `<span style="color:blue">Neutral change text</span>`
+
+Ensure that the summary section starts with the same format as the original report and includes the adjusted credit score.
+
+Be as deterministic as possible in presenting the findings.""",
+        verbose=False,
+        allow_delegation=False
+    )
+
+    # Now define the tasks, including the escaped data summary
+    task1 = Task(
+        description=f"""Confirm receipt of the data and initiate the credit assessment process.
+Ensure that the team is fully aware of the key terms and dataset structure provided, and emphasize the importance of interpreting the data exactly as specified.
+All monetary values are in Indian Rupees (INR).
+
+Provide confirmation of data receipt and process initiation.""",
+        expected_output="Confirmation of data receipt and process initiation, with acknowledgment of data interpretation guidelines",
+        agent=credit_decision_manager
+    )
+
+    task2 = Task(
+        description=f"""Analyze the preprocessed financial data provided in 'data_summary' to calculate relevant metrics and prepare signals for determining creditworthiness.
+
+Data Summary:
+{escaped_data_summary}
+
+Ensure that you interpret the data exactly as specified, correctly apply the column relations in your analysis, and prepare signals and insights for determining creditworthiness.
+All monetary values are in Indian Rupees (INR).
+
+Be as deterministic as possible in your analysis.""",
+        expected_output="Analyzed data with relevant metrics calculated and insights extracted",
+        agent=data_ingestion_analyst
+    )
+
+    if signals is None:
+        analysis_source = "Using the analyzed data from the Data Ingestion and Analyst Agent, evaluate the creditworthiness of the entity."
+    else:
+        analysis_source = f"""Using the deterministic signals and validation checks below, evaluate the creditworthiness of the entity.
+These were computed exactly from 'data_summary'; do not recompute them.
+
+{escape_curly_braces(render_signals(signals))}
+
+Data Summary:
+{escaped_data_summary}"""
+
+    task3 = Task(
+        description=f"""{analysis_source}
+
+Use precise financial metrics to assess credit risk accurately.
+
+All monetary values are in Indian Rupees (INR).
+
+Based on the analysis of the alternative data ('data_summary') and the initial credit score ({inputs['initial_credit_score']}), adjust the credit score in a context-dependent manner:
+
+- For companies with high initial scores (e.g., above 800), negative signals have a larger impact in decreasing the score, while positive signals have a smaller impact.
+- For companies with average initial scores (e.g., around 650-750), both positive and negative signals can affect the score significantly.
+- For companies with low initial scores (e.g., below 500), positive signals have a larger impact in increasing the score, while negative signals have a smaller impact.
+
+**Ensure that the adjusted credit score is modified by a maximum of ±25 points**.
+
+1. Adjusted credit score based on the context-dependent analysis.
+2. Conclusions and commentary based on the available data, focusing on what qualifies or disqualifies this business as credit-worthy.
+
+Incorporate the specific data provided in 'data_summary', ensuring that your assessment is accurate.
+
+Only use information derived from 'data_summary' for your evaluation.
+
+Do not include any information that is not provided in 'data_summary'.""",
+        expected_output="Detailed credit risk assessment report with conclusions and an adjusted credit score, based on the context-dependent analysis.",
+        agent=credit_risk_assessment
+    )
+
+    task4 = Task(
+        description=f"""Review the outputs from the Data Ingestion and Analyst Agent and the Credit Risk Assessment Agent.
+
+Verify that all calculations and analyses are 100% accurate and reliable.
+
+Ensure that the data interpretations and calculations adhere exactly to the specified dataset structure and key terms.
+
+Ensure that only information derived from 'data_summary' is included in the updated credit report.
+
+Confirm that no unnecessary or extraneous information is being passed to the updated credit report.
+
+Check that the financial summary section includes detailed numbers, preferably in tabular form, using the alternative data, and that these numbers are 100% accurate.
+
+Ensure that the summary section only provides strong positive or negative information, or things that need to be monitored.
+
+Confirm that recommendations are highlighted for negative signals.
+
+Ensure that the summary section starts with the same format as the original report and includes the adjusted credit score.
+
+Ensure that the adjusted credit score is appropriate given the initial credit score ({inputs['initial_credit_score']}) and the analysis.
+
+All monetary values are in Indian Rupees (INR).
+
+Provide deterministic validation of all computations.
+
+Confirm that the conclusions and adjusted credit score are justified based on the data.
+
+Ensure that the final report will meet the formatting and content requirements specified.""",
+        expected_output="Validation report confirming accuracy or identifying issues, with specific references to data interpretations and assessments. Ensure no unnecessary information is included, and that the report meets all specified requirements.",
+        agent=qa_agent
+    )
+
+    # Without the analyst task, the financial summary table is written from the data summary directly
+    report_data = ''
+    if signals is not None:
+        report_data = f"""
+
+Data Summary:
+{escaped_data_summary}"""
+
+    task5 = Task(
+        description=f"""Compile the validated findings into an updated credit report for stakeholders, incorporating the alternative data provided.{report_data}
+
+The final report should be based on the following before version of the credit report:
+
+Before Credit Report:
+{inputs['before_report']}
+
+Update the report by including the alternative data from 'data_summary' and highlight the sections impacted by this data.
+
+Ensure that the updated report includes the following:
+
+- Use the same credit scale and format as the original credit report.
+- Adjust the credit score in a context-dependent manner, based on the initial credit score ({inputs['initial_credit_score']}) and the analysis of the alternative data.
+- In the financial summary section, include detailed numbers, preferably in tabular form, using the alternative data. Make sure these numbers are 100% accurate.
+- In the summary section, only provide strong positive or negative information, or things that need to be monitored.
+- Highlight recommendations for negative signals.
+- Ensure that the summary section starts with the same format as the original report and includes the adjusted credit score.
+- Only add information that can be derived from the 'data_summary'.
+- Do not include any information that is not provided in 'data_summary'.
+
+**Color Coding for Changes:**
+
+- **Positive Changes**: Highlight in **green**.
+- **Negative Changes**: Highlight in **red**.
+- **Neutral Changes**: Highlight in **blue**.
+
+**Implementation:**
+
+Use HTML `<span>` tags with inline CSS styles to apply the colors. For example:
+
+- `<span style="color:green">Positive change text</span>`
+- `<span style="color:red">Negative change text</span>`
+- `<span style="color:blue">Neutral change text</span>`
+
+Ensure that the summary section starts with the same format as the original report and includes the adjusted credit score.
+
+Be as deterministic as possible in presenting the findings.""",
+        expected_output="Updated credit report with sections impacted by alternative data highlighted using green for positive changes, red for negative changes, and blue for neutral changes, including a detailed financial summary with accurate numbers.",
+        agent=report_generation_agent
+    )
+
+    # Declare the data each task needs as its context. The acknowledgement (task1)
+    # feeds no other task, and the analysis only needs 'data_summary', so both
+    # can run at once when the crew is executed as a task graph.
+    if signals is None:
+        agents = [credit_decision_manager, data_ingestion_analyst, credit_risk_assessment, qa_agent, report_generation_agent]
+        tasks = [task1, task2, task3, task4, task5]
+        task3.context = [task2]
+        task4.context = [task2, task3]
+        task5.context = [task3, task4]
+    else:
+        agents = [credit_decision_manager, credit_risk_assessment, report_generation_agent]
+        tasks = [task1, task3, task5]
+        task5.context = [task3]
+
+    # Instantiate your crew with a sequential process
+    crew = Crew(
+        agents=agents,
+        tasks=tasks,
+        verbose=True,
+        process=Process.sequential
+    )
+    return crew
@@ -0,0 +1,132 @@
+import math
+
+# Relative tolerance for consistency checks between summary metrics
+CHECK_TOLERANCE = 1e-6
+
+# (metric, direction, threshold, signal, reason): 'above' fires when value > threshold, 'below' when value < threshold
+SIGNAL_THRESHOLDS = [
+    ('Return Rate', 'above', 15, 'negative', 'High share of orders returned or replaced'),
+    ('Return Rate', 'below', 5, 'positive', 'Low share of orders returned or replaced'),
+    ('Delivery Rate', 'above', 85, 'positive', 'Most orders are delivered'),
+    ('Delivery Rate', 'below', 70, 'negative', 'Low share of orders delivered'),
+    ('Discount Percentage', 'above', 20, 'negative', 'Sales depend heavily on discounting'),
+    ('Cost of Doing Business Percentage', 'above', 30, 'negative', 'Marketplace charges absorb a large share of sales'),
+    ('Cost of Return Percentage', 'above', 5, 'monitor', 'Return charges are material relative to sales'),
+    ('Profit Margin Percentage', 'below', 0, 'negative', 'Net revenue is negative'),
+    ('Profit Margin Percentage', 'above', 60, 'positive', 'Net revenue retains most of net sales'),
+    ('Average Monthly Net Sales Growth (%)', 'above', 5, 'positive', 'Net sales are growing month over month'),
+    ('Average Monthly Net Sales Growth (%)', 'below', -5, 'negative', 'Net sales are shrinking month over month'),
+    ('Average Monthly Order Growth (%)', 'below', -5, 'negative', 'Order volume is shrinking month over month'),
+    ('Days Active', 'below', 180, 'monitor', 'Short trading history'),
+    ('Days Active', 'above', 720, 'positive', 'Trading history of two years or more'),
+]
+
+# Share of SKUs producing 80% of sales below which sales are considered concentrated
+SKU_CONCENTRATION_THRESHOLD = 10
+
+
+def _close(expected, actual):
+    if expected is None or actual is None:
+        return expected is actual
+    return math.isclose(expected, actual, rel_tol=CHECK_TOLERANCE, abs_tol=CHECK_TOLERANCE)
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator * 100 if denominator else 0
+
+
+def validation_checks(summary):
+    """Recompute the derived metrics of ``summary`` from its own totals."""
+    net_sales = summary['Total Net Sales Excl Gst (INR)']
+    total_orders = summary['Total Orders']
+    checks = [
+        ('Average Order Value = Net Sales / Orders',
+         net_sales / total_orders if total_orders else 0, summary['Average Order Value (INR)']),
+        ('Discount Percentage = Total Discount / Net Sales',
+         _ratio(summary['Total Discount Sum (INR)'], net_sales) if net_sales > 0 else 0, summary['Discount Percentage']),
+        ('Cost of Doing Business = Total Charges / Net Sales',
+         _ratio(summary['Total Charges/Fee Sum (INR)'], net_sales) if net_sales > 0 else 0, summary['Cost of Doing Business Percentage']),
+        ('Tax Liability Percentage = Tax Liability / Net Sales',
+         _ratio(summary['Total Tax Liability Sum (INR)'], net_sales) if net_sales > 0 else 0, summary['Total Tax Liability Percentage']),
+        ('Profit Margin = Net Revenue / Net Sales',
+         _ratio(summary['Total Net Revenue Excl Gst (INR)'], net_sales) if net_sales > 0 else 0, summary['Profit Margin Percentage']),
+        ('TCS Percentage = TCS / Net Sales',
+         _ratio(summary['TCS Sum (INR)'], net_sales) if net_sales > 0 else 0, summary['TCS Percentage']),
+        ('TDS Percentage = TDS / Net Sales',
+         _ratio(summary['TDS Sum (INR)'], net_sales) if net_sales > 0 else 0, summary['TDS Percentage']),
+    ]
+    if summary['Self Discount Ratio'] or summary['Shipping Discount Ratio']:
+        checks.append(('Self + Shipping Discount Ratios = 100%',
+                       100.0, summary['Self Discount Ratio'] + summary['Shipping Discount Ratio']))
+
+    results = [
+        {'check': name, 'passed': _close(expected, actual), 'expected': expected, 'actual': actual}
+        for name, expected, actual in checks
+    ]
+
+    orders_per_month = summary['Orders Per Month']
+    if orders_per_month:
+        # Orders with an unparseable date are not attributed to any month
+        monthly_orders = sum(orders_per_month.values())
+        results.append({'check': 'Orders Per Month add up to at most Total Orders',
+                        'passed': monthly_orders <= total_orders, 'expected': total_orders, 'actual': monthly_orders})
+        months = list(orders_per_month)
+        previous = orders_per_month[months[0]]
+        if len(months) > 1 and previous:
+            expected = _ratio(orders_per_month[months[1]] - previous, previous)
+            actual = summary['Order Growth Rate Per Month (%)'].get(months[1])
+            results.append({'check': 'Order Growth Rate matches Orders Per Month',
+                            'passed': _close(expected, actual), 'expected': expected, 'actual': actual})
+    return results
+
+
+def threshold_signals(summary):
+    signals = []
+    for metric, direction, threshold, signal, reason in SIGNAL_THRESHOLDS:
+        value = summary.get(metric)
+        if value is None:
+            continue
+        if (direction == 'above' and value > threshold) or (direction == 'below' and value < threshold):
+            signals.append({'metric': metric, 'value': value, 'signal': signal, 'reason': reason})
+
+    total_skus = summary['Total SKUs']
+    if total_skus:
+        top_share = summary['SKUs Contributing 80% of Sales'] / total_skus * 100
+        if top_share < SKU_CONCENTRATION_THRESHOLD:
+            signals.append({'metric': 'SKUs Contributing 80% of Sales', 'value': top_share, 'signal': 'monitor',
+                            'reason': f'80% of sales come from {top_share:.1f}% of SKUs'})
+
+    return_rates = list(summary['Return Rate Per Month (%)'].values())
+    if len(return_rates) >= 3 and return_rates[-1] > summary['Return Rate'] * 1.5:
+        signals.append({'metric': 'Return Rate Per Month (%)', 'value': return_rates[-1], 'signal': 'monitor',
+                        'reason': 'Latest month return rate is well above the overall return rate'})
+    return signals
+
+
+def compute_signals(summary):
+    """Deterministic replacement for the analyst and QA arithmetic over a JSON-native summary."""
+    return {'checks': validation_checks(summary), 'signals': threshold_signals(summary)}
+
+
+def _format_value(value):
+    if value is None:
+        return 'n/a'
+    if isinstance(value, float):
+        return f'{value:,.2f}'
+    return f'{value:,}'
+
+
+def render_signals(result):
+    """Render the signals and validation checks as compact markdown tables."""
+    lines = ['| Metric | Value | Signal | Reason |', '|---|---|---|---|']
+    for signal in result['signals']:
+        lines.append(f"| {signal['metric']} | {_format_value(signal['value'])} | {signal['signal']} | {signal['reason']} |")
+    if not result['signals']:
+        lines.append('| - | - | neutral | No metric crossed a signal threshold |')
+
+    failed = [check for check in result['checks'] if not check['passed']]
+    lines.append('')
+    lines.append(f"Validation: {len(result['checks']) - len(failed)}/{len(result['checks'])} consistency checks passed.")
+    for check in failed:
+        lines.append(f"- FAILED {check['check']}: expected {_format_value(check['expected'])}, got {_format_value(check['actual'])}")
+    return '\n'.join(lines)
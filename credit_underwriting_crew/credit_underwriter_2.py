@@ -1,339 +1,177 @@
 import os
 from dotenv import load_dotenv
-from crewai import Agent, Task, Crew, Process
 import pandas as pd
-import numpy as np
 import json
-import re
 import streamlit as st
+import altair as alt
 import time
 import threading
 
-load_dotenv()
-
-# Define the agents with updated backstories to reflect monetary units in INR
-
-credit_decision_manager = Agent(
-    role='Credit Decision Manager',
-    goal='Oversee the credit assessment process and interface with customers',
-    backstory="""You are the customer-facing representative and orchestrator of the credit underwriting team.
-You ensure that client needs are met and coordinate the workflow among the team members.
-You have a deep understanding of the key terms and dataset structure provided, and you make sure the team interprets the data exactly as specified.
-All monetary values are in Indian Rupees (INR).""",
-    verbose=False,
-    allow_delegation=True
-)
-
-data_ingestion_analyst = Agent(
-    role='Data Ingestion and Analyst Agent',
-    goal='Analyze preprocessed financial data to prepare signals for determining creditworthiness',
-    backstory="""You specialize in handling financial data that has been preprocessed.
-You interpret the provided data exactly as specified and extract relevant features and insights for credit assessment.
-All monetary values are in Indian Rupees (INR).""",
-    verbose=False,
-    allow_delegation=False
-)
-
-credit_risk_assessment = Agent(
-    role='Credit Risk Assessment Agent',
-    goal='Evaluate the creditworthiness of entities using precise financial metrics',
-    backstory="""You are an expert in financial analysis and risk modeling.
-You use the provided metrics to assess credit risk accurately.
-Based on the available data, you will adjust the existing credit score in a context-dependent manner, focusing on what qualifies or disqualifies this business as credit-worthy.
-All monetary values are in Indian Rupees (INR).""",
-    verbose=False,
-    allow_delegation=False
-)
-
-qa_agent = Agent(
-    role='Quality Assurance Agent',
-    goal='Ensure all calculations and analyses are 100% accurate and reliable',
-    backstory="""You meticulously review outputs from other agents.
-Your attention to detail ensures that all findings are precise before they are finalized.
-You verify that the data interpretations and calculations adhere exactly to the specified dataset structure and key terms.
-Confirm that the final report meets the formatting and content requirements.
-Ensure that only information derived from the 'data_summary' is included in the updated credit report.
-Ensure that the credit score adjustment is appropriate given the initial credit score and the analysis.
-All monetary values are in Indian Rupees (INR).""",
-    verbose=False,
-    allow_delegation=False
-)
-
-# Function to escape curly braces in strings
-def escape_curly_braces(s):
-    return s.replace('{', '{{').replace('}', '}}')
-
-# Function to convert NumPy and pandas types to native Python types
-def convert_numpy_types(obj):
-    if isinstance(obj, dict):
-        return {convert_numpy_types(k): convert_numpy_types(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(v) for v in obj]
-    elif isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, pd.Period):
-        return str(obj)
-    elif pd.isna(obj):
-        return None
-    else:
-        return obj
-
-# Updated preprocess_financial_data function with additional metrics
-def preprocess_financial_data(file):
-    import pandas as pd
-    import numpy as np
-
-    # Load the data
-    df = pd.read_csv(file)
-
-    # Ensure correct data types for numeric columns
-    numeric_columns = [
-        'Shipping Discount', 'Self Discount', 'Total Discount', 'Net Sales Excl Gst',
-        'Delivered Charges Excl Gst', 'Returned Charges Excl Gst',
-        'Free Replacement Charges Excl Gst', 'Indirect Charges Excl Gst',
-        'Net Revenue Excl Gst', 'Output Gst', 'Input Credit Gst',
-        'Listing Gmv', 'TCS', 'TDS'
-    ]
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        else:
-            df[col] = 0
-
-    # Ensure date columns are in datetime format with specified date format
-    if 'Order Date' in df.columns:
-        df['Order Date'] = pd.to_datetime(df['Order Date'], format='%d/%m/%Y', errors='coerce')
-    else:
-        df['Order Date'] = pd.NaT
+from credit_crew import build_credit_crew
+from credit_signals import compute_signals, render_signals
+from job_queue import DEFAULT_MAX_LLM_CALLS, JobQueue, job_id_for, limit_llm_concurrency
+from metrics_store import IncrementalMetricsStore
+from polars_backend import BACKENDS, polars_summary
+from parquet_store import content_hash, ingest_csv, is_ingested, iter_ingested, load_ingested
+from report_store import REFRESH_INTERVAL_SECONDS, ReportStore
+from progress import FINISHED, TASK_COMPLETED, TOKEN, ProgressChannel, attach_progress, final_answer
+from prompt_budget import DEFAULT_HORIZON_MONTHS, compact_markdown, compact_summary, prompt_tokens
+from summary_cache import SummaryCache
+from summary_json import dumps_summary, escape_curly_braces
+from summary_metrics import DEFAULT_CHUNKSIZE, SummaryAggregates, prepare_frame, read_csv_chunks, summarize_chunks
+from task_graph import TaskGraphRunner
+from tracing import Tracer, activate, instrument_crew, span
 
-    # Calculate Total Discount if not present
-    if 'Total Discount' not in df.columns or df['Total Discount'].isnull().all():
-        df['Total Discount'] = df['Self Discount'] + df['Shipping Discount']
-
-    # Calculate Total Tax liability
-    df['Total Tax liability'] = df['Output Gst'] - df['Input Credit Gst']
-
-    # Calculate Total Charges/Fee
-    df['Total Charges/Fee'] = (
-        df['Delivered Charges Excl Gst'] +
-        df['Returned Charges Excl Gst'] +
-        df['Free Replacement Charges Excl Gst'] +
-        df['Indirect Charges Excl Gst']
-    )
-
-    # Identify the Biggest/Largest Charge/Fee
-    charges_cols = [
-        'Delivered Charges Excl Gst',
-        'Returned Charges Excl Gst',
-        'Free Replacement Charges Excl Gst',
-        'Indirect Charges Excl Gst'
-    ]
-    df['Biggest Charge/Fee'] = df[charges_cols].abs().max(axis=1)
-
-    # Existing Metrics
-
-    # Total number of orders
-    total_orders = len(df)
+load_dotenv()
 
-    # Total Net Sales
-    total_net_sales = df['Net Sales Excl Gst'].sum()
+# Uploads larger than this are aggregated in chunks instead of loaded whole
+STREAMING_THRESHOLD_BYTES = 200 * 1024 * 1024
 
-    # Average Order Value (AOV)
-    average_order_value = total_net_sales / total_orders if total_orders > 0 else 0
+# Engine computing the summary metrics: 'pandas', or 'polars' to use every core
+SUMMARY_BACKEND = os.getenv('CREDIT_SUMMARY_BACKEND', 'pandas')
 
-    # Discount as a percentage of Net Sales Excl Gst
-    total_discount = df['Total Discount'].sum()
-    discount_percentage = (total_discount / total_net_sales * 100) if total_net_sales > 0 else 0
+# Server mode: with workers set, every session's crew runs on one shared, bounded job queue
+JOB_QUEUE_WORKERS = int(os.getenv('CREDIT_JOB_QUEUE_WORKERS', '0'))
+MAX_LLM_CALLS = int(os.getenv('CREDIT_MAX_LLM_CALLS', str(DEFAULT_MAX_LLM_CALLS)))
 
-    # SKUs discount coverage: percentage of SKUs that had discounts
-    if 'SKU ID' in df.columns:
-        total_skus = df['SKU ID'].nunique()
-        skus_with_discount = df[df['Total Discount'] > 0]['SKU ID'].nunique()
-        skus_discount_coverage = (skus_with_discount / total_skus * 100) if total_skus > 0 else 0
-    else:
-        total_skus = 0
-        skus_discount_coverage = 0
-
-    # Self Discount and Shipping Discount ratio
-    total_self_discount = df['Self Discount'].sum()
-    total_shipping_discount = df['Shipping Discount'].sum()
-    total_discounts = total_self_discount + total_shipping_discount
-    self_discount_ratio = (total_self_discount / total_discounts * 100) if total_discounts > 0 else 0
-    shipping_discount_ratio = (total_shipping_discount / total_discounts * 100) if total_discounts > 0 else 0
-
-    # Return rate (Return Percentage/Return Ratio)
-    if 'Order Status' in df.columns:
-        total_returns = df[df['Order Status'].str.lower().isin(['returned', 'free_replacement'])].shape[0]
-        return_rate = (total_returns / total_orders * 100) if total_orders > 0 else 0
-    else:
-        total_returns = 0
-        return_rate = 0
-
-    # Cost of return as a percentage of sales
-    total_return_charges = df['Returned Charges Excl Gst'].sum()
-    cost_of_return_percentage = (total_return_charges / total_net_sales * 100) if total_net_sales > 0 else 0
-
-    # Logistics cost as a percentage of sales
-    total_delivered_charges = df['Delivered Charges Excl Gst'].sum()
-    logistics_cost_percentage = (total_delivered_charges / total_net_sales * 100) if total_net_sales > 0 else 0
-
-    # SKU-wise sales
-    if 'SKU ID' in df.columns:
-        sku_sales = df.groupby('SKU ID')['Net Sales Excl Gst'].sum()
-        # SKUs contributing to 80% of sales
-        sku_sales_sorted = sku_sales.sort_values(ascending=False)
-        cumulative_sales = sku_sales_sorted.cumsum()
-        total_sales = sku_sales_sorted.sum()
-        skus_contributing_80_percent_sales = cumulative_sales[cumulative_sales <= 0.8 * total_sales].count()
-    else:
-        skus_contributing_80_percent_sales = 0
-
-    # Active days (business transaction period)
-    min_order_date = df['Order Date'].min()
-    max_order_date = df['Order Date'].max()
-    days_active = (max_order_date - min_order_date).days + 1 if pd.notnull(min_order_date) and pd.notnull(max_order_date) else 0
-
-    # Total categories
-    total_categories = df['Product Category'].nunique() if 'Product Category' in df.columns else 0
-
-    # Order and Net Sales Growth over Weeks/Months
-    if 'Order Date' in df.columns and df['Order Date'].notnull().any():
-        df['Order Month'] = df['Order Date'].dt.to_period('M')
-        orders_per_month = df.groupby('Order Month').size()
-        net_sales_per_month = df.groupby('Order Month')['Net Sales Excl Gst'].sum()
-
-        # Convert Period index to string
-        orders_per_month.index = orders_per_month.index.astype(str)
-        net_sales_per_month.index = net_sales_per_month.index.astype(str)
-
-        # Calculate month-over-month growth rates
-        order_growth = orders_per_month.pct_change().fillna(0) * 100
-        net_sales_growth = net_sales_per_month.pct_change().fillna(0) * 100
-
-        # Average growth rates
-        average_order_growth = order_growth.mean()
-        average_net_sales_growth = net_sales_growth.mean()
-
-        # Additional return metrics over time
-        returns_per_month = df[df['Order Status'].str.lower().isin(['returned', 'free_replacement'])].groupby('Order Month').size()
-        returns_per_month.index = returns_per_month.index.astype(str)
-        return_rate_per_month = (returns_per_month / orders_per_month * 100).fillna(0)
-    else:
-        average_order_growth = 0
-        average_net_sales_growth = 0
-        orders_per_month = pd.Series(dtype='float64')
-        net_sales_per_month = pd.Series(dtype='float64')
-        order_growth = pd.Series(dtype='float64')
-        net_sales_growth = pd.Series(dtype='float64')
-        return_rate_per_month = pd.Series(dtype='float64')
-
-    # Additional Metrics based on available data
-
-    # Cost of Doing Business Percentage
-    total_charges_fee = df['Total Charges/Fee'].sum()
-    codb_percentage = (total_charges_fee / total_net_sales * 100) if total_net_sales > 0 else 0
-
-    # Total Tax Liability Percentage
-    total_tax_liability = df['Total Tax liability'].sum()
-    total_tax_liability_percentage = (total_tax_liability / total_net_sales * 100) if total_net_sales > 0 else 0
-
-    # TCS Sum and TCS Percentage
-    total_tcs = df['TCS'].sum()
-    tcs_percentage = (total_tcs / total_net_sales * 100) if total_net_sales > 0 else 0
-
-    # TDS Sum and TDS Percentage
-    total_tds = df['TDS'].sum()
-    tds_percentage = (total_tds / total_net_sales * 100) if total_net_sales > 0 else 0
-
-    # Profit Margin Percentage
-    net_revenue = df['Net Revenue Excl Gst'].sum()
-    profit_margin_percentage = (net_revenue / total_net_sales * 100) if total_net_sales > 0 else 0
-
-    # Delivery Rate
-    if 'Order Status' in df.columns:
-        total_delivered = df[df['Order Status'].str.lower() == 'delivered'].shape[0]
-        delivery_rate = (total_delivered / total_orders * 100) if total_orders > 0 else 0
-    else:
-        delivery_rate = 0
-
-    # Assemble the summary
-    summary = {
-        'Total Discount Sum (INR)': total_discount,
-        'Total Tax Liability Sum (INR)': total_tax_liability,
-        'Total Charges/Fee Sum (INR)': total_charges_fee,
-        'Average Biggest Charge/Fee (INR)': df['Biggest Charge/Fee'].mean(),
-        'Total Net Sales Excl Gst (INR)': total_net_sales,
-        'Total Net Revenue Excl Gst (INR)': net_revenue,
-        'Total Listing Gmv (INR)': df['Listing Gmv'].sum(),
-        'Total Orders': total_orders,
-        'Average Order Value (INR)': average_order_value,
-        'Discount Percentage': discount_percentage,
-        'SKUs Discount Coverage Percentage': skus_discount_coverage,
-        'Self Discount Ratio': self_discount_ratio,
-        'Shipping Discount Ratio': shipping_discount_ratio,
-        'Return Rate': return_rate,
-        'Cost of Return Percentage': cost_of_return_percentage,
-        'Logistics Cost Percentage': logistics_cost_percentage,
-        'SKUs Contributing 80% of Sales': skus_contributing_80_percent_sales,
-        'Days Active': days_active,
-        'Total SKUs': total_skus,
-        'Total Categories': total_categories,
-        'Average Monthly Order Growth (%)': average_order_growth,
-        'Average Monthly Net Sales Growth (%)': average_net_sales_growth,
-        'Orders Per Month': orders_per_month.to_dict(),
-        'Net Sales Per Month (INR)': net_sales_per_month.to_dict(),
-        'Order Growth Rate Per Month (%)': order_growth.to_dict(),
-        'Net Sales Growth Rate Per Month (%)': net_sales_growth.to_dict(),
-        'Return Rate Per Month (%)': return_rate_per_month.to_dict(),
-        'Cost of Doing Business Percentage': codb_percentage,
-        'Total Tax Liability Percentage': total_tax_liability_percentage,
-        'TCS Sum (INR)': total_tcs,
-        'TCS Percentage': tcs_percentage,
-        'TDS Sum (INR)': total_tds,
-        'TDS Percentage': tds_percentage,
-        'Profit Margin Percentage': profit_margin_percentage,
-        'Delivery Rate': delivery_rate,
-        # Add more summary metrics as needed
-    }
+# Updated preprocess_financial_data function with additional metrics
+def preprocess_financial_data(file, chunksize=None, backend='pandas'):
+    ingested = is_ingested(file)
+
+    # Polars plans the group-bys lazily and runs them multi-threaded over the whole file
+    if backend == 'polars':
+        with span('preprocess.polars'):
+            return None, polars_summary(file)
+
+    # Streaming mode: aggregate chunk by chunk without keeping the rows around
+    if chunksize:
+        with span('preprocess.stream', chunksize=chunksize):
+            chunks = iter_ingested(file, chunksize) if ingested else read_csv_chunks(file, chunksize)
+            return None, summarize_chunks(chunks)
+
+    # Load the data (only the used columns for an ingested export), coerce types and add the derived columns
+    with span('preprocess.load', ingested=ingested) as attributes:
+        df = load_ingested(file) if ingested else pd.read_csv(file)
+        attributes['rows'] = len(df)
+    with span('preprocess.prepare'):
+        df = prepare_frame(df)
+
+    # Compute every summary metric in a single fused pass over the frame
+    with span('preprocess.aggregate'):
+        aggregates = SummaryAggregates().update(df)
+    with span('preprocess.summarize'):
+        summary = aggregates.to_summary()
 
     return df, summary
 
+# Index the base reports once per server process; later loads only re-parse changed files
+@st.cache_resource
+def get_report_store():
+    return ReportStore.load()
+
+# Look up the company's base report; returns the report text and its index entry,
+# which already holds the extracted credit score and rating
 def load_base_report(company_name):
-    # Map company names to filenames
-    company_to_filename = {
-        'Good Corp Pvt. Ltd.': 'Good_Corp_Credit_Report.md',
-        'Average Corp Pvt. Ltd.': 'Average_Corp_Credit_Report.md',
-        'Bad Corp Pvt. Ltd.': 'Bad_Corp_Credit_Report.md',
-    }
-    filename = company_to_filename.get(company_name)
-    if filename:
-        try:
-            with open(f'reports/{filename}', 'r') as file:
-                report = file.read()
-            return report
-        except FileNotFoundError:
-            st.error(f'Base report file "{filename}" not found in the "reports" directory.')
-            return None
-    else:
-        st.error('No base report found for the provided company name.')
-        return None
+    report_store = get_report_store()
+    entry = report_store.lookup(company_name)
+    if entry is None and report_store.refresh(min_interval=REFRESH_INTERVAL_SECONDS):
+        # Reports may have been added since the index was loaded; the rescan is
+        # rate-limited so typos from many sessions do not each walk the directory
+        report_store.save()
+        entry = report_store.lookup(company_name)
+    if entry is None:
+        suggestions = report_store.suggestions(company_name)
+        if report_store.is_ambiguous(company_name):
+            st.error(f"Several base reports match the provided company name. Enter the full name of one of: {', '.join(suggestions)}.")
+            return None, None
+        hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ''
+        st.error(f'No base report found for the provided company name.{hint}')
+        return None, None
+    # Names match after dropping legal suffixes; show which report was used
+    st.caption(f"Base report: {entry['names'][-1]} ({os.path.basename(entry['path'])})")
+    try:
+        return report_store.read(entry), entry
+    except FileNotFoundError:
+        st.error(f'Base report file "{entry["path"]}" not found in the "reports" directory.')
+        return None, None
 
-def extract_initial_credit_score(before_report):
-    # Updated regex to account for '**' surrounding "Credit Score"
-    pattern = r"\*\*Credit Score:\*\*\s*(\d+)\s*\((.*?)\)"
-    # Find match
-    match = re.search(pattern, before_report)
+# One summary cache per server process so hit/miss counters survive reruns
+@st.cache_resource
+def get_summary_cache():
+    return SummaryCache()
 
-    if match:
-        score = match.group(1)  # Extracts score
-        rating = match.group(2)  # Extracts rating
-        return score, rating
+# One job queue per server process, shared by every session; None outside server mode
+@st.cache_resource
+def get_job_queue():
+    if JOB_QUEUE_WORKERS <= 0:
+        return None
+    return JobQueue(workers=JOB_QUEUE_WORKERS, max_llm_calls=MAX_LLM_CALLS)
+
+# Draw the trace spans as a waterfall, one bar per span
+def render_waterfall(tracer):
+    spans = pd.DataFrame(tracer.spans)
+    tooltip = [col for col in ['name', 'parent', 'duration', 'prompt_tokens', 'completion_tokens', 'rows'] if col in spans.columns]
+    chart = alt.Chart(spans).mark_bar().encode(
+        x=alt.X('start', title='Seconds since start'),
+        x2='end',
+        y=alt.Y('name', title=None, sort=alt.EncodingSortField(field='start', op='min')),
+        color=alt.Color('parent', title='Parent'),
+        tooltip=tooltip,
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+# Show the job's place in the queue and the server-wide queue metrics
+def render_queue_status(job_queue, job):
+    metrics = job_queue.metrics()
+    position = job_queue.position(job)
+    if position:
+        st.info(f"Job {job.job_id} is queued at position {position}. Refreshing the page re-attaches to it.")
     else:
-        return None, None
+        st.info(f"Job {job.job_id} is {job.status}. Refreshing the page re-attaches to it.")
+    st.caption(
+        f"Queue depth: {metrics['queue_depth']} | Running: {metrics['running']} | "
+        f"Wait avg/p95: {metrics['avg_wait_seconds']:.1f}s/{metrics['p95_wait_seconds']:.1f}s | "
+        f"LLM calls in flight: {metrics['llm_calls_in_flight']}"
+    )
+
+# Render task outputs and the streamed report as the channel's events arrive;
+# returns the final report
+def render_progress(channel, total_tasks):
+    # Display a status message updated on every event
+    status_text = st.empty()
+    start_time = time.time()
+    status_text.text("Processing... waiting for the first task to complete")
+
+    task_outputs = st.container()
+    st.markdown('## Updated Credit Report')
+    report_placeholder = st.empty()
+    completed_tasks = 0
+    streamed_tokens = []
+    last_render = 0
+    result = None
+    for kind, payload in channel:
+        elapsed_time = int(time.time() - start_time)
+        if kind == TASK_COMPLETED:
+            completed_tasks += 1
+            status_text.text(f"Processing... {completed_tasks}/{total_tasks} tasks complete. Time elapsed: {elapsed_time} seconds")
+            with task_outputs.expander(f"Task {completed_tasks}: {payload['agent']}"):
+                st.markdown(payload['output'], unsafe_allow_html=True)
+        elif kind == TOKEN:
+            streamed_tokens.append(payload)
+            # Redraw at most ten times a second
+            if time.time() - last_render >= 0.1:
+                report_placeholder.markdown(final_answer(''.join(streamed_tokens)), unsafe_allow_html=True)
+                last_render = time.time()
+        elif kind == FINISHED:
+            result = payload
+
+    # After processing is complete
+    total_time = int(time.time() - start_time)
+    status_text.text(f"Processing complete. Total time: {total_time} seconds")
+
+    # Display the after report
+    report_placeholder.markdown(result, unsafe_allow_html=True)
+    return result
 
 # Streamlit App
 def main():
@@ -351,263 +189,187 @@ def main():
     # Input fields
     company_name = st.text_input("Company Name")
     uploaded_file = st.file_uploader("Upload CSV file", type=["csv"])
+    incremental = st.checkbox("Incremental update (upload extends this seller's previous export)")
+    deterministic = st.checkbox("Deterministic signals (skip the LLM analyst and QA tasks)")
+    compact_prompts = st.checkbox("Compact prompts (tabular summary, recent months only)")
+    horizon_months = DEFAULT_HORIZON_MONTHS
+    if compact_prompts:
+        horizon_months = st.number_input("Months of history in prompts", min_value=1, value=DEFAULT_HORIZON_MONTHS)
+    parallel_tasks = st.checkbox("Run independent tasks in parallel")
+
+    # In server mode jobs are scheduled fairly across underwriters
+    job_queue = get_job_queue()
+    tenant = None
+    rerun = False
+    if job_queue is not None:
+        tenant = st.text_input("Underwriter", value="default")
+        # Identical inputs reuse the finished job until it expires, unless rerun explicitly
+        rerun = st.button("Re-run assessment")
+
+    # After a refresh the inputs are empty; re-attach to the job in the URL
+    attached_job_id = st.query_params.get('job')
+    if job_queue is not None and attached_job_id and not (company_name and uploaded_file):
+        job = job_queue.get(attached_job_id)
+        if job is not None:
+            render_queue_status(job_queue, job)
+            st.markdown('---')
+            render_progress(job.channel, job.total_tasks)
+            return
 
     if company_name and uploaded_file:
+        # Trace every stage of this assessment
+        tracer = Tracer('credit_assessment')
+
         # Load the base report
-        before_report = load_base_report(company_name)
+        with tracer.span('load_base_report'):
+            before_report, report_entry = load_base_report(company_name)
         if before_report is None:
             st.stop()  # Stop execution if base report is not found
         # Display the before report
         st.markdown('## Original Credit Report')
         st.markdown(before_report)
 
-        # Extract the initial credit score
-        initial_credit_score, initial_rating = extract_initial_credit_score(before_report)
+        # The initial credit score and rating were extracted when the report was indexed
+        initial_credit_score, initial_rating = report_entry['score'], report_entry['rating']
         if initial_credit_score is None:
             st.error('Could not extract the initial credit score from the report.')
             st.stop()
 
-        # Preprocess the data
-        df, data_summary = preprocess_financial_data(uploaded_file)
-
-        if df is None or data_summary is None:
-            st.error('Data preprocessing failed. Please check your CSV file.')
-            st.stop()
+        # Reruns and re-uploads of the same file reuse the cached summary. An
+        # incremental summary depends on the seller's stored history, and its
+        # upload must always reach the store, so those runs bypass the cache
+        summary_cache = get_summary_cache()
+        digest = content_hash(uploaded_file)
+        backend = SUMMARY_BACKEND if SUMMARY_BACKEND in BACKENDS else 'pandas'
+        cache_key = f'{digest}-{backend}'
+        data_summary_str = None
+        if not incremental:
+            with tracer.span('summary_cache.get') as attributes:
+                data_summary_str = summary_cache.get(cache_key)
+                attributes['hit'] = data_summary_str is not None
+
+        if data_summary_str is None:
+            # Convert the upload to typed Parquet once; repeat assessments reuse it
+            with tracer.span('ingest_csv'):
+                ingested_path = ingest_csv(uploaded_file, digest=digest)
+
+            if incremental:
+                # Only rows from the seller's last open month onwards are processed
+                with tracer.span('metrics_store.ingest'):
+                    metrics_store = IncrementalMetricsStore.for_seller(company_name)
+                    data_summary = metrics_store.ingest(ingested_path)
+                    metrics_store.save()
+            else:
+                # Preprocess the data, streaming large uploads in chunks
+                chunksize = DEFAULT_CHUNKSIZE if uploaded_file.size > STREAMING_THRESHOLD_BYTES else None
+                with activate(tracer), tracer.span('preprocess_financial_data', backend=backend):
+                    df, data_summary = preprocess_financial_data(ingested_path, chunksize=chunksize, backend=backend)
+
+            if data_summary is None:
+                st.error('Data preprocessing failed. Please check your CSV file.')
+                st.stop()
+
+            # The summary is already JSON-native; serialise it to a JSON-formatted string
+            with tracer.span('dumps_summary'):
+                data_summary_str = dumps_summary(data_summary, indent=4)
+            if not incremental:
+                summary_cache.put(cache_key, data_summary_str)
+        else:
+            data_summary = json.loads(data_summary_str)
 
-        # Convert data types
-        data_summary_converted = convert_numpy_types(data_summary)
+        cache_stats = summary_cache.stats()
+        st.caption(f"Summary cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
 
         # Include the data summary and initial credit score in inputs for agents to use
         inputs = {
             "company_name": company_name,
-            "data_summary": data_summary_converted,
+            "data_summary": data_summary,
             "before_report": before_report,
             "initial_credit_score": initial_credit_score,
             "initial_rating": initial_rating
         }
 
-        # Convert data_summary to a JSON-formatted string and escape curly braces
-        data_summary_str = json.dumps(data_summary_converted, indent=4)
-        escaped_data_summary = escape_curly_braces(data_summary_str)
-
-        # Now define the report_generation_agent with updated backstory
-        report_generation_agent = Agent(
-            role='Report Generation Agent',
-            goal='Compile findings into comprehensive and precise reports for stakeholders, summarizing credit assessments',
-            backstory=f"""You specialize in transforming analytical findings into clear, detailed reports.
-Your reports facilitate informed decision-making for stakeholders.
-You ensure that the reports accurately reflect the data interpretations and calculations based on the specified dataset structure and key terms.
-All monetary values are in Indian Rupees (INR).
-
-When updating the credit report, only include information that can be derived from the 'data_summary' provided.
-Do not include any information that is not present in the 'data_summary'.
-
-Adjust the credit score in a context-dependent manner, based on the initial credit score ({inputs['initial_credit_score']}) and the analysis of the alternative data.
-
-Ensure that the report uses the same credit scale and format as the original credit report.
-
-In the financial summary section, include detailed numbers, preferably in tabular form, using the alternative data. Make sure these numbers are 100% accurate.
-
-In the summary section, only provide strong positive or negative information, or things that need to be monitored.
-
-Highlight recommendations for negative signals.
-
-**Color Coding for Changes:**
-
-- **Positive Changes**: Highlight in **green**.
-- **Negative Changes**: Highlight in **red**.
-- **Neutral Changes**: Highlight in **blue**.
-
-Use HTML `<span>` tags with inline CSS styles to apply the colors. For example:
+        # Encode the summary and base report compactly for prompts when requested
+        prompt_summary = data_summary_str
+        if compact_prompts:
+            prompt_summary = compact_summary(data_summary, horizon_months=horizon_months)
+            inputs['before_report'] = compact_markdown(before_report)
 
-- `<span style="color:green">Positive change text</span>`
-- `<span style="color:red">Negative change text</span>`
-- `<span style="color:blue">Neutral change text</span>`
+        # Escape curly braces in the summary
+        escaped_data_summary = escape_curly_braces(prompt_summary)
 
-Ensure that the summary section starts with the same format as the original report and includes the adjusted credit score.
+        # Compute ratio checks and threshold signals in Python when requested
+        signals = None
+        if deterministic:
+            signals = compute_signals(data_summary)
+            with st.expander('Deterministic signals'):
+                st.markdown(render_signals(signals))
 
-Be as deterministic as possible in presenting the findings.""",
-            verbose=False,
-            allow_delegation=False
-        )
+        # Build the agents, tasks and crew for this assessment; the copy gets its
+        # own agents so the tracing callbacks stay with this session
+        crew = build_credit_crew(inputs, escaped_data_summary, signals=signals).copy()
+        crew_tracer = instrument_crew(crew, tracer)
 
-        # Now define the tasks, including the escaped data summary
-        task1 = Task(
-            description=f"""Confirm receipt of the data and initiate the credit assessment process.
-Ensure that the team is fully aware of the key terms and dataset structure provided, and emphasize the importance of interpreting the data exactly as specified.
-All monetary values are in Indian Rupees (INR).
-
-Provide confirmation of data receipt and process initiation.""",
-            expected_output="Confirmation of data receipt and process initiation, with acknowledgment of data interpretation guidelines",
-            agent=credit_decision_manager
-        )
-
-        task2 = Task(
-            description=f"""Analyze the preprocessed financial data provided in 'data_summary' to calculate relevant metrics and prepare signals for determining creditworthiness.
-
-Data Summary:
-{escaped_data_summary}
-
-Ensure that you interpret the data exactly as specified, correctly apply the column relations in your analysis, and prepare signals and insights for determining creditworthiness.
-All monetary values are in Indian Rupees (INR).
-
-Be as deterministic as possible in your analysis.""",
-            expected_output="Analyzed data with relevant metrics calculated and insights extracted",
-            agent=data_ingestion_analyst
-        )
-
-        task3 = Task(
-            description=f"""Using the analyzed data from the Data Ingestion and Analyst Agent, evaluate the creditworthiness of the entity.
-
-Use precise financial metrics to assess credit risk accurately.
-
-All monetary values are in Indian Rupees (INR).
-
-Based on the analysis of the alternative data ('data_summary') and the initial credit score ({inputs['initial_credit_score']}), adjust the credit score in a context-dependent manner:
-
-- For companies with high initial scores (e.g., above 800), negative signals have a larger impact in decreasing the score, while positive signals have a smaller impact.
-- For companies with average initial scores (e.g., around 650-750), both positive and negative signals can affect the score significantly.
-- For companies with low initial scores (e.g., below 500), positive signals have a larger impact in increasing the score, while negative signals have a smaller impact.
-
-**Ensure that the adjusted credit score is modified by a maximum of ±25 points**.
-
-1. Adjusted credit score based on the context-dependent analysis.
-2. Conclusions and commentary based on the available data, focusing on what qualifies or disqualifies this business as credit-worthy.
-
-Incorporate the specific data provided in 'data_summary', ensuring that your assessment is accurate.
-
-Only use information derived from 'data_summary' for your evaluation.
-
-Do not include any information that is not provided in 'data_summary'.""",
-            expected_output="Detailed credit risk assessment report with conclusions and an adjusted credit score, based on the context-dependent analysis.",
-            agent=credit_risk_assessment
-        )
-
-        task4 = Task(
-            description=f"""Review the outputs from the Data Ingestion and Analyst Agent and the Credit Risk Assessment Agent.
-
-Verify that all calculations and analyses are 100% accurate and reliable.
-
-Ensure that the data interpretations and calculations adhere exactly to the specified dataset structure and key terms.
-
-Ensure that only information derived from 'data_summary' is included in the updated credit report.
-
-Confirm that no unnecessary or extraneous information is being passed to the updated credit report.
-
-Check that the financial summary section includes detailed numbers, preferably in tabular form, using the alternative data, and that these numbers are 100% accurate.
-
-Ensure that the summary section only provides strong positive or negative information, or things that need to be monitored.
-
-Confirm that recommendations are highlighted for negative signals.
-
-Ensure that the summary section starts with the same format as the original report and includes the adjusted credit score.
-
-Ensure that the adjusted credit score is appropriate given the initial credit score ({inputs['initial_credit_score']}) and the analysis.
-
-All monetary values are in Indian Rupees (INR).
-
-Provide deterministic validation of all computations.
-
-Confirm that the conclusions and adjusted credit score are justified based on the data.
-
-Ensure that the final report will meet the formatting and content requirements specified.""",
-            expected_output="Validation report confirming accuracy or identifying issues, with specific references to data interpretations and assessments. Ensure no unnecessary information is included, and that the report meets all specified requirements.",
-            agent=qa_agent
-        )
-
-        task5 = Task(
-            description=f"""Compile the validated findings into an updated credit report for stakeholders, incorporating the alternative data provided.
-
-The final report should be based on the following before version of the credit report:
-
-Before Credit Report:
-{inputs['before_report']}
-
-Update the report by including the alternative data from 'data_summary' and highlight the sections impacted by this data.
-
-Ensure that the updated report includes the following:
-
-- Use the same credit scale and format as the original credit report.
-- Adjust the credit score in a context-dependent manner, based on the initial credit score ({inputs['initial_credit_score']}) and the analysis of the alternative data.
-- In the financial summary section, include detailed numbers, preferably in tabular form, using the alternative data. Make sure these numbers are 100% accurate.
-- In the summary section, only provide strong positive or negative information, or things that need to be monitored.
-- Highlight recommendations for negative signals.
-- Ensure that the summary section starts with the same format as the original report and includes the adjusted credit score.
-- Only add information that can be derived from the 'data_summary'.
-- Do not include any information that is not provided in 'data_summary'.
-
-**Color Coding for Changes:**
-
-- **Positive Changes**: Highlight in **green**.
-- **Negative Changes**: Highlight in **red**.
-- **Neutral Changes**: Highlight in **blue**.
-
-**Implementation:**
-
-Use HTML `<span>` tags with inline CSS styles to apply the colors. For example:
-
-- `<span style="color:green">Positive change text</span>`
-- `<span style="color:red">Negative change text</span>`
-- `<span style="color:blue">Neutral change text</span>`
-
-Ensure that the summary section starts with the same format as the original report and includes the adjusted credit score.
-
-Be as deterministic as possible in presenting the findings.""",
-            expected_output="Updated credit report with sections impacted by alternative data highlighted using green for positive changes, red for negative changes, and blue for neutral changes, including a detailed financial summary with accurate numbers.",
-            agent=report_generation_agent
-        )
-
-        # Instantiate your crew with a sequential process
-        crew = Crew(
-            agents=[
-                credit_decision_manager,
-                data_ingestion_analyst,
-                credit_risk_assessment,
-                qa_agent,
-                report_generation_agent
-            ],
-            tasks=[task1, task2, task3, task4, task5],
-            verbose=True,
-            process=Process.sequential
-        )
+        # Report the prompt size of every task
+        token_report = prompt_tokens(crew)
+        with st.expander(f"Prompt tokens: {sum(row['total_tokens'] for row in token_report):,}"):
+            st.table(token_report)
 
         # Display a separator
         st.markdown('---')
 
-        # Display a loader message with time elapsed
-        status_text = st.empty()
-        start_time = time.time()
-        processing_complete = False
-        result = None
+        # Progress events are pushed from the crew thread as they happen
+        channel = attach_progress(crew, ProgressChannel())
 
-        # Function to run crew.kickoff()
-        def run_crew():
-            nonlocal result
+        # Optionally dispatch tasks as soon as the tasks they depend on are done
+        runner = None
+        if parallel_tasks:
+            runner = TaskGraphRunner(crew, on_task_start=crew_tracer.task_started)
+
+        # Function to run crew.kickoff(); queued jobs re-raise errors so the
+        # job is marked failed and a later submit retries it
+        def run_crew(reraise=False):
             try:
-                result = crew.kickoff(inputs=inputs)
+                with tracer.span('crew.kickoff'):
+                    crew_tracer.kickoff_started()
+                    result = (runner or crew).kickoff(inputs=inputs)
             except Exception as e:
                 result = f"An error occurred during processing: {e}"
-            finally:
-                nonlocal processing_complete
-                processing_complete = True
-
-        # Start the crew.kickoff() in a separate thread
-        processing_thread = threading.Thread(target=run_crew)
-        processing_thread.start()
-
-        # Update the status message with time elapsed
-        while not processing_complete:
-            elapsed_time = int(time.time() - start_time)
-            status_text.text(f"Processing... Time elapsed: {elapsed_time} seconds")
-            time.sleep(1)
-
-        # After processing is complete
-        total_time = int(time.time() - start_time)
-        status_text.text(f"Processing complete. Total time: {total_time} seconds")
-
-        # Display the after report
-        st.markdown('## Updated Credit Report')
-        st.markdown(result, unsafe_allow_html=True)
+                channel.finish(result)
+                if reraise:
+                    raise
+                return result
+            channel.finish(str(result))
+            return str(result)
+
+        if job_queue is not None:
+            # The same upload and options map to the same job, so a rerun or a
+            # second session attaches to it instead of kicking off another crew
+            job_id = job_id_for(company_name, digest, deterministic, compact_prompts, horizon_months, parallel_tasks)
+            limit_llm_concurrency(crew, job_queue.llm_limiter)
+            job = job_queue.submit(job_id, tenant, lambda job: run_crew(reraise=True), len(crew.tasks), channel=channel,
+                                   rerun=rerun)
+            channel = job.channel
+            st.query_params['job'] = job.job_id
+            render_queue_status(job_queue, job)
+        else:
+            # Start the crew.kickoff() in a separate thread
+            processing_thread = threading.Thread(target=run_crew)
+            processing_thread.start()
+
+        render_progress(channel, len(crew.tasks))
+
+        # Compare the critical path with running every task back to back
+        if runner is not None and runner.timings:
+            rows, totals = runner.report()
+            with st.expander(f"Critical path: {totals['wall_seconds']}s (sequential: {totals['sequential_seconds']}s)"):
+                st.table(rows)
+
+        # Show where the time went and keep the trace for offline analysis
+        tracer.export_jsonl()
+        with st.expander('Latency breakdown'):
+            render_waterfall(tracer)
+            st.download_button('Download trace (JSON lines)', tracer.to_jsonl(), file_name=f'{tracer.trace_id}.jsonl')
     else:
         st.warning("Please provide both the company name and upload the CSV file.")
 
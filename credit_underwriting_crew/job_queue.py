@@ -0,0 +1,270 @@
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from progress import ProgressChannel
+
+# Directory holding finished jobs, keyed by job id
+JOBS_DIR = 'jobs'
+
+# Defaults for the shared worker pool and the LLM concurrency cap
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_LLM_CALLS = 8
+
+# Pause applied to all LLM calls after the provider reports a rate limit
+RATE_LIMIT_COOLDOWN_SECONDS = 20
+
+# Number of recent jobs kept for wait-time statistics
+WAIT_TIME_WINDOW = 200
+
+# Finished jobs are reused for identical inputs this long, then rerun and deleted
+RESULT_TTL_SECONDS = int(os.getenv('CREDIT_JOB_RESULT_TTL_SECONDS', str(24 * 3600)))
+
+# Expired job files are swept at most this often
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+def job_id_for(*parts):
+    # Same inputs give the same id, so a resubmission attaches to the existing job
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+
+
+class LLMConcurrencyLimiter(BaseCallbackHandler):
+    """Caps concurrent LLM calls across every crew on the server.
+
+    LangChain invokes ``on_llm_start`` synchronously before sending a request,
+    so blocking there holds the call back until a slot frees up. A rate-limit
+    error from any call pauses new calls for ``cooldown_seconds``.
+    """
+
+    def __init__(self, max_concurrent=DEFAULT_MAX_LLM_CALLS, cooldown_seconds=RATE_LIMIT_COOLDOWN_SECONDS):
+        super().__init__()
+        self.max_concurrent = max_concurrent
+        self.cooldown_seconds = cooldown_seconds
+        self.in_flight = 0
+        self.rate_limited = 0
+        self._blocked_until = 0
+        self._run_ids = set()
+        self._condition = threading.Condition()
+
+    def _acquire(self, run_id):
+        with self._condition:
+            while True:
+                delay = self._blocked_until - time.time()
+                if delay <= 0 and self.in_flight < self.max_concurrent:
+                    break
+                self._condition.wait(timeout=delay if delay > 0 else None)
+            self.in_flight += 1
+            self._run_ids.add(run_id)
+
+    def _release(self, run_id):
+        with self._condition:
+            if run_id in self._run_ids:
+                self._run_ids.discard(run_id)
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._acquire(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._acquire(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._release(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        if 'ratelimit' in type(error).__name__.lower() or 'rate limit' in str(error).lower():
+            with self._condition:
+                self.rate_limited += 1
+                self._blocked_until = max(self._blocked_until, time.time() + self.cooldown_seconds)
+        self._release(run_id)
+
+
+def limit_llm_concurrency(crew, limiter):
+    for agent in crew.agents:
+        agent.callbacks = list(agent.callbacks or []) + [limiter]
+    return crew
+
+
+class Job:
+    def __init__(self, job_id, tenant, work, total_tasks, channel=None):
+        self.job_id = job_id
+        self.tenant = tenant
+        self.work = work
+        self.total_tasks = total_tasks
+        self.channel = channel or ProgressChannel()
+        self.status = 'queued'
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    def to_record(self):
+        return {
+            'job_id': self.job_id,
+            'tenant': self.tenant,
+            'status': self.status,
+            'total_tasks': self.total_tasks,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'result': self.result,
+            'error': self.error,
+            'events': self.channel.events,
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        job = cls(record['job_id'], record['tenant'], None, record['total_tasks'])
+        for key in ('status', 'submitted_at', 'started_at', 'finished_at', 'result', 'error'):
+            setattr(job, key, record[key])
+        job.channel.events = [tuple(event) for event in record['events']]
+        return job
+
+
+class JobQueue:
+    """Shared, bounded execution of credit crews for every session on the server.
+
+    Jobs wait in one queue per tenant and ``workers`` threads take them
+    round-robin across tenants, so a tenant uploading many files cannot starve
+    the others. Finished jobs are written to ``jobs_dir`` and looked up by id,
+    which lets a refreshed browser re-attach to a queued, running or finished
+    job instead of starting a new one. Finished jobs expire after
+    ``result_ttl_seconds``, when their files are deleted.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_llm_calls=DEFAULT_MAX_LLM_CALLS, jobs_dir=JOBS_DIR,
+                 result_ttl_seconds=RESULT_TTL_SECONDS):
+        self.jobs_dir = jobs_dir
+        self.result_ttl_seconds = result_ttl_seconds
+        self.llm_limiter = LLMConcurrencyLimiter(max_llm_calls)
+        self.jobs = {}
+        self.completed = 0
+        self._pending = collections.OrderedDict()
+        self._wait_times = collections.deque(maxlen=WAIT_TIME_WINDOW)
+        self._running = 0
+        self._pruned_at = 0
+        self._condition = threading.Condition()
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._prune()
+        for index in range(workers):
+            threading.Thread(target=self._worker, name=f'credit-job-worker-{index}', daemon=True).start()
+
+    def _path(self, job_id):
+        return os.path.join(self.jobs_dir, f'{job_id}.json')
+
+    def _get(self, job_id):
+        # Caller holds the condition, so a job cannot move from memory to disk meanwhile
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            with open(self._path(job_id)) as file:
+                return Job.from_record(json.load(file))
+        except FileNotFoundError:
+            return None
+
+    def get(self, job_id):
+        with self._condition:
+            return self._get(job_id)
+
+    def submit(self, job_id, tenant, work, total_tasks, channel=None, rerun=False):
+        """Queue ``work(job)`` unless a job with this id already exists; return the job.
+
+        A failed or expired job is queued again, and so is a finished one with
+        ``rerun``; a queued or running job is always returned as is.
+        """
+        with self._condition:
+            existing = self._get(job_id)
+            if existing is not None and existing.status in ('queued', 'running'):
+                return existing
+            fresh = existing is not None and time.time() - existing.finished_at < self.result_ttl_seconds
+            if fresh and existing.status == 'finished' and not rerun:
+                return existing
+            job = Job(job_id, tenant, work, total_tasks, channel)
+            self.jobs[job_id] = job
+            self._pending.setdefault(tenant, collections.deque()).append(job)
+            self._condition.notify()
+        return job
+
+    def _next_job(self):
+        # Take the head of the first tenant's queue, then move that tenant to the back
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending)
+            tenant, jobs = next(iter(self._pending.items()))
+            job = jobs.popleft()
+            del self._pending[tenant]
+            if jobs:
+                self._pending[tenant] = jobs
+            self._running += 1
+            return job
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            job.status = 'running'
+            job.started_at = time.time()
+            self._wait_times.append(job.started_at - job.submitted_at)
+            try:
+                job.result = job.work(job)
+                job.status = 'finished'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+                if not job.channel.finished:
+                    job.channel.finish(f"An error occurred during processing: {e}")
+            job.finished_at = time.time()
+            with self._condition:
+                self._persist(job)
+                self._running -= 1
+                self.completed += 1
+                self.jobs.pop(job.job_id, None)
+            if job.finished_at - self._pruned_at >= PRUNE_INTERVAL_SECONDS:
+                self._prune()
+
+    def _persist(self, job):
+        tmp_path = self._path(job.job_id) + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(job.to_record(), file)
+        os.replace(tmp_path, self._path(job.job_id))
+
+    def _prune(self):
+        # Delete the files of jobs finished longer than the TTL ago
+        self._pruned_at = time.time()
+        cutoff = self._pruned_at - self.result_ttl_seconds
+        with os.scandir(self.jobs_dir) as scan:
+            for dir_entry in scan:
+                try:
+                    if dir_entry.name.endswith('.json') and dir_entry.stat().st_mtime < cutoff:
+                        os.remove(dir_entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def position(self, job):
+        with self._condition:
+            queued = [queued_job for jobs in self._pending.values() for queued_job in jobs]
+        return queued.index(job) + 1 if job in queued else 0
+
+    def metrics(self):
+        with self._condition:
+            depth_by_tenant = {tenant: len(jobs) for tenant, jobs in self._pending.items()}
+            running = self._running
+            completed = self.completed
+        wait_times = sorted(self._wait_times)
+        return {
+            'queue_depth': sum(depth_by_tenant.values()),
+            'queue_depth_by_tenant': depth_by_tenant,
+            'running': running,
+            'completed': completed,
+            'llm_calls_in_flight': self.llm_limiter.in_flight,
+            'rate_limited_calls': self.llm_limiter.rate_limited,
+            'avg_wait_seconds': sum(wait_times) / len(wait_times) if wait_times else 0,
+            'p95_wait_seconds': wait_times[int(len(wait_times) * 0.95)] if wait_times else 0,
+        }
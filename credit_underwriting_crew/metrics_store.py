@@ -0,0 +1,102 @@
+import os
+import pickle
+import re
+
+import numpy as np
+import pandas as pd
+
+from parquet_store import iter_ingested
+from summary_metrics import DEFAULT_CHUNKSIZE, SUMMARY_SCHEMA_VERSION, SummaryAggregates, month_label, month_ordinals, prepare_frame
+
+# Directory holding one pickled metrics store per seller
+STORE_DIR = 'metrics_store'
+
+
+def seller_key(company_name):
+    return re.sub(r'[^a-z0-9]+', '_', company_name.lower()).strip('_')
+
+
+class IncrementalMetricsStore:
+    """Per-month partial aggregates for one seller, updated as new exports arrive.
+
+    Each month keeps its own mergeable ``SummaryAggregates`` (sums, counts,
+    per-SKU sales and discount counts, categories). Every month before the
+    latest one is closed and folded into ``closed``, so an update only re-reads
+    rows from the start of the latest (possibly partial) month onwards plus the
+    undated rows, and the summary is rebuilt from ``closed`` and the open
+    partials without touching older rows.
+
+    Exports are assumed to be append-only: rows dated before the open month are
+    never restated by a later export.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.schema_version = SUMMARY_SCHEMA_VERSION
+        self.closed = SummaryAggregates()
+        self.closed_months = []
+        self.open_month = None
+        self.open = SummaryAggregates()
+        self.undated = SummaryAggregates()
+
+    @classmethod
+    def for_seller(cls, company_name, store_dir=STORE_DIR):
+        path = os.path.join(store_dir, seller_key(company_name) + '.pkl')
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                store = pickle.load(file)
+            if store.schema_version == SUMMARY_SCHEMA_VERSION:
+                return store
+        return cls(path)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(self, file)
+        os.replace(tmp_path, self.path)
+
+    def _start_date(self):
+        if self.open_month is None:
+            return None
+        return pd.Timestamp(self.open_month + '-01')
+
+    def ingest(self, ingested_path, chunksize=DEFAULT_CHUNKSIZE):
+        """Fold the new rows of an ingested export into the store and return the summary."""
+        start_date = self._start_date()
+        months = {}
+        undated = SummaryAggregates()
+
+        # Only rows from the open month onwards (and undated rows) are read
+        chunks = iter_ingested(ingested_path, chunksize, start_date=start_date, include_undated=True)
+        for chunk in chunks:
+            chunk = prepare_frame(chunk)
+            ordinals = month_ordinals(chunk['Order Date'])
+            missing = np.isnan(ordinals)
+            if missing.any():
+                undated.update(chunk[missing])
+            dated = chunk[~missing]
+            for ordinal, part in dated.groupby(ordinals[~missing]):
+                label = month_label(ordinal)
+                months.setdefault(label, SummaryAggregates()).update(part)
+
+        # Undated rows cannot be attributed to a month, so they are replaced wholesale
+        self.undated = undated
+        if not months:
+            return self.summary()
+
+        # The previous open month is recomputed from the new export; every month
+        # before the newest one is now complete and gets folded into closed
+        labels = sorted(months)
+        for label in labels[:-1]:
+            self.closed.merge(months[label])
+            self.closed_months.append(label)
+        self.open_month = labels[-1]
+        self.open = months[labels[-1]]
+        return self.summary()
+
+    def aggregates(self):
+        return self.closed.copy().merge(self.open).merge(self.undated)
+
+    def summary(self):
+        return self.aggregates().to_summary()
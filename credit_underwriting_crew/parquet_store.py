@@ -0,0 +1,145 @@
+import hashlib
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from summary_cache import evict_lru
+from summary_metrics import DEFAULT_CHUNKSIZE, NUMERIC_COLUMNS, SOURCE_COLUMNS, TEXT_COLUMNS, read_csv_chunks
+
+# Directory holding typed Parquet copies of uploaded exports
+INGEST_DIR = 'ingested'
+
+# Total size of the ingested exports before least recently used ones are deleted
+DEFAULT_MAX_INGEST_BYTES = 4 * 1024 * 1024 * 1024
+
+PARQUET_SUFFIX = '.parquet'
+
+
+# SHA-256 of an uploaded file's bytes; the file position is restored afterwards
+def content_hash(file, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    if hasattr(file, 'getbuffer'):
+        digest.update(file.getbuffer())
+        return digest.hexdigest()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as handle:
+            for block in iter(lambda: handle.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    position = file.tell()
+    file.seek(0)
+    for block in iter(lambda: file.read(block_size), b''):
+        digest.update(block)
+    file.seek(position)
+    return digest.hexdigest()
+
+
+def is_ingested(file):
+    return isinstance(file, (str, os.PathLike)) and os.fspath(file).endswith(PARQUET_SUFFIX)
+
+
+def _export_schema(columns):
+    fields = [pa.field(col, pa.float64()) for col in NUMERIC_COLUMNS]
+    fields.append(pa.field('Order Date', pa.timestamp('ms')))
+    fields += [pa.field(col, pa.string()) for col in TEXT_COLUMNS if col in columns]
+    return pa.schema(fields)
+
+
+# Apply the numeric and date parsing once, at ingestion time
+def _type_chunk(chunk):
+    for col in NUMERIC_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = pd.to_numeric(chunk[col], errors='coerce').fillna(0).astype('float64')
+        else:
+            chunk[col] = 0.0
+    if 'Order Date' in chunk.columns:
+        chunk['Order Date'] = pd.to_datetime(chunk['Order Date'], format='%d/%m/%Y', errors='coerce')
+    else:
+        chunk['Order Date'] = pd.NaT
+    return chunk
+
+
+def ingest_csv(file, ingest_dir=INGEST_DIR, chunksize=DEFAULT_CHUNKSIZE, digest=None, max_bytes=DEFAULT_MAX_INGEST_BYTES):
+    """Convert an uploaded CSV export into a typed Parquet file and return its path.
+
+    The file is named by the content hash of the upload, so re-uploading the
+    same export reuses the existing conversion. Each CSV chunk becomes one row
+    group, whose Order Date statistics allow date filters to skip row groups.
+    Pass ``digest`` when the content hash is already known. Once the directory
+    exceeds ``max_bytes``, the least recently used conversions are deleted.
+    """
+    os.makedirs(ingest_dir, exist_ok=True)
+    path = os.path.join(ingest_dir, (digest or content_hash(file)) + PARQUET_SUFFIX)
+    try:
+        # Reuse refreshes the modification time the eviction order is based on
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    # Concurrent uploads of the same export each write their own temporary file
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    writer = None
+    try:
+        for chunk in read_csv_chunks(file, chunksize):
+            if writer is None:
+                schema = _export_schema(chunk.columns)
+                writer = pq.ParquetWriter(tmp_path, schema)
+            chunk = _type_chunk(chunk)[schema.names]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # Header-only export: write an empty file with the full schema
+        pq.write_table(_export_schema(SOURCE_COLUMNS).empty_table(), tmp_path)
+    os.replace(tmp_path, path)
+    evict_lru(ingest_dir, PARQUET_SUFFIX, max_bytes, keep=path)
+    return path
+
+
+def _date_filter(start_date, end_date, include_undated):
+    order_date = ds.field('Order Date')
+    expression = None
+    if start_date is not None:
+        expression = order_date >= pa.scalar(pd.Timestamp(start_date), pa.timestamp('ms'))
+    if end_date is not None:
+        upper = order_date <= pa.scalar(pd.Timestamp(end_date), pa.timestamp('ms'))
+        expression = upper if expression is None else expression & upper
+    if expression is not None and include_undated:
+        expression = expression | order_date.is_null()
+    return expression
+
+
+def _columns(path, columns):
+    available = pq.read_schema(path).names
+    return [col for col in (columns or SOURCE_COLUMNS) if col in available]
+
+
+def load_ingested(path, columns=None, start_date=None, end_date=None, include_undated=False):
+    """Read only the summary columns of an ingested export, optionally within a date range.
+
+    Rows without a valid Order Date fall outside any range unless
+    ``include_undated`` is set.
+    """
+    table = ds.dataset(path).to_table(
+        columns=_columns(path, columns),
+        filter=_date_filter(start_date, end_date, include_undated),
+    )
+    return table.to_pandas()
+
+
+def iter_ingested(path, chunksize=DEFAULT_CHUNKSIZE, columns=None, start_date=None, end_date=None, include_undated=False):
+    batches = ds.dataset(path).to_batches(
+        columns=_columns(path, columns),
+        filter=_date_filter(start_date, end_date, include_undated),
+        batch_size=chunksize,
+    )
+    for batch in batches:
+        yield batch.to_pandas()
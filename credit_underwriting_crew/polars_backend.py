@@ -0,0 +1,116 @@
+import pandas as pd
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+from parquet_store import is_ingested
+from summary_metrics import (
+    CHARGES_COLUMNS, DELIVERED_STATUS, NUMERIC_COLUMNS, RETURN_STATUSES, SUM_COLUMNS,
+    SummaryAggregates,
+)
+
+# Names of the compute backends the summary can be built with
+BACKENDS = ['pandas', 'polars'] if pl is not None else ['pandas']
+
+
+def _scan(path):
+    # Ingested Parquet is already typed; a CSV is read as text and coerced like prepare_frame
+    if is_ingested(path):
+        lf = pl.scan_parquet(path)
+        columns = lf.collect_schema().names()
+    else:
+        lf = pl.scan_csv(path, infer_schema=False)
+        columns = lf.collect_schema().names()
+        casts = [
+            pl.col(col).str.strip_chars().cast(pl.Float64, strict=False).fill_null(0)
+            for col in NUMERIC_COLUMNS if col in columns
+        ]
+        if 'Order Date' in columns:
+            casts.append(pl.col('Order Date').str.strptime(pl.Datetime('ms'), '%d/%m/%Y', strict=False))
+        lf = lf.with_columns(casts)
+
+    missing = [pl.lit(0.0).alias(col) for col in NUMERIC_COLUMNS if col not in columns]
+    if 'Order Date' not in columns:
+        missing.append(pl.lit(None, dtype=pl.Datetime('ms')).alias('Order Date'))
+    lf = lf.with_columns(missing).with_columns(
+        (pl.col('Output Gst') - pl.col('Input Credit Gst')).alias('Total Tax liability'),
+        pl.sum_horizontal(CHARGES_COLUMNS).alias('Total Charges/Fee'),
+        pl.max_horizontal([pl.col(col).abs() for col in CHARGES_COLUMNS]).alias('Biggest Charge/Fee'),
+    )
+    return lf, columns
+
+
+def polars_aggregates(path):
+    """Build ``SummaryAggregates`` for an export with Polars instead of pandas.
+
+    The totals, per-SKU and per-month group-bys are planned lazily and
+    collected together, so Polars scans the file once and spreads the work
+    over every core. The derived metrics (Pareto SKU count, growth series,
+    ratios) come from the same ``to_summary`` as the pandas path.
+    """
+    if pl is None:
+        raise ImportError('The polars backend needs the polars package installed')
+    lf, columns = _scan(path)
+    status = pl.col('Order Status').str.to_lowercase() if 'Order Status' in columns else pl.lit(None, dtype=pl.String)
+    is_return = status.is_in(RETURN_STATUSES).fill_null(False)
+
+    queries = [
+        lf.select(
+            pl.len().alias('orders'),
+            *[pl.col(col).sum() for col in SUM_COLUMNS],
+            is_return.sum().alias('returns'),
+            (status == DELIVERED_STATUS).fill_null(False).sum().alias('delivered'),
+            pl.col('Order Date').min().alias('min_date'),
+            pl.col('Order Date').max().alias('max_date'),
+        ),
+        lf.filter(pl.col('Order Date').is_not_null())
+        .group_by(pl.col('Order Date').dt.strftime('%Y-%m').alias('month'))
+        .agg(
+            pl.len().alias('orders'),
+            pl.col('Net Sales Excl Gst').sum().alias('sales'),
+            is_return.sum().alias('returned'),
+        ),
+    ]
+    if 'SKU ID' in columns:
+        queries.append(
+            lf.filter(pl.col('SKU ID').is_not_null())
+            .group_by('SKU ID')
+            .agg(
+                pl.col('Net Sales Excl Gst').sum().alias('sales'),
+                (pl.col('Total Discount') > 0).sum().alias('discounted'),
+            )
+        )
+    if 'Product Category' in columns:
+        queries.append(lf.select(pl.col('Product Category').drop_nulls().unique()))
+    results = pl.collect_all(queries, engine='streaming')
+
+    totals, by_month = results[0].row(0, named=True), results[1]
+    aggregates = SummaryAggregates()
+    aggregates.total_orders = totals['orders']
+    aggregates.column_sums = pd.Series([float(totals[col]) for col in SUM_COLUMNS], index=SUM_COLUMNS)
+    aggregates.total_returns = int(totals['returns'])
+    aggregates.total_delivered = int(totals['delivered'])
+    aggregates._update_dates(pd.Timestamp(totals['min_date']), pd.Timestamp(totals['max_date']))
+
+    months = by_month['month'].to_list()
+    aggregates.orders_per_month = pd.Series(by_month['orders'].to_numpy(), index=months, dtype='int64')
+    aggregates.net_sales_per_month = pd.Series(by_month['sales'].to_numpy(), index=months, dtype='float64')
+    aggregates.returns_per_month = pd.Series(by_month['returned'].to_numpy(), index=months, dtype='int64')
+
+    results = results[2:]
+    if 'SKU ID' in columns:
+        by_sku = results.pop(0)
+        skus = by_sku['SKU ID'].to_list()
+        aggregates.has_sku = True
+        aggregates.sku_sales = pd.Series(by_sku['sales'].to_numpy(), index=skus, dtype='float64')
+        aggregates.sku_discounted_orders = pd.Series(by_sku['discounted'].to_numpy(), index=skus, dtype='int64')
+    if 'Product Category' in columns:
+        aggregates.has_category = True
+        aggregates.categories = set(results.pop(0)['Product Category'].to_list())
+    return aggregates
+
+
+def polars_summary(path):
+    return polars_aggregates(path).to_summary()
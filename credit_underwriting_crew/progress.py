@@ -0,0 +1,93 @@
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Event kinds pushed through a ProgressChannel
+TASK_COMPLETED = 'task_completed'
+TOKEN = 'token'
+FINISHED = 'finished'
+
+# Marker the agents put before their final answer in streamed output
+FINAL_ANSWER_MARKER = 'Final Answer:'
+
+
+class ProgressChannel(BaseCallbackHandler):
+    """Pushes crew progress to the UI thread as events instead of being polled.
+
+    Producers (the crew thread) call ``task_completed`` and ``finish``, and the
+    LLM of the streaming agent reports tokens through ``on_llm_new_token``.
+    Events are kept in an append-only log, so any number of consumers can
+    iterate the channel from the start (e.g. a session re-attaching to a
+    running job); iteration blocks until the next event arrives and ends after
+    the ``FINISHED`` event.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.events = []
+        self._condition = threading.Condition()
+
+    def _put(self, kind, payload):
+        with self._condition:
+            self.events.append((kind, payload))
+            self._condition.notify_all()
+
+    def task_completed(self, output):
+        agent = getattr(output, 'agent', '') or ''
+        self._put(TASK_COMPLETED, {'agent': agent, 'output': str(output)})
+
+    def on_llm_new_token(self, token, **kwargs):
+        self._put(TOKEN, token)
+
+    def finish(self, result):
+        self._put(FINISHED, result)
+
+    @property
+    def finished(self):
+        return bool(self.events) and self.events[-1][0] == FINISHED
+
+    def __iter__(self):
+        position = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self.events) > position)
+                events = self.events[position:]
+            position += len(events)
+            for kind, payload in events:
+                yield kind, payload
+                if kind == FINISHED:
+                    return
+
+
+def attach_progress(crew, channel):
+    """Report every task completion to ``channel`` and stream the final task's tokens."""
+    previous_callback = crew.task_callback
+
+    def task_callback(output):
+        if previous_callback is not None:
+            previous_callback(output)
+        channel.task_completed(output)
+
+    crew.task_callback = task_callback
+
+    final_agent = crew.tasks[-1].agent
+    final_agent.callbacks = list(final_agent.callbacks or []) + [channel]
+    if hasattr(final_agent.llm, 'streaming'):
+        # Stream from a clone: copied agents share their LLM object with other
+        # crews. Streamed responses only report token usage with stream_usage
+        update = {'streaming': True}
+        if hasattr(final_agent.llm, 'stream_usage'):
+            update['stream_usage'] = True
+        copy = getattr(final_agent.llm, 'model_copy', None) or final_agent.llm.copy
+        final_agent.llm = copy(update=update)
+        if hasattr(final_agent, 'create_agent_executor'):
+            # The executor was built around the shared LLM
+            final_agent.create_agent_executor()
+    return channel
+
+
+def final_answer(text):
+    # Streamed text includes the agent's reasoning; show only the answer once it starts
+    if FINAL_ANSWER_MARKER in text:
+        return text.split(FINAL_ANSWER_MARKER, 1)[1].lstrip()
+    return text
@@ -0,0 +1,109 @@
+import json
+import math
+import re
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding('cl100k_base')
+except ImportError:
+    _ENCODING = None
+
+# Months of per-month series kept in compact prompts
+DEFAULT_HORIZON_MONTHS = 12
+
+# Decimal places kept for floats in compact prompts
+DEFAULT_FLOAT_DIGITS = 2
+
+# Characters per token when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text):
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _round_floats(value, digits):
+    if isinstance(value, float):
+        return value if math.isnan(value) or math.isinf(value) else round(value, digits)
+    if isinstance(value, dict):
+        return {k: _round_floats(v, digits) for k, v in value.items()}
+    return value
+
+
+def window_summary(summary, horizon_months=DEFAULT_HORIZON_MONTHS):
+    """Keep only the latest ``horizon_months`` entries of every per-month series.
+
+    Scalar metrics (including the average growth rates) still cover the full history.
+    """
+    windowed = {}
+    for key, value in summary.items():
+        if isinstance(value, dict) and len(value) > horizon_months:
+            months = sorted(value)[-horizon_months:]
+            value = {month: value[month] for month in months}
+        windowed[key] = value
+    return windowed
+
+
+def _format_cell(value):
+    if value is None:
+        return ''
+    return str(value)
+
+
+def summary_table(summary):
+    # Scalars as a metric/value table, then one table with a row per month
+    lines = ['| Metric | Value |', '|---|---|']
+    series = {}
+    for key, value in summary.items():
+        if isinstance(value, dict):
+            series[key] = value
+        else:
+            lines.append(f'| {key} | {_format_cell(value)} |')
+
+    months = sorted(set().union(*series.values())) if series else []
+    if months:
+        lines.append('')
+        lines.append('| Month | ' + ' | '.join(series) + ' |')
+        lines.append('|---' * (len(series) + 1) + '|')
+        for month in months:
+            cells = [_format_cell(values.get(month)) for values in series.values()]
+            lines.append(f'| {month} | ' + ' | '.join(cells) + ' |')
+    return '\n'.join(lines)
+
+
+def compact_summary(summary, horizon_months=DEFAULT_HORIZON_MONTHS, digits=DEFAULT_FLOAT_DIGITS, style='table'):
+    """Encode a JSON-native summary for prompts: windowed, rounded, and minified or tabular."""
+    months_total = max((len(v) for v in summary.values() if isinstance(v, dict)), default=0)
+    compact = _round_floats(window_summary(summary, horizon_months), digits)
+    if style == 'json':
+        text = json.dumps(compact, separators=(',', ':'))
+    else:
+        text = summary_table(compact)
+    if months_total > horizon_months:
+        text += f'\n\nPer-month series show the latest {horizon_months} of {months_total} months; averages cover the full history.'
+    return text
+
+
+def compact_markdown(text):
+    # Trailing whitespace and runs of blank lines carry no content for the model
+    text = re.sub(r'[ \t]+\n', '\n', text)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+
+def prompt_tokens(crew):
+    """Tokens in each task description and its agent's role, goal and backstory."""
+    report = []
+    for task in crew.tasks:
+        agent = task.agent
+        agent_text = '\n'.join([agent.role, agent.goal, agent.backstory]) if agent else ''
+        description_tokens = count_tokens(task.description)
+        agent_tokens = count_tokens(agent_text)
+        report.append({
+            'agent': agent.role if agent else '',
+            'description_tokens': description_tokens,
+            'agent_tokens': agent_tokens,
+            'total_tokens': description_tokens + agent_tokens,
+        })
+    return report
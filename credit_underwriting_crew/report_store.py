@@ -0,0 +1,198 @@
+import difflib
+import json
+import os
+import re
+import threading
+import time
+
+# Directory of bureau reports and the index built over it
+REPORTS_DIR = 'reports'
+INDEX_FILE = 'report_index.json'
+
+# Bump when the index entry layout changes so stale indexes are rebuilt
+INDEX_VERSION = 1
+
+# Report files are named '<Company>_Credit_Report.md'
+REPORT_SUFFIX = '_Credit_Report.md'
+
+# Minimum similarity for a company name to be offered as a suggestion
+SUGGESTION_CUTOFF = 0.6
+
+# Lookup misses rescan the reports directory at most this often
+REFRESH_INTERVAL_SECONDS = 30
+
+# Account for '**' surrounding "Credit Score"
+CREDIT_SCORE_PATTERN = re.compile(r"\*\*Credit Score:\*\*\s*(\d+)\s*\((.*?)\)")
+COMPANY_NAME_PATTERN = re.compile(r"\*\*Company(?: Name)?:\*\*\s*(.+)")
+
+# Legal-form words that do not distinguish one company from another
+LEGAL_SUFFIXES = {'pvt', 'private', 'ltd', 'limited', 'llp', 'inc', 'the'}
+
+
+def _words(name):
+    return re.sub(r'[^a-z0-9]+', ' ', name.lower()).split()
+
+
+def normalise_company(name):
+    # 'Good Corp Pvt. Ltd.', 'good corp private limited' and 'Good_Corp' share a key
+    return ' '.join(word for word in _words(name) if word not in LEGAL_SUFFIXES)
+
+
+def _full_name(name):
+    # Keeps the legal form, to tell apart entities sharing a normalised key
+    return ' '.join(_words(name))
+
+
+def _unique_keys(entries, key_func):
+    # Maps each key to its report path, and keys naming several reports to all of them
+    paths_by_key = {}
+    for path, entry in entries.items():
+        for name in entry['names']:
+            paths_by_key.setdefault(key_func(name), set()).add(path)
+    unique = {key: paths.pop() for key, paths in paths_by_key.items() if len(paths) == 1}
+    ambiguous = {key: sorted(paths) for key, paths in paths_by_key.items() if len(paths) > 1}
+    return unique, ambiguous
+
+
+def extract_credit_score(report):
+    match = CREDIT_SCORE_PATTERN.search(report)
+    if match:
+        return match.group(1), match.group(2)
+    return None, None
+
+
+def _index_file(path):
+    with open(path, 'r') as file:
+        report = file.read()
+    score, rating = extract_credit_score(report)
+    filename = os.path.basename(path)
+    stem = filename[:-len(REPORT_SUFFIX)] if filename.endswith(REPORT_SUFFIX) else os.path.splitext(filename)[0]
+    names = [stem.replace('_', ' ')]
+    match = COMPANY_NAME_PATTERN.search(report)
+    if match:
+        names.append(match.group(1).strip())
+    stat = os.stat(path)
+    return {
+        'path': path,
+        'names': names,
+        'score': score,
+        'rating': rating,
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+    }
+
+
+class ReportStore:
+    """Index of base credit reports keyed by normalised company name.
+
+    Scores and ratings are extracted when a report is indexed, so a lookup is a
+    dict access and the report text is only read by ``read``. The index is
+    persisted to ``index_path`` and on load only new or modified report files
+    are parsed again. A name whose normalised key belongs to several reports
+    ('ABC Traders LLP' and 'ABC Traders Pvt Ltd') only matches by its full name.
+
+    The store is shared across sessions: ``refresh`` and ``save`` hold a lock,
+    and ``refresh`` swaps in new dicts rather than mutating the ones a lookup
+    may be reading.
+    """
+
+    def __init__(self, reports_dir=REPORTS_DIR, index_path=INDEX_FILE):
+        self.reports_dir = reports_dir
+        self.index_path = index_path
+        self.entries = {}
+        self.keys = {}
+        self.ambiguous = {}
+        self.full_keys = {}
+        self.refreshed_at = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, reports_dir=REPORTS_DIR, index_path=INDEX_FILE):
+        store = cls(reports_dir, index_path)
+        try:
+            with open(index_path) as file:
+                index = json.load(file)
+            if index.get('version') == INDEX_VERSION:
+                store.entries = index['entries']
+        except FileNotFoundError:
+            pass
+        if store.refresh():
+            store.save()
+        return store
+
+    def refresh(self, min_interval=0):
+        """Re-index added or modified reports and drop deleted ones; returns whether anything changed.
+
+        Skipped when the last refresh was less than ``min_interval`` seconds ago.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.refreshed_at is not None and now - self.refreshed_at < min_interval:
+                return False
+            self.refreshed_at = now
+            entries = dict(self.entries)
+            changed = False
+            seen = set()
+            if os.path.isdir(self.reports_dir):
+                with os.scandir(self.reports_dir) as scan:
+                    for dir_entry in scan:
+                        if not dir_entry.is_file() or not dir_entry.name.endswith('.md'):
+                            continue
+                        seen.add(dir_entry.path)
+                        stat = dir_entry.stat()
+                        entry = entries.get(dir_entry.path)
+                        if entry is None or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+                            entries[dir_entry.path] = _index_file(dir_entry.path)
+                            changed = True
+            for path in set(entries) - seen:
+                del entries[path]
+                changed = True
+            keys, ambiguous = _unique_keys(entries, normalise_company)
+            full_keys, _ = _unique_keys(entries, _full_name)
+            self.entries, self.keys, self.ambiguous, self.full_keys = entries, keys, ambiguous, full_keys
+            return changed
+
+    def save(self):
+        with self._lock:
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w') as file:
+                json.dump({'version': INDEX_VERSION, 'entries': self.entries}, file)
+            os.replace(tmp_path, self.index_path)
+
+    def lookup(self, company_name):
+        """Index entry for ``company_name``, matched exactly on the normalised name.
+
+        Returns None when the name is unknown, or when it is shared by several
+        reports and ``company_name`` is not the full name of one of them.
+        """
+        # Near misses such as 'abc traders' / 'abd traders' are different
+        # sellers, so they are only offered through ``suggestions``
+        key = normalise_company(company_name)
+        path = self.keys.get(key)
+        if path is None and key in self.ambiguous:
+            path = self.full_keys.get(_full_name(company_name))
+        if path is None:
+            return None
+        # ``refresh`` swaps in the entries before the keys, so a path read
+        # from the keys is only missing here if its report was just deleted
+        return self.entries.get(path)
+
+    def is_ambiguous(self, company_name):
+        """Whether ``company_name`` normalises to a key shared by several reports."""
+        return normalise_company(company_name) in self.ambiguous
+
+    def suggestions(self, company_name, n=3):
+        key = normalise_company(company_name)
+        if key in self.ambiguous:
+            # Every legal entity sharing the name; the user picks one by its full name
+            return [self.entries[path]['names'][-1] for path in self.ambiguous[key]]
+        matches = difflib.get_close_matches(key, list(self.keys) + list(self.ambiguous), n=n, cutoff=SUGGESTION_CUTOFF)
+        suggestions = []
+        for match in matches:
+            paths = [self.keys[match]] if match in self.keys else self.ambiguous[match]
+            suggestions += [self.entries[path]['names'][-1] for path in paths]
+        return suggestions
+
+    def read(self, entry):
+        with open(entry['path'], 'r') as file:
+            return file.read()
@@ -0,0 +1,109 @@
+import os
+import threading
+
+from summary_metrics import SUMMARY_SCHEMA_VERSION
+
+# Directory holding cached data summaries
+CACHE_DIR = 'summary_cache'
+
+# Total size the cache may occupy before least recently used entries are evicted
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+CACHE_SUFFIX = '.json'
+
+
+def lru_entries(directory, suffix):
+    # (mtime, size, name) of the files in ``directory`` ending with ``suffix``
+    entries = []
+    for name in os.listdir(directory):
+        if not name.endswith(suffix):
+            continue
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+    return entries
+
+
+def evict_lru(directory, suffix, max_bytes, keep=None):
+    """Delete the least recently used ``suffix`` files until ``directory`` holds at most ``max_bytes``.
+
+    The file at ``keep``, e.g. one just written, is never deleted.
+    """
+    entries = sorted(lru_entries(directory, suffix))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in entries:
+        if total <= max_bytes:
+            break
+        path = os.path.join(directory, name)
+        if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+class SummaryCache:
+    """On-disk cache of serialised data summaries keyed by upload content hash.
+
+    Entries are the JSON text sent to the agents, stored under
+    ``<key>-v<schema version>.json`` so a metrics change never serves a
+    stale summary; the app's key is the upload hash plus the summary backend.
+    Reads refresh an entry's modification time, and writes evict
+    the least recently used entries once the cache exceeds ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, schema_version=SUMMARY_SCHEMA_VERSION):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.schema_version = schema_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, f'{digest}-v{self.schema_version}{CACHE_SUFFIX}')
+
+    def get(self, digest):
+        path = self._path(digest)
+        try:
+            with open(path, 'r') as file:
+                summary_str = file.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another session since the read; the summary is still valid
+            pass
+        with self._lock:
+            self.hits += 1
+        return summary_str
+
+    def put(self, digest, summary_str):
+        path = self._path(digest)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as file:
+            file.write(summary_str)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        evict_lru(self.cache_dir, CACHE_SUFFIX, self.max_bytes)
+
+    def stats(self):
+        entries = lru_entries(self.cache_dir, CACHE_SUFFIX)
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+        }
@@ -0,0 +1,88 @@
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+# Function to escape curly braces in strings
+def escape_curly_braces(s):
+    return s.replace('{', '{{').replace('}', '}}')
+
+# Function to convert NumPy and pandas types to native Python types
+def convert_numpy_types(obj):
+    if isinstance(obj, dict):
+        return {convert_numpy_types(k): convert_numpy_types(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_numpy_types(v) for v in obj]
+    elif isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, pd.Period):
+        return str(obj)
+    elif pd.isna(obj):
+        return None
+    else:
+        return obj
+
+
+# Typed serialisation: summary values are converted per type in bulk instead of
+# walking every leaf. Output matches convert_numpy_types exactly: missing values
+# inside series become None, NumPy scalars become the equivalent Python scalar.
+
+def series_to_json(series):
+    keys = series.index.astype(str).tolist()
+    values = series.tolist()
+    if series.dtype.kind == 'f' and series.isna().any():
+        values = [None if value != value else value for value in values]
+    return dict(zip(keys, values))
+
+
+def scalar_to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def summary_to_json(summary):
+    """Convert a summary of scalars and pandas Series into JSON-native values."""
+    return {
+        key: series_to_json(value) if isinstance(value, pd.Series) else scalar_to_json(value)
+        for key, value in summary.items()
+    }
+
+
+def _is_container(value):
+    return isinstance(value, (dict, list))
+
+
+def _dumps(value, indent, level):
+    if not _is_container(value) or not value:
+        return json.dumps(value)
+    values = value.values() if isinstance(value, dict) else value
+    inner_pad = '\n' + ' ' * (indent * (level + 1))
+    outer_pad = '\n' + ' ' * (indent * level)
+    if any(_is_container(item) for item in values):
+        if isinstance(value, dict):
+            items = [json.dumps(key) + ': ' + _dumps(item, indent, level + 1) for key, item in value.items()]
+            return '{' + inner_pad + (',' + inner_pad).join(items) + outer_pad + '}'
+        items = [_dumps(item, indent, level + 1) for item in value]
+        return '[' + inner_pad + (',' + inner_pad).join(items) + outer_pad + ']'
+    # Leaf container: let the C encoder lay out every item, using the
+    # indentation of this level as the item separator
+    text = json.dumps(value, separators=(',' + inner_pad, ': '))
+    return text[0] + inner_pad + text[1:-1] + outer_pad + text[-1]
+
+
+def dumps_summary(summary, indent=4):
+    """Same text as ``json.dumps(summary, indent=indent)`` for a JSON-native summary.
+
+    ``json.dumps`` falls back to its pure-Python encoder whenever ``indent`` is
+    set; here only the nesting levels are walked in Python and every leaf dict
+    is encoded by the C encoder in one call.
+    """
+    return _dumps(summary, indent, 0)
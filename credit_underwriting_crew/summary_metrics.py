@@ -0,0 +1,351 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from summary_json import summary_to_json
+
+# Columns coerced to numeric before any metric is computed
+NUMERIC_COLUMNS = [
+    'Shipping Discount', 'Self Discount', 'Total Discount', 'Net Sales Excl Gst',
+    'Delivered Charges Excl Gst', 'Returned Charges Excl Gst',
+    'Free Replacement Charges Excl Gst', 'Indirect Charges Excl Gst',
+    'Net Revenue Excl Gst', 'Output Gst', 'Input Credit Gst',
+    'Listing Gmv', 'TCS', 'TDS'
+]
+
+# Charge columns that make up Total Charges/Fee
+CHARGES_COLUMNS = [
+    'Delivered Charges Excl Gst',
+    'Returned Charges Excl Gst',
+    'Free Replacement Charges Excl Gst',
+    'Indirect Charges Excl Gst'
+]
+
+# Text columns read from the export (kept as strings so chunks agree on types)
+TEXT_COLUMNS = ['Order Status', 'SKU ID', 'Product Category']
+
+# Every column of the export that the summary reads
+SOURCE_COLUMNS = NUMERIC_COLUMNS + ['Order Date'] + TEXT_COLUMNS
+
+# Column totals tracked for the summary, including derived columns
+SUM_COLUMNS = NUMERIC_COLUMNS + ['Total Tax liability', 'Total Charges/Fee', 'Biggest Charge/Fee']
+
+RETURN_STATUSES = ['returned', 'free_replacement']
+DELIVERED_STATUS = 'delivered'
+
+# Bump whenever summary keys or metric definitions change; cached summaries are keyed on it
+SUMMARY_SCHEMA_VERSION = 1
+
+# Rows per chunk when streaming an export
+DEFAULT_CHUNKSIZE = 500_000
+
+
+def prepare_frame(df):
+    # Ensure correct data types for numeric columns
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        else:
+            df[col] = 0
+
+    # Ensure date columns are in datetime format with specified date format
+    if 'Order Date' in df.columns:
+        df['Order Date'] = pd.to_datetime(df['Order Date'], format='%d/%m/%Y', errors='coerce')
+    else:
+        df['Order Date'] = pd.NaT
+
+    # Calculate Total Discount if not present
+    if df['Total Discount'].isnull().all():
+        df['Total Discount'] = df['Self Discount'] + df['Shipping Discount']
+
+    # Derived columns
+    df['Total Tax liability'] = df['Output Gst'] - df['Input Credit Gst']
+    df['Total Charges/Fee'] = df[CHARGES_COLUMNS].sum(axis=1)
+    df['Biggest Charge/Fee'] = df[CHARGES_COLUMNS].abs().max(axis=1)
+    return df
+
+
+# Status classes used by the fused engine
+STATUS_OTHER, STATUS_RETURNED, STATUS_DELIVERED = 0, 1, 2
+
+
+def status_codes(status):
+    # Normalise the (low-cardinality) status column once via its categories
+    # instead of lower-casing every row for each metric that needs it
+    categorical = status.astype('category')
+    lowered = categorical.cat.categories.astype(str).str.lower()
+    category_class = np.select(
+        [lowered.isin(RETURN_STATUSES), lowered == DELIVERED_STATUS],
+        [STATUS_RETURNED, STATUS_DELIVERED],
+        STATUS_OTHER,
+    ).astype(np.int8)
+    # Code -1 (missing status) indexes the trailing STATUS_OTHER entry
+    category_class = np.append(category_class, np.int8(STATUS_OTHER))
+    return category_class[categorical.cat.codes.to_numpy()]
+
+
+def month_ordinals(dates):
+    # Months since 1970-01 as float, NaN where the date is missing
+    months = dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[M]')
+    ordinals = months.astype('int64').astype('float64')
+    ordinals[np.isnat(months)] = np.nan
+    return ordinals
+
+
+def grouped_sums(keys, **values):
+    # Factorize the key column once, then reduce every value column against the
+    # same codes with bincount; missing keys are dropped as groupby would
+    codes, uniques = pd.factorize(keys)
+    valid = codes >= 0
+    if not valid.all():
+        codes = codes[valid]
+        values = {name: column[valid] for name, column in values.items()}
+    columns = {'orders': np.bincount(codes, minlength=len(uniques))}
+    for name, column in values.items():
+        columns[name] = np.bincount(codes, weights=column, minlength=len(uniques))
+    return pd.DataFrame(columns, index=uniques)
+
+
+def month_label(ordinal):
+    ordinal = int(ordinal)
+    return f'{ordinal // 12 + 1970:04d}-{ordinal % 12 + 1:02d}'
+
+
+# Add two month/SKU indexed series, treating missing keys as zero
+def _add_series(left, right):
+    if left.empty:
+        return right
+    if right.empty:
+        return left
+    return left.add(right, fill_value=0)
+
+
+class SummaryAggregates:
+    """Mergeable running totals from which the full data summary is derived.
+
+    Memory is bounded by the number of distinct months, SKUs and categories,
+    not by the number of order rows fed through ``update``.
+    """
+
+    def __init__(self):
+        self.total_orders = 0
+        self.column_sums = pd.Series(0.0, index=SUM_COLUMNS)
+        self.total_returns = 0
+        self.total_delivered = 0
+        self.min_order_date = pd.NaT
+        self.max_order_date = pd.NaT
+        self.has_sku = False
+        self.has_category = False
+        # Per-SKU net sales and number of discounted orders
+        self.sku_sales = pd.Series(dtype='float64')
+        self.sku_discounted_orders = pd.Series(dtype='int64')
+        self.categories = set()
+        # Per-month series keyed by 'YYYY-MM'
+        self.orders_per_month = pd.Series(dtype='int64')
+        self.net_sales_per_month = pd.Series(dtype='float64')
+        self.returns_per_month = pd.Series(dtype='int64')
+
+    def update(self, df):
+        """Fold a frame already passed through ``prepare_frame`` into the totals.
+
+        Every metric comes out of one reduction over the summed columns and a
+        single grouped reduction per key (month, SKU), so each column is scanned
+        once. The metric groups are separate steps so they can be timed alone.
+        """
+        is_return = self.update_totals(df)
+        self.update_skus(df)
+        self.update_categories(df)
+        self.update_months(df, is_return)
+        return self
+
+    # Column sums, order status counts and the date range; returns the per-row return mask
+    def update_totals(self, df):
+        self.total_orders += len(df)
+        self.column_sums += df[SUM_COLUMNS].sum()
+
+        if 'Order Status' in df.columns:
+            codes = status_codes(df['Order Status'])
+            is_return = codes == STATUS_RETURNED
+            self.total_returns += int(is_return.sum())
+            self.total_delivered += int((codes == STATUS_DELIVERED).sum())
+        else:
+            is_return = np.zeros(len(df), dtype=bool)
+
+        self._update_dates(df['Order Date'].min(), df['Order Date'].max())
+        return is_return
+
+    # Per-SKU net sales and discounted orders, for the SKU coverage and Pareto metrics
+    def update_skus(self, df):
+        if 'SKU ID' in df.columns:
+            self.has_sku = True
+            by_sku = grouped_sums(
+                df['SKU ID'],
+                sales=df['Net Sales Excl Gst'].to_numpy(),
+                discounted=df['Total Discount'].to_numpy() > 0,
+            )
+            self.sku_sales = _add_series(self.sku_sales, by_sku['sales'])
+            self.sku_discounted_orders = _add_series(self.sku_discounted_orders, by_sku['discounted'].astype('int64'))
+
+    def update_categories(self, df):
+        if 'Product Category' in df.columns:
+            self.has_category = True
+            self.categories.update(df['Product Category'].dropna().unique())
+
+    # Orders, net sales and returns per month, for the growth series
+    def update_months(self, df, is_return):
+        months = month_ordinals(df['Order Date'])
+        if not np.isnan(months).all():
+            by_month = grouped_sums(months, sales=df['Net Sales Excl Gst'].to_numpy(), returned=is_return)
+            by_month.index = [month_label(month) for month in by_month.index]
+            self.orders_per_month = _add_series(self.orders_per_month, by_month['orders'])
+            self.net_sales_per_month = _add_series(self.net_sales_per_month, by_month['sales'])
+            self.returns_per_month = _add_series(self.returns_per_month, by_month['returned'].astype('int64'))
+
+    def merge(self, other):
+        """Combine another set of aggregates into this one."""
+        self.total_orders += other.total_orders
+        self.column_sums += other.column_sums
+        self.total_returns += other.total_returns
+        self.total_delivered += other.total_delivered
+        self._update_dates(other.min_order_date, other.max_order_date)
+        self.has_sku = self.has_sku or other.has_sku
+        self.has_category = self.has_category or other.has_category
+        self.sku_sales = _add_series(self.sku_sales, other.sku_sales)
+        self.sku_discounted_orders = _add_series(self.sku_discounted_orders, other.sku_discounted_orders)
+        self.categories |= other.categories
+        self.orders_per_month = _add_series(self.orders_per_month, other.orders_per_month)
+        self.net_sales_per_month = _add_series(self.net_sales_per_month, other.net_sales_per_month)
+        self.returns_per_month = _add_series(self.returns_per_month, other.returns_per_month)
+        return self
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    def _update_dates(self, min_date, max_date):
+        if pd.notnull(min_date) and (pd.isnull(self.min_order_date) or min_date < self.min_order_date):
+            self.min_order_date = min_date
+        if pd.notnull(max_date) and (pd.isnull(self.max_order_date) or max_date > self.max_order_date):
+            self.max_order_date = max_date
+
+    def to_summary(self):
+        """Build the ``summary`` dict, already converted to JSON-native values."""
+        sums = self.column_sums
+        total_orders = self.total_orders
+        total_net_sales = sums['Net Sales Excl Gst']
+
+        def pct_of_sales(value):
+            return (value / total_net_sales * 100) if total_net_sales > 0 else 0
+
+        average_order_value = total_net_sales / total_orders if total_orders > 0 else 0
+
+        # SKUs discount coverage and SKUs contributing to 80% of sales
+        if self.has_sku:
+            total_skus = len(self.sku_sales)
+            skus_with_discount = int((self.sku_discounted_orders > 0).sum())
+            skus_discount_coverage = (skus_with_discount / total_skus * 100) if total_skus > 0 else 0
+            sku_sales_sorted = self.sku_sales.sort_values(ascending=False)
+            cumulative_sales = sku_sales_sorted.cumsum()
+            total_sales = sku_sales_sorted.sum()
+            skus_contributing_80_percent_sales = cumulative_sales[cumulative_sales <= 0.8 * total_sales].count()
+        else:
+            total_skus = 0
+            skus_discount_coverage = 0
+            skus_contributing_80_percent_sales = 0
+
+        # Self Discount and Shipping Discount ratio
+        total_self_discount = sums['Self Discount']
+        total_shipping_discount = sums['Shipping Discount']
+        total_discounts = total_self_discount + total_shipping_discount
+        self_discount_ratio = (total_self_discount / total_discounts * 100) if total_discounts > 0 else 0
+        shipping_discount_ratio = (total_shipping_discount / total_discounts * 100) if total_discounts > 0 else 0
+
+        return_rate = (self.total_returns / total_orders * 100) if total_orders > 0 else 0
+        delivery_rate = (self.total_delivered / total_orders * 100) if total_orders > 0 else 0
+
+        # Active days (business transaction period)
+        if pd.notnull(self.min_order_date) and pd.notnull(self.max_order_date):
+            days_active = (self.max_order_date - self.min_order_date).days + 1
+        else:
+            days_active = 0
+
+        # Order and Net Sales Growth over Months
+        if not self.orders_per_month.empty:
+            orders_per_month = self.orders_per_month.sort_index().astype('int64')
+            net_sales_per_month = self.net_sales_per_month.sort_index()
+            returns_per_month = self.returns_per_month.sort_index()
+            order_growth = orders_per_month.pct_change().fillna(0) * 100
+            net_sales_growth = net_sales_per_month.pct_change().fillna(0) * 100
+            average_order_growth = order_growth.mean()
+            average_net_sales_growth = net_sales_growth.mean()
+            return_rate_per_month = (returns_per_month / orders_per_month * 100).fillna(0)
+        else:
+            average_order_growth = 0
+            average_net_sales_growth = 0
+            orders_per_month = pd.Series(dtype='float64')
+            net_sales_per_month = pd.Series(dtype='float64')
+            order_growth = pd.Series(dtype='float64')
+            net_sales_growth = pd.Series(dtype='float64')
+            return_rate_per_month = pd.Series(dtype='float64')
+
+        summary = {
+            'Total Discount Sum (INR)': sums['Total Discount'],
+            'Total Tax Liability Sum (INR)': sums['Total Tax liability'],
+            'Total Charges/Fee Sum (INR)': sums['Total Charges/Fee'],
+            'Average Biggest Charge/Fee (INR)': sums['Biggest Charge/Fee'] / total_orders if total_orders > 0 else np.nan,
+            'Total Net Sales Excl Gst (INR)': total_net_sales,
+            'Total Net Revenue Excl Gst (INR)': sums['Net Revenue Excl Gst'],
+            'Total Listing Gmv (INR)': sums['Listing Gmv'],
+            'Total Orders': total_orders,
+            'Average Order Value (INR)': average_order_value,
+            'Discount Percentage': pct_of_sales(sums['Total Discount']),
+            'SKUs Discount Coverage Percentage': skus_discount_coverage,
+            'Self Discount Ratio': self_discount_ratio,
+            'Shipping Discount Ratio': shipping_discount_ratio,
+            'Return Rate': return_rate,
+            'Cost of Return Percentage': pct_of_sales(sums['Returned Charges Excl Gst']),
+            'Logistics Cost Percentage': pct_of_sales(sums['Delivered Charges Excl Gst']),
+            'SKUs Contributing 80% of Sales': skus_contributing_80_percent_sales,
+            'Days Active': days_active,
+            'Total SKUs': total_skus,
+            'Total Categories': len(self.categories) if self.has_category else 0,
+            'Average Monthly Order Growth (%)': average_order_growth,
+            'Average Monthly Net Sales Growth (%)': average_net_sales_growth,
+            'Orders Per Month': orders_per_month,
+            'Net Sales Per Month (INR)': net_sales_per_month,
+            'Order Growth Rate Per Month (%)': order_growth,
+            'Net Sales Growth Rate Per Month (%)': net_sales_growth,
+            'Return Rate Per Month (%)': return_rate_per_month,
+            'Cost of Doing Business Percentage': pct_of_sales(sums['Total Charges/Fee']),
+            'Total Tax Liability Percentage': pct_of_sales(sums['Total Tax liability']),
+            'TCS Sum (INR)': sums['TCS'],
+            'TCS Percentage': pct_of_sales(sums['TCS']),
+            'TDS Sum (INR)': sums['TDS'],
+            'TDS Percentage': pct_of_sales(sums['TDS']),
+            'Profit Margin Percentage': pct_of_sales(sums['Net Revenue Excl Gst']),
+            'Delivery Rate': delivery_rate,
+        }
+        return summary_to_json(summary)
+
+
+# Read an export in chunks, keeping only the columns the summary uses
+def read_csv_chunks(file, chunksize=DEFAULT_CHUNKSIZE):
+    return pd.read_csv(
+        file,
+        chunksize=chunksize,
+        usecols=lambda col: col in SOURCE_COLUMNS,
+        dtype={col: str for col in TEXT_COLUMNS},
+    )
+
+
+# Fold a sequence of raw frames into a single summary
+def summarize_chunks(chunks):
+    aggregates = SummaryAggregates()
+    for chunk in chunks:
+        aggregates.update(prepare_frame(chunk))
+    return aggregates.to_summary()
+
+
+# Streaming aggregation: reads the export in chunks so memory stays flat as the file grows
+def stream_summary(file, chunksize=DEFAULT_CHUNKSIZE):
+    return summarize_chunks(read_csv_chunks(file, chunksize))
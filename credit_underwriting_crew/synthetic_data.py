@@ -0,0 +1,101 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from summary_metrics import NUMERIC_COLUMNS
+
+ORDER_STATUSES = ['Delivered', 'Returned', 'Free_Replacement', 'Cancelled', 'Shipped']
+ORDER_STATUS_WEIGHTS = [0.75, 0.1, 0.03, 0.07, 0.05]
+PRODUCT_CATEGORIES = ['Apparel', 'Footwear', 'Electronics', 'Home', 'Beauty', 'Toys', 'Books', 'Grocery']
+
+# Rows generated per chunk when writing large exports to disk
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+# Generate a synthetic marketplace export with the columns preprocess_financial_data reads
+def generate_export(rows, seed=0, skus=None, start_date='2022-01-01', days=730):
+    return _generate(np.random.default_rng(seed), rows, skus or max(rows // 50, 10), start_date, days, 0, days)
+
+
+# Orders are spread over days [first_day, last_day) of the date pool, sorted by date
+def _generate(rng, rows, skus, start_date, days, first_day, last_day):
+
+    net_sales = np.round(rng.lognormal(6.5, 0.8, rows), 2)
+    discounted = rng.random(rows) < 0.4
+    self_discount = np.round(np.where(discounted, net_sales * rng.uniform(0, 0.2, rows), 0), 2)
+    shipping_discount = np.round(np.where(discounted, rng.uniform(0, 40, rows), 0), 2)
+    output_gst = np.round(net_sales * 0.18, 2)
+
+    data = {
+        'Shipping Discount': shipping_discount,
+        'Self Discount': self_discount,
+        'Total Discount': self_discount + shipping_discount,
+        'Net Sales Excl Gst': net_sales,
+        'Delivered Charges Excl Gst': np.round(rng.uniform(20, 80, rows), 2),
+        'Returned Charges Excl Gst': np.round(np.where(rng.random(rows) < 0.1, rng.uniform(20, 60, rows), 0), 2),
+        'Free Replacement Charges Excl Gst': np.round(np.where(rng.random(rows) < 0.03, rng.uniform(20, 60, rows), 0), 2),
+        'Indirect Charges Excl Gst': np.round(rng.uniform(0, 15, rows), 2),
+        'Output Gst': output_gst,
+        'Input Credit Gst': np.round(output_gst * rng.uniform(0.2, 0.6, rows), 2),
+        'Listing Gmv': np.round(net_sales * rng.uniform(1.0, 1.3, rows), 2),
+        'TCS': np.round(net_sales * 0.01, 2),
+        'TDS': np.round(net_sales * 0.001, 2),
+    }
+    data['Net Revenue Excl Gst'] = np.round(
+        net_sales
+        - data['Delivered Charges Excl Gst']
+        - data['Returned Charges Excl Gst']
+        - data['Free Replacement Charges Excl Gst']
+        - data['Indirect Charges Excl Gst'],
+        2,
+    )
+
+    # Draw dates, SKUs and statuses from small pools so generation stays vectorised
+    date_pool = pd.date_range(start_date, periods=days, freq='D').strftime('%d/%m/%Y').to_numpy()
+    sku_pool = np.array([f'SKU{i:07d}' for i in range(skus)])
+    data['Order Date'] = date_pool[np.sort(rng.integers(first_day, last_day, rows))]
+    data['Order Status'] = rng.choice(ORDER_STATUSES, rows, p=ORDER_STATUS_WEIGHTS)
+    data['SKU ID'] = sku_pool[rng.zipf(1.3, rows) % skus]
+    data['Product Category'] = rng.choice(PRODUCT_CATEGORIES, rows)
+
+    return pd.DataFrame(data, columns=NUMERIC_COLUMNS + ['Order Date', 'Order Status', 'SKU ID', 'Product Category'])
+
+
+# Generate an export of any size chunk by chunk. Each chunk has its own seed
+# and covers the next slice of the date range, so the concatenated chunks are
+# sorted by date and the same arguments always give the same rows.
+def iter_export_chunks(rows, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS, skus=None, start_date='2022-01-01', days=730):
+    skus = skus or max(rows // 50, 10)
+    chunk_count = max(-(-rows // chunk_rows), 1)
+    seeds = np.random.SeedSequence(seed).spawn(chunk_count)
+    for index in range(chunk_count):
+        first_row = index * chunk_rows
+        chunk_size = min(chunk_rows, rows - first_row)
+        first_day = first_row * days // rows if rows else 0
+        last_day = max((first_row + chunk_size) * days // rows if rows else days, first_day + 1)
+        yield _generate(np.random.default_rng(seeds[index]), chunk_size, skus, start_date, days, first_day, last_day)
+
+
+def write_export_csv(path, rows, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS, **kwargs):
+    """Write a synthetic export to ``path`` without holding more than one chunk in memory."""
+    tmp_path = path + '.tmp'
+    for index, chunk in enumerate(iter_export_chunks(rows, seed, chunk_rows, **kwargs)):
+        chunk.to_csv(tmp_path, mode='w' if index == 0 else 'a', header=index == 0, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a seeded synthetic marketplace export')
+    parser.add_argument('rows', type=int)
+    parser.add_argument('path')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+    write_export_csv(args.path, args.rows, seed=args.seed, chunk_rows=args.chunk_rows)
+
+
+if __name__ == "__main__":
+    main()
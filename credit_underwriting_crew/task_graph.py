@@ -0,0 +1,116 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from crewai import Crew, Process
+
+
+def task_dependencies(tasks):
+    """Indices of the tasks each task depends on, read from ``Task.context``.
+
+    Tasks are matched by description because some crewai versions clone the
+    context tasks in ``Crew.copy`` instead of pointing at the copied tasks.
+    """
+    index_by_description = {task.description: index for index, task in enumerate(tasks)}
+    dependencies = []
+    for task in tasks:
+        upstream = [index_by_description[context_task.description] for context_task in (task.context or [])]
+        dependencies.append(sorted(set(upstream)))
+    return dependencies
+
+
+def critical_path(timings, dependencies):
+    """The chain of dependent tasks that set the wall-clock time of the run.
+
+    Walks back from the task that finished last through the dependency that
+    finished last, so every step on the path is one the next task waited for.
+    """
+    if not timings:
+        return []
+    by_index = {timing['index']: timing for timing in timings}
+    path = [max(timings, key=lambda timing: timing['end'])['index']]
+    while dependencies[path[-1]]:
+        path.append(max(dependencies[path[-1]], key=lambda index: by_index[index]['end']))
+    return path[::-1]
+
+
+def critical_path_report(timings, dependencies):
+    """Per-task rows flagged with whether they are on the critical path, plus totals."""
+    path = set(critical_path(timings, dependencies))
+    rows = [
+        {
+            'task': f"task{timing['index'] + 1}",
+            'agent': timing['agent'],
+            'depends_on': ', '.join(f'task{index + 1}' for index in dependencies[timing['index']]),
+            'start': round(timing['start'], 2),
+            'end': round(timing['end'], 2),
+            'duration': round(timing['end'] - timing['start'], 2),
+            'critical': timing['index'] in path,
+        }
+        for timing in sorted(timings, key=lambda timing: timing['index'])
+    ]
+    wall_seconds = max((timing['end'] for timing in timings), default=0)
+    sequential_seconds = sum(timing['end'] - timing['start'] for timing in timings)
+    return rows, {'wall_seconds': round(wall_seconds, 2), 'sequential_seconds': round(sequential_seconds, 2)}
+
+
+class TaskGraphRunner:
+    """Runs a crew's tasks as a dependency DAG instead of one after another.
+
+    Dependencies are the tasks' ``context``; a task is dispatched as soon as
+    every task it depends on has finished, so independent tasks make their LLM
+    round trips concurrently. Each task runs as a single-task crew with the
+    upstream outputs as its context. ``crew.task_callback`` is called after every
+    task, on the thread that ran it, and ``on_task_start(index)`` before it.
+    """
+
+    def __init__(self, crew, max_workers=None, on_task_start=None):
+        self.crew = crew
+        self.dependencies = task_dependencies(crew.tasks)
+        self.max_workers = max_workers or len(crew.tasks)
+        self.on_task_start = on_task_start
+        self.timings = []
+        self._origin = None
+        self._lock = threading.Lock()
+
+    def _run_task(self, index, inputs):
+        task = self.crew.tasks[index]
+        # Point the context at the instances that actually ran in this graph
+        task.context = [self.crew.tasks[upstream] for upstream in self.dependencies[index]] or None
+        if self.on_task_start is not None:
+            self.on_task_start(index)
+        start = time.perf_counter() - self._origin
+        single_task_crew = Crew(agents=[task.agent], tasks=[task], verbose=self.crew.verbose, process=Process.sequential)
+        output = single_task_crew.kickoff(inputs=inputs)
+        end = time.perf_counter() - self._origin
+        with self._lock:
+            self.timings.append({'index': index, 'agent': task.agent.role if task.agent else '', 'start': start, 'end': end})
+        if self.crew.task_callback is not None:
+            self.crew.task_callback(task.output)
+        return output
+
+    def kickoff(self, inputs=None):
+        """Run every task, returning the output of the last task in the crew."""
+        self._origin = time.perf_counter()
+        self.timings = []
+        remaining = set(range(len(self.crew.tasks)))
+        done = set()
+        outputs = {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while remaining or running:
+                ready = [index for index in sorted(remaining) if set(self.dependencies[index]) <= done]
+                for index in ready:
+                    remaining.discard(index)
+                    running[executor.submit(self._run_task, index, inputs)] = index
+                if not running:
+                    raise ValueError('Task dependencies contain a cycle')
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index = running.pop(future)
+                    outputs[index] = future.result()
+                    done.add(index)
+        return outputs[len(self.crew.tasks) - 1]
+
+    def report(self):
+        return critical_path_report(self.timings, self.dependencies)
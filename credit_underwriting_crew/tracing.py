@@ -0,0 +1,202 @@
+import contextvars
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# JSON lines file that finished traces are appended to for offline analysis
+TRACE_FILE = 'traces.jsonl'
+
+_active_tracer = contextvars.ContextVar('active_tracer', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Tracer:
+    """Collects timed spans for one credit assessment.
+
+    Span times are seconds relative to the tracer's creation so they can be
+    drawn directly as a waterfall. Spans may be recorded from any thread.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self.spans = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def now(self):
+        return time.perf_counter() - self._origin
+
+    def record(self, name, start, end, **attributes):
+        record = {
+            'trace_id': self.trace_id,
+            'name': name,
+            'start': round(start, 6),
+            'end': round(end, 6),
+            'duration': round(end - start, 6),
+        }
+        record.update(attributes)
+        with self._lock:
+            self.spans.append(record)
+        return record
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the enclosed block; attributes added to the yielded dict are recorded too."""
+        start = self.now()
+        parent = _current_span.get()
+        token = _current_span.set(name)
+        try:
+            yield attributes
+        finally:
+            _current_span.reset(token)
+            self.record(name, start, self.now(), parent=parent, **attributes)
+
+    def to_jsonl(self):
+        with self._lock:
+            spans = list(self.spans)
+        return '\n'.join(json.dumps(dict(span, trace=self.name, started_at=self.started_at)) for span in spans)
+
+    def export_jsonl(self, path=TRACE_FILE):
+        with open(path, 'a') as file:
+            file.write(self.to_jsonl() + '\n')
+
+
+@contextmanager
+def activate(tracer):
+    """Make ``tracer`` the target of module-level ``span`` calls in this context."""
+    token = _active_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _active_tracer.reset(token)
+
+
+@contextmanager
+def span(name, **attributes):
+    # No-op unless a tracer has been activated, so library code can always call it
+    tracer = _active_tracer.get()
+    if tracer is None:
+        yield attributes
+        return
+    with tracer.span(name, **attributes) as span_attributes:
+        yield span_attributes
+
+
+class CrewTracer(BaseCallbackHandler):
+    """Records a span per crew task and per LLM call, with token usage.
+
+    Attach with ``instrument_crew``: it becomes the crew's task callback and a
+    LangChain callback handler on every agent. For a sequential crew LLM calls
+    are attributed to the task that is currently running. When tasks run
+    concurrently, the runner calls ``task_started`` on the thread executing the
+    task, and calls made on that thread are attributed to it instead.
+    """
+
+    def __init__(self, tracer):
+        super().__init__()
+        self.tracer = tracer
+        self.task_index = 0
+        self.task_roles = []
+        self._task_start = None
+        self._task_tokens = {'prompt_tokens': 0, 'completion_tokens': 0}
+        self._llm_starts = {}
+        self._thread_tasks = {}
+        self._lock = threading.Lock()
+
+    def kickoff_started(self):
+        self._task_start = self.tracer.now()
+
+    def task_started(self, index):
+        with self._lock:
+            self._thread_tasks[threading.get_ident()] = {
+                'index': index,
+                'start': self.tracer.now(),
+                'tokens': {'prompt_tokens': 0, 'completion_tokens': 0},
+            }
+
+    def _current_task(self):
+        # Returns (task label, token counter) for the task running on this thread
+        running = self._thread_tasks.get(threading.get_ident())
+        if running is not None:
+            return f"task{running['index'] + 1}", running['tokens']
+        return f'task{self.task_index + 1}', self._task_tokens
+
+    def task_completed(self, output):
+        end = self.tracer.now()
+        with self._lock:
+            running = self._thread_tasks.pop(threading.get_ident(), None)
+            if running is not None:
+                index = running['index']
+                role = self.task_roles[index] if index < len(self.task_roles) else ''
+                self.tracer.record(
+                    f'task{index + 1}', running['start'], end,
+                    parent='crew.kickoff', agent=role, **running['tokens'],
+                )
+                return
+            role = self.task_roles[self.task_index] if self.task_index < len(self.task_roles) else ''
+            tokens = self._task_tokens
+            self.tracer.record(
+                f'task{self.task_index + 1}', self._task_start, end,
+                parent='crew.kickoff', agent=role, **tokens,
+            )
+            self.task_index += 1
+            self._task_start = end
+            self._task_tokens = {'prompt_tokens': 0, 'completion_tokens': 0}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._llm_starts[run_id] = self.tracer.now()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._llm_starts[run_id] = self.tracer.now()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._llm_starts.pop(run_id, self.tracer.now())
+        usage = (response.llm_output or {}).get('token_usage') or _streamed_usage(response)
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        with self._lock:
+            task, task_tokens = self._current_task()
+            task_tokens['prompt_tokens'] += prompt_tokens
+            task_tokens['completion_tokens'] += completion_tokens
+        self.tracer.record('llm_call', start, self.tracer.now(), parent=task,
+                           prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        start = self._llm_starts.pop(run_id, self.tracer.now())
+        with self._lock:
+            task, _ = self._current_task()
+        self.tracer.record('llm_call', start, self.tracer.now(), parent=task, error=str(error))
+
+
+def _streamed_usage(response):
+    # Streamed chat responses carry the usage on the message instead of llm_output
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+            if metadata:
+                return {'prompt_tokens': metadata.get('input_tokens', 0),
+                        'completion_tokens': metadata.get('output_tokens', 0)}
+    return {}
+
+
+def instrument_crew(crew, tracer):
+    """Attach a ``CrewTracer`` to a crew; call ``kickoff_started`` right before kickoff."""
+    crew_tracer = CrewTracer(tracer)
+    crew_tracer.task_roles = [task.agent.role if task.agent else '' for task in crew.tasks]
+    previous_callback = crew.task_callback
+
+    def task_callback(output):
+        crew_tracer.task_completed(output)
+        if previous_callback is not None:
+            previous_callback(output)
+
+    crew.task_callback = task_callback
+    for agent in crew.agents:
+        agent.callbacks = list(agent.callbacks or []) + [crew_tracer]
+    return crew_tracer
@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from tools.corpus_index import (
+    DEFAULT_EF_SEARCH,
+    DEFAULT_NPROBE,
+    INDEX_KINDS,
+    CorpusIndex,
+)
+
+DEFAULT_CHUNKS = 200_000
+# Matches a small sentence-transformer; OpenAI's ada-002 vectors have 1536
+DEFAULT_DIM = 384
+CHUNKS_PER_FILING = 500
+TICKERS = [f"T{number:03d}" for number in range(500)]
+FORM_TYPES = ["10-K", "10-Q"]
+YEARS = list(range(2015, 2025))
+CLUSTERS = 256
+
+
+def _memory_bytes():
+    # Resident set, and the part of it not backed by files (mmapped segments are)
+    with open("/proc/self/statm") as file:
+        _, resident, shared = (int(value) for value in file.read().split()[:3])
+    page = os.sysconf("SC_PAGE_SIZE")
+    return resident * page, (resident - shared) * page
+
+
+def synthetic_vectors(count, dim, seed):
+    # Clustered like real embeddings, so quantisation error is representative
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((CLUSTERS, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, CLUSTERS, count)]
+    vectors += 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def synthetic_filing(number):
+    ticker = TICKERS[number % len(TICKERS)]
+    form_type = FORM_TYPES[number // 7 % len(FORM_TYPES)]
+    year = YEARS[number // 3 % len(YEARS)]
+    return {
+        "ticker": ticker,
+        "formType": form_type,
+        "periodOfReport": f"{year}-12-31",
+        "filedAt": f"{year + 1}-02-15",
+        "linkToFilingDetails": f"https://example.com/{ticker}/{form_type}/{number}",
+    }
+
+
+def _percentile(values, percent):
+    return float(np.percentile(values, percent)) * 1000 if values else 0.0
+
+
+def benchmark_kind(kind, vectors, queries, exact, args):
+    path = tempfile.mkdtemp(prefix=f"corpus_{kind}_")
+    try:
+        corpus = CorpusIndex(path, kind=kind)
+        started = time.perf_counter()
+        for number, start in enumerate(range(0, len(vectors), CHUNKS_PER_FILING)):
+            batch = vectors[start : start + CHUNKS_PER_FILING]
+            chunks = [(f"chunk {start + offset}", "") for offset in range(len(batch))]
+            corpus.add_filing(synthetic_filing(number), chunks, batch)
+        corpus.flush()
+        corpus.compact()
+        ingest_seconds = time.perf_counter() - started
+        del corpus
+
+        # Reopen as a query process would, and measure what searching costs
+        resident_before, anon_before = _memory_bytes()
+        corpus = CorpusIndex(path)
+        search = dict(nprobe=args.nprobe, ef_search=args.ef_search)
+        latencies, recalls = [], []
+        for query, truth in zip(queries, exact):
+            started = time.perf_counter()
+            hits = corpus.search(query, args.k, **search)
+            latencies.append(time.perf_counter() - started)
+            found = {hit["id"] - 1 for hit in hits}
+            recalls.append(len(found & set(truth.tolist())) / args.k)
+        # Filter on one ticker's filings of one form from a given year on
+        filings = len(vectors) // CHUNKS_PER_FILING
+        filtered = []
+        for number, query in enumerate(queries):
+            filing = synthetic_filing(number % filings)
+            started = time.perf_counter()
+            corpus.search(
+                query,
+                args.k,
+                tickers=[filing["ticker"]],
+                form_types=[filing["formType"]],
+                period_from=filing["periodOfReport"],
+                **search,
+            )
+            filtered.append(time.perf_counter() - started)
+        resident_after, anon_after = _memory_bytes()
+        stats = corpus.stats()
+        per_million = 1_000_000 / len(vectors)
+        return {
+            "kind": kind,
+            "spec": stats["spec"],
+            "chunks": len(vectors),
+            "ingest_chunks_per_second": round(len(vectors) / ingest_seconds),
+            "recall_at_k": round(float(np.mean(recalls)), 4),
+            "p50_ms": round(_percentile(latencies, 50), 3),
+            "p95_ms": round(_percentile(latencies, 95), 3),
+            "filtered_p50_ms": round(_percentile(filtered, 50), 3),
+            "filtered_p95_ms": round(_percentile(filtered, 95), 3),
+            "index_mb_per_million": round(
+                stats["segment_bytes"] * per_million / 1024**2, 1
+            ),
+            # Search memory is mostly fixed per segment (IVF-PQ keeps a
+            # lists x subvectors x 256 distance table), so it is not scaled
+            "search_rss_mb": round((resident_after - resident_before) / 1024**2, 1),
+            "search_anon_mb": round((anon_after - anon_before) / 1024**2, 1),
+        }
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Query latency and memory of the corpus index kinds on synthetic vectors"
+    )
+    parser.add_argument("--kinds", nargs="+", choices=INDEX_KINDS, default=INDEX_KINDS)
+    parser.add_argument("--chunks", type=int, default=DEFAULT_CHUNKS)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE)
+    parser.add_argument("--ef-search", type=int, default=DEFAULT_EF_SEARCH)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.chunks, args.dim, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+    exact_index = faiss.IndexFlatL2(args.dim)
+    exact_index.add(vectors)
+    _, exact = exact_index.search(queries, args.k)
+    del exact_index
+
+    results = []
+    print(
+        f"{'kind':<8} {'spec':<22} {'recall@' + str(args.k):>10} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'filt p50':>9} {'index MB/M':>11} {'RSS MB':>8} {'anon MB':>8}"
+    )
+    for kind in args.kinds:
+        result = benchmark_kind(kind, vectors, queries, exact, args)
+        results.append(result)
+        print(
+            f"{kind:<8} {result['spec']:<22} {result['recall_at_k']:>10.3f} "
+            f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+            f"{result['filtered_p50_ms']:>9.2f} {result['index_mb_per_million']:>11.1f} "
+            f"{result['search_rss_mb']:>8.1f} {result['search_anon_mb']:>8.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
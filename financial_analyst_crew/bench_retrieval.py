@@ -0,0 +1,92 @@
+import argparse
+import json
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from tools.hybrid_search import load_reranker
+from tools.sec_tools import SECTools, filing_index
+
+EVAL_PATH = "eval/retrieval_questions.json"
+DEFAULT_KS = [1, 4, 10]
+MODES = ["dense", "keyword", "hybrid"]
+
+
+def is_relevant(text, expected):
+    text = text.lower()
+    return any(phrase.lower() in text for phrase in expected)
+
+
+def first_hit(docs, expected):
+    for rank, doc in enumerate(docs, 1):
+        if is_relevant(doc.page_content, expected):
+            return rank
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recall@k of dense, keyword and hybrid retrieval over SEC filings"
+    )
+    parser.add_argument("--eval", default=EVAL_PATH, help="JSON list of questions")
+    parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_KS)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with open(args.eval) as file:
+        questions = json.load(file)
+    modes = MODES + (["hybrid+rerank"] if load_reranker() else [])
+    max_k = max(args.k)
+    hits = {mode: [] for mode in modes}
+    seconds = {mode: 0.0 for mode in modes}
+
+    for question in questions:
+        filing = filing_index.latest(question["ticker"], question["form_type"])
+        if filing is None:
+            print(f"skipping {question['ticker']} {question['form_type']}: no filing")
+            continue
+        retriever = SECTools.load_retriever(filing["linkToFilingDetails"])
+        reranker = retriever.reranker
+        for mode in modes:
+            retriever.reranker = reranker if mode == "hybrid+rerank" else None
+            started = time.perf_counter()
+            docs = retriever.search(question["question"], max_k, mode.split("+")[0])
+            seconds[mode] += time.perf_counter() - started
+            hits[mode].append(first_hit(docs, question["expected"]))
+
+    # Recall@k here is the share of questions with a relevant chunk in the top k;
+    # at k=4 (what the tools return) it is the first-call answer rate
+    results = []
+    header = " ".join(f"{'recall@' + str(k):>10}" for k in args.k)
+    print(f"\n{'mode':<15} {header} {'MRR':>7} {'ms/query':>9}")
+    for mode in modes:
+        ranks = hits[mode]
+        if not ranks:
+            continue
+        recall = {
+            k: sum(rank is not None and rank <= k for rank in ranks) / len(ranks)
+            for k in args.k
+        }
+        mrr = sum(1 / rank for rank in ranks if rank) / len(ranks)
+        latency = seconds[mode] / len(ranks) * 1000
+        row = " ".join(f"{recall[k]:>10.3f}" for k in args.k)
+        print(f"{mode:<15} {row} {mrr:>7.3f} {latency:>9.1f}")
+        results.append(
+            {
+                "mode": mode,
+                "questions": len(ranks),
+                "recall": {str(k): round(value, 4) for k, value in recall.items()},
+                "mrr": round(mrr, 4),
+                "ms_per_query": round(latency, 2),
+            }
+        )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
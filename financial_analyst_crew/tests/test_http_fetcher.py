@@ -0,0 +1,75 @@
+import os
+
+import pytest
+import requests
+
+from tools.http_fetcher import Fetcher
+
+FILING_URL = "https://www.sec.gov/Archives/edgar/data/320193/000032019324000123/aapl-20240928.htm"
+
+
+def _response(status_code, text, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = text.encode()
+    response.encoding = "utf-8"
+    response.url = FILING_URL
+    response.headers.update(headers or {})
+    return response
+
+
+def _fetcher(tmp_path, responses, **kwargs):
+    fetcher = Fetcher(
+        cache_dir=str(tmp_path),
+        rate=1000,
+        user_agent="Test Suite test@example.com",
+        backoff=0,
+        **kwargs,
+    )
+    fetcher.session.get = lambda url, **kwargs: responses.pop(0)
+    return fetcher
+
+
+def test_error_response_raises_and_is_not_cached(tmp_path):
+    fetcher = _fetcher(
+        tmp_path,
+        [
+            _response(403, "Your request has been denied"),
+            _response(200, "<p>Item 1A. Risk Factors</p>"),
+        ],
+    )
+    with pytest.raises(requests.HTTPError):
+        fetcher.fetch(FILING_URL)
+    assert not os.listdir(tmp_path)
+
+    assert fetcher.fetch(FILING_URL) == "<p>Item 1A. Risk Factors</p>"
+    # Filing documents are immutable, so the next fetch is served from disk
+    assert fetcher.fetch(FILING_URL) == "<p>Item 1A. Risk Factors</p>"
+
+
+def test_iter_text_raises_on_error_response(tmp_path):
+    fetcher = _fetcher(tmp_path, [_response(429, "Too many requests")] * 4)
+    with pytest.raises(requests.HTTPError):
+        list(fetcher.iter_text(FILING_URL))
+
+
+def test_retries_take_a_token(tmp_path):
+    fetcher = _fetcher(
+        tmp_path,
+        [
+            _response(503, "Unavailable", {"Retry-After": "0"}),
+            _response(429, "Too many requests"),
+            _response(200, "<p>Item 7</p>"),
+        ],
+    )
+    acquired = []
+    fetcher.bucket.acquire = lambda: acquired.append(1)
+    assert fetcher.fetch(FILING_URL) == "<p>Item 7</p>"
+    assert len(acquired) == 3
+
+
+def test_requires_declared_user_agent(tmp_path, monkeypatch):
+    monkeypatch.delenv("SEC_USER_AGENT", raising=False)
+    fetcher = Fetcher(cache_dir=str(tmp_path))
+    with pytest.raises(RuntimeError, match="SEC_USER_AGENT"):
+        fetcher.fetch(FILING_URL)
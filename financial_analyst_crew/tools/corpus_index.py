@@ -0,0 +1,391 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+
+import faiss
+import numpy as np
+
+CORPUS_DIR = os.path.join(".sec_cache", "corpus")
+INDEX_KINDS = ["ivfpq", "hnswpq", "flat"]
+DEFAULT_KIND = "ivfpq"
+# Product quantisation learns 256 centroids per sub-vector, and faiss wants
+# about 39 training points per centroid
+MIN_TRAIN_SIZE = 256 * 39
+TRAIN_SIZE = 20_000
+SEGMENT_SIZE = 50_000
+MAX_LISTS = 4096
+PQ_BYTES = 64
+HNSW_NEIGHBOURS = 32
+DEFAULT_NPROBE = 32
+DEFAULT_EF_SEARCH = 256
+
+
+def _pq_subvectors(dim, max_bytes=PQ_BYTES):
+    return max(m for m in range(1, max_bytes + 1) if dim % m == 0)
+
+
+def index_spec(kind, dim, train_count):
+    """The ``faiss.index_factory`` description for an index of this kind."""
+    if kind == "flat":
+        return "IDMap2,Flat"
+    if kind == "hnswpq":
+        return f"IDMap2,HNSW{HNSW_NEIGHBOURS}_PQ{_pq_subvectors(dim)}"
+    lists = max(1, min(MAX_LISTS, train_count // 39))
+    return f"IVF{lists},PQ{_pq_subvectors(dim)}"
+
+
+class CorpusIndex:
+    """Approximate nearest neighbour index over the chunks of many filings.
+
+    Where ``FilingIndexCache`` holds one exact index per filing, this holds
+    every filing added to it so questions can span tickers and years. Chunk
+    text and filing metadata live in SQLite; vectors live in FAISS segment
+    files that are memory-mapped for search, so RAM does not grow with the
+    corpus.
+
+    New chunks are staged in SQLite and searched exactly until there are
+    enough to train the quantiser, then written out as a segment every
+    ``segment_size`` chunks (or on ``flush``). Segments are never rewritten,
+    so adding a filing does not load the existing index. ``compact`` merges
+    IVF and flat segments into one.
+
+    ``kind`` picks the index type when the corpus is created: "ivfpq"
+    (inverted lists with product quantisation, the default), "hnswpq" (HNSW
+    graph over PQ codes) or "flat" (exact, for small corpora and baselines).
+    """
+
+    def __init__(
+        self,
+        path=CORPUS_DIR,
+        kind=DEFAULT_KIND,
+        train_size=TRAIN_SIZE,
+        segment_size=SEGMENT_SIZE,
+    ):
+        if kind not in INDEX_KINDS:
+            raise ValueError(
+                f"Unknown index kind {kind!r}, expected one of {INDEX_KINDS}"
+            )
+        self.path = path
+        self.segments_dir = os.path.join(path, "segments")
+        self.trained_path = os.path.join(path, "trained.faiss")
+        self.config_path = os.path.join(path, "config.json")
+        self.segment_size = segment_size
+        os.makedirs(self.segments_dir, exist_ok=True)
+        try:
+            with open(self.config_path) as file:
+                self.config = json.load(file)
+        except FileNotFoundError:
+            self.config = {"kind": kind, "dim": None}
+        if self.config["kind"] == "flat":
+            self.train_size = 1
+        else:
+            self.train_size = max(train_size, MIN_TRAIN_SIZE)
+        self._lock = threading.RLock()
+        self._segments = {}
+        self._connection = sqlite3.connect(
+            os.path.join(path, "chunks.sqlite"), check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS filings ("
+            "id INTEGER PRIMARY KEY, url TEXT UNIQUE NOT NULL, ticker TEXT, "
+            "form_type TEXT, period TEXT, filed_at TEXT);"
+            "CREATE INDEX IF NOT EXISTS filings_lookup "
+            "ON filings (ticker, form_type, period);"
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "id INTEGER PRIMARY KEY, filing_id INTEGER NOT NULL, "
+            "section TEXT, text TEXT NOT NULL, staged_vector BLOB);"
+            "CREATE INDEX IF NOT EXISTS chunks_filing ON chunks (filing_id);"
+        )
+        self._connection.commit()
+
+    @property
+    def kind(self):
+        return self.config["kind"]
+
+    def _save_config(self):
+        with open(self.config_path, "w") as file:
+            json.dump(self.config, file)
+
+    def has_filing(self, url):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM filings WHERE url = ?", [url]
+            ).fetchone()
+        return row is not None
+
+    def add_filing(self, filing, chunks, vectors):
+        """Add the ``(text, section)`` chunks of a filing with their embeddings.
+
+        ``filing`` is a ``FilingIndex`` entry. A filing already in the corpus
+        is skipped. Returns the number of chunks added.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(chunks) != len(vectors):
+            raise ValueError("Expected one vector per chunk")
+        with self._lock:
+            if not len(chunks) or self.has_filing(filing["linkToFilingDetails"]):
+                return 0
+            if self.config["dim"] is None:
+                self.config["dim"] = int(vectors.shape[1])
+                self._save_config()
+            elif vectors.shape[1] != self.config["dim"]:
+                raise ValueError(
+                    f"Vectors have {vectors.shape[1]} dimensions, "
+                    f"the corpus has {self.config['dim']}"
+                )
+            cursor = self._connection.execute(
+                "INSERT INTO filings (url, ticker, form_type, period, filed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    filing["linkToFilingDetails"],
+                    filing["ticker"].upper(),
+                    filing["formType"],
+                    filing.get("periodOfReport"),
+                    filing.get("filedAt"),
+                ],
+            )
+            self._connection.executemany(
+                "INSERT INTO chunks (filing_id, section, text, staged_vector) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (cursor.lastrowid, section, text, vector.tobytes())
+                    for (text, section), vector in zip(chunks, vectors)
+                ],
+            )
+            self._connection.commit()
+            staged = self._connection.execute(
+                "SELECT COUNT(*) FROM chunks WHERE staged_vector IS NOT NULL"
+            ).fetchone()[0]
+            trained = os.path.exists(self.trained_path)
+            if staged >= (self.segment_size if trained else self.train_size):
+                self._write_segment()
+        return len(chunks)
+
+    def flush(self):
+        """Move staged chunks into a segment, once the index can be trained."""
+        with self._lock:
+            self._write_segment()
+
+    def _write_segment(self):
+        rows = self._connection.execute(
+            "SELECT id, staged_vector FROM chunks "
+            "WHERE staged_vector IS NOT NULL ORDER BY id"
+        ).fetchall()
+        if not os.path.exists(self.trained_path):
+            if len(rows) < self.train_size:
+                return
+            self._train(rows)
+        if not rows:
+            return
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        matrix = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        index = faiss.read_index(self.trained_path)
+        index.add_with_ids(matrix, ids)
+        path = os.path.join(self.segments_dir, f"{ids[0]:012d}.faiss")
+        faiss.write_index(index, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        self._connection.execute(
+            "UPDATE chunks SET staged_vector = NULL WHERE id BETWEEN ? AND ?",
+            [int(ids[0]), int(ids[-1])],
+        )
+        self._connection.commit()
+
+    def _train(self, rows):
+        dim = self.config["dim"]
+        sample = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        spec = index_spec(self.kind, dim, len(sample))
+        index = faiss.index_factory(dim, spec)
+        index.train(sample)
+        faiss.write_index(index, self.trained_path)
+        self.config["spec"] = spec
+        self._save_config()
+
+    def _open_segments(self):
+        # Segments are opened read-only and memory-mapped; a file replaced by
+        # compaction has a new mtime and is reopened
+        current = {}
+        for name in sorted(os.listdir(self.segments_dir)):
+            if not name.endswith(".faiss"):
+                continue
+            path = os.path.join(self.segments_dir, name)
+            key = (name, os.stat(path).st_mtime_ns)
+            current[key] = self._segments.get(key) or faiss.read_index(
+                path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+            )
+        self._segments = current
+        return list(current.values())
+
+    def _filter_sql(self, tickers, form_types, period_from, period_to):
+        clauses, params = [], []
+        if tickers:
+            tickers = [ticker.upper() for ticker in tickers]
+            clauses.append(f"f.ticker IN ({','.join('?' * len(tickers))})")
+            params += tickers
+        if form_types:
+            clauses.append(f"f.form_type IN ({','.join('?' * len(form_types))})")
+            params += list(form_types)
+        if period_from:
+            clauses.append("f.period >= ?")
+            params.append(period_from)
+        if period_to:
+            clauses.append("f.period <= ?")
+            params.append(period_to)
+        return " AND ".join(clauses), params
+
+    def _search_params(self, selector, nprobe, ef_search):
+        if self.kind == "ivfpq":
+            return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+        if self.kind == "hnswpq":
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+        return faiss.SearchParameters(sel=selector)
+
+    def search(
+        self,
+        vector,
+        k=4,
+        tickers=None,
+        form_types=None,
+        period_from=None,
+        period_to=None,
+        nprobe=DEFAULT_NPROBE,
+        ef_search=DEFAULT_EF_SEARCH,
+    ):
+        """The ``k`` chunks nearest to ``vector`` among filings matching the filters.
+
+        Periods are ``periodOfReport`` dates (YYYY-MM-DD) and bound the range
+        inclusively. Returns dicts with the chunk text, its section, the
+        filing's metadata and the distance.
+        """
+        query = np.asarray([vector], dtype=np.float32)
+        where, params = self._filter_sql(tickers, form_types, period_from, period_to)
+        with self._lock:
+            selector = None
+            if where:
+                ids = [
+                    row[0]
+                    for row in self._connection.execute(
+                        "SELECT c.id FROM chunks c JOIN filings f ON c.filing_id = f.id "
+                        f"WHERE {where}",
+                        params,
+                    )
+                ]
+                if not ids:
+                    return []
+                selector = faiss.IDSelectorBatch(np.array(ids, dtype=np.int64))
+            staged = self._connection.execute(
+                "SELECT c.id, c.staged_vector FROM chunks c "
+                "JOIN filings f ON c.filing_id = f.id "
+                f"WHERE c.staged_vector IS NOT NULL {'AND ' + where if where else ''}",
+                params,
+            ).fetchall()
+            segments = self._open_segments()
+
+        hits = []
+        search_params = self._search_params(selector, nprobe, ef_search)
+        for segment in segments:
+            distances, ids = segment.search(query, k, params=search_params)
+            hits += [
+                (float(distance), int(chunk_id))
+                for distance, chunk_id in zip(distances[0], ids[0])
+                if chunk_id >= 0
+            ]
+        if staged:
+            matrix = np.vstack(
+                [np.frombuffer(row[1], dtype=np.float32) for row in staged]
+            )
+            distances = ((matrix - query) ** 2).sum(axis=1)
+            hits += [(float(d), row[0]) for d, row in zip(distances, staged)]
+        hits = sorted(hits)[:k]
+        if not hits:
+            return []
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT c.id, c.text, c.section, f.ticker, f.form_type, f.period, "
+                "f.filed_at, f.url FROM chunks c JOIN filings f ON c.filing_id = f.id "
+                f"WHERE c.id IN ({','.join('?' * len(hits))})",
+                [chunk_id for _, chunk_id in hits],
+            ).fetchall()
+        fields = [
+            "id",
+            "text",
+            "section",
+            "ticker",
+            "form_type",
+            "period",
+            "filed_at",
+            "url",
+        ]
+        by_id = {row[0]: dict(zip(fields, row)) for row in rows}
+        return [
+            {**by_id[chunk_id], "distance": distance}
+            for distance, chunk_id in hits
+            if chunk_id in by_id
+        ]
+
+    def compact(self):
+        """Merge all segments into one; HNSW segments cannot be merged and are left as is."""
+        if self.kind == "hnswpq":
+            return
+        with self._lock:
+            names = sorted(
+                name
+                for name in os.listdir(self.segments_dir)
+                if name.endswith(".faiss")
+            )
+            if len(names) < 2:
+                return
+            paths = [os.path.join(self.segments_dir, name) for name in names]
+            merged = faiss.read_index(paths[0])
+            for path in paths[1:]:
+                merged.merge_from(faiss.read_index(path), 0)
+            faiss.write_index(merged, paths[0] + ".tmp")
+            os.replace(paths[0] + ".tmp", paths[0])
+            for path in paths[1:]:
+                os.remove(path)
+            self._segments = {}
+
+    def stats(self):
+        with self._lock:
+            filings, chunks, staged = self._connection.execute(
+                "SELECT (SELECT COUNT(*) FROM filings), COUNT(*), "
+                "COUNT(staged_vector) FROM chunks"
+            ).fetchone()
+            segments = [
+                os.path.join(self.segments_dir, name)
+                for name in os.listdir(self.segments_dir)
+                if name.endswith(".faiss")
+            ]
+        return {
+            "kind": self.kind,
+            "spec": self.config.get("spec"),
+            "filings": filings,
+            "chunks": chunks,
+            "staged_chunks": staged,
+            "segments": len(segments),
+            "segment_bytes": sum(os.path.getsize(path) for path in segments),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Maintain the corpus-level filing index"
+    )
+    parser.add_argument("command", choices=["stats", "flush", "compact"])
+    parser.add_argument("--path", default=CORPUS_DIR)
+    args = parser.parse_args()
+
+    corpus = CorpusIndex(args.path)
+    if args.command == "flush":
+        corpus.flush()
+    elif args.command == "compact":
+        corpus.flush()
+        corpus.compact()
+    print(json.dumps(corpus.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_PATH = os.path.join(".sec_cache", "embeddings.sqlite")
+MAX_BATCH_TEXTS = 256
+MAX_BATCH_CHARS = 400_000
+DEFAULT_WORKERS = 4
+MAX_RETRIES = 6
+BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+# Transient errors of the OpenAI, httpx and requests clients, matched by class
+# name so none of them has to be imported here
+RETRYABLE_ERRORS = {
+    "RateLimitError",
+    "APITimeoutError",
+    "APIConnectionError",
+    "ConnectError",
+    "ConnectionError",
+    "Timeout",
+    "TimeoutException",
+}
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def is_retryable(exc):
+    """Whether ``exc`` is a rate limit, timeout or connection error worth retrying."""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(exc).__mro__)
+
+
+class EmbeddingCache:
+    """SQLite store of chunk embeddings keyed by embedding model and text hash.
+
+    Filings from the same company repeat a lot of boilerplate, so most chunks
+    of a new 10-Q were already embedded for an earlier filing.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash))"
+        )
+        self._connection.commit()
+
+    def get_many(self, model, hashes):
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT hash, vector FROM embeddings "
+                    f"WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch],
+                )
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, model, vectors):
+        rows = [
+            (model, key, array("f", vector).tobytes())
+            for key, vector in vectors.items()
+        ]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._connection.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def batches(texts, max_texts=MAX_BATCH_TEXTS, max_chars=MAX_BATCH_CHARS):
+    batch, chars = [], 0
+    for text in texts:
+        if batch and (len(batch) >= max_texts or chars + len(text) > max_chars):
+            yield batch
+            batch, chars = [], 0
+        batch.append(text)
+        chars += len(text)
+    if batch:
+        yield batch
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings that are looked up in an ``EmbeddingCache`` before the API is called.
+
+    Chunks missing from the cache are deduplicated and split into batches
+    bounded by count and total characters, which are embedded concurrently.
+    A batch failing on a rate limit, timeout or connection error is retried
+    with exponential backoff and jitter, so a rate limit slows one batch down
+    instead of failing the whole filing; other errors, such as a bad API key,
+    are raised at once.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        cache=None,
+        max_workers=DEFAULT_WORKERS,
+        max_batch_texts=MAX_BATCH_TEXTS,
+        max_batch_chars=MAX_BATCH_CHARS,
+    ):
+        self.embeddings = embeddings
+        self.cache = cache or EmbeddingCache()
+        self.max_workers = max_workers
+        self.max_batch_texts = max_batch_texts
+        self.max_batch_chars = max_batch_chars
+
+    @property
+    def model(self):
+        return getattr(self.embeddings, "model", type(self.embeddings).__name__)
+
+    def _embed_batch(self, batch):
+        for attempt in range(MAX_RETRIES):
+            try:
+                return self.embeddings.embed_documents(batch)
+            except Exception as exc:
+                if attempt == MAX_RETRIES - 1 or not is_retryable(exc):
+                    raise
+                delay = min(BACKOFF_SECONDS * 2**attempt, MAX_BACKOFF_SECONDS)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+
+    def embed_documents(self, texts):
+        keys = [text_hash(text) for text in texts]
+        unique = dict(zip(keys, texts))
+        vectors = self.cache.get_many(self.model, list(unique))
+        missing = [key for key in unique if key not in vectors]
+        if missing:
+            missing_batches = list(
+                batches(
+                    [unique[key] for key in missing],
+                    self.max_batch_texts,
+                    self.max_batch_chars,
+                )
+            )
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = executor.map(self._embed_batch, missing_batches)
+                embedded = [vector for result in results for vector in result]
+            new_vectors = dict(zip(missing, embedded))
+            self.cache.put_many(self.model, new_vectors)
+            vectors.update(new_vectors)
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
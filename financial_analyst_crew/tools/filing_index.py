@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+
+FILING_INDEX_PATH = os.path.join(".sec_cache", "latest_filings.json")
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+FORM_TYPES = ["10-K", "10-Q"]
+TICKERS_PER_QUERY = 20
+PAGE_SIZE = 50
+MAX_PAGES = 10
+FILING_FIELDS = [
+    "ticker",
+    "formType",
+    "filedAt",
+    "accessionNo",
+    "periodOfReport",
+    "linkToFilingDetails",
+    "linkToHtml",
+]
+
+
+class StubQueryApi:
+    """Local stand-in for ``sec_api.QueryApi`` that answers from a list of filings.
+
+    Understands the queries built here and in ``SECTools``: ``ticker:X`` or
+    ``ticker:(X OR Y)`` combined with ``formType:"..."`` and optionally
+    ``filedAt:[DATE TO *]``, sorted by ``filedAt``.
+    Point ``SEC_QUERY_API_STUB`` at a JSON file with a list of filings to use
+    it instead of the real service.
+    """
+
+    def __init__(self, filings):
+        self.filings = filings
+        self.calls = 0
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as file:
+            return cls(json.load(file))
+
+    def get_filings(self, query):
+        self.calls += 1
+        query_string = query["query"]["query_string"]["query"]
+        tickers = re.search(r"ticker:\(?([^)]+?)\)?(?:\s+AND|$)", query_string).group(1)
+        tickers = {ticker.strip() for ticker in tickers.split(" OR ")}
+        form_type = re.search(r'formType:"([^"]+)"', query_string).group(1)
+        filed_from = re.search(r"filedAt:\[(\S+) TO \*\]", query_string)
+        matches = [
+            filing
+            for filing in self.filings
+            if filing["ticker"] in tickers
+            and filing["formType"] == form_type
+            and (not filed_from or filing["filedAt"] >= filed_from.group(1))
+        ]
+        matches.sort(key=lambda filing: filing["filedAt"], reverse=True)
+        start = int(query.get("from", 0))
+        size = int(query.get("size", 50))
+        return {
+            "total": {"value": len(matches)},
+            "filings": matches[start : start + size],
+        }
+
+
+def query_api_from_env():
+    stub_path = os.environ.get("SEC_QUERY_API_STUB")
+    if stub_path:
+        return StubQueryApi.from_file(stub_path)
+    from sec_api import QueryApi
+
+    return QueryApi(api_key=os.environ["SEC_API_API_KEY"])
+
+
+def _query(tickers, form_type, start=0, size=1, filed_from=None):
+    ticker_clause = tickers[0] if len(tickers) == 1 else f"({' OR '.join(tickers)})"
+    query_string = f'ticker:{ticker_clause} AND formType:"{form_type}"'
+    if filed_from:
+        query_string += f" AND filedAt:[{filed_from} TO *]"
+    return {
+        "query": {"query_string": {"query": query_string}},
+        "from": str(start),
+        "size": str(size),
+        "sort": [{"filedAt": {"order": "desc"}}],
+    }
+
+
+class FilingIndex:
+    """Local index of the latest filing of each form type per ticker.
+
+    ``latest`` answers from the index while an entry is younger than ``ttl``
+    seconds, so a tool call resolves the filing link without a query to the
+    SEC API. ``refresh`` updates a whole watchlist with one query per group of
+    tickers instead of one per ticker. Tickers with no filing are remembered
+    too, so they are not queried again until the entry expires.
+    """
+
+    def __init__(self, query_api=None, path=FILING_INDEX_PATH, ttl=DEFAULT_TTL_SECONDS):
+        self._query_api = query_api
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        try:
+            with open(path) as file:
+                self.entries = json.load(file)
+        except FileNotFoundError:
+            self.entries = {}
+
+    @property
+    def query_api(self):
+        # Created on first use, so a warm index needs no API key or network
+        if self._query_api is None:
+            self._query_api = query_api_from_env()
+        return self._query_api
+
+    @staticmethod
+    def _key(ticker, form_type):
+        return f"{ticker.upper()}|{form_type}"
+
+    def _store(self, ticker, form_type, filing, checked_at):
+        if filing is not None:
+            filing = {field: filing.get(field) for field in FILING_FIELDS}
+        self.entries[self._key(ticker, form_type)] = {
+            "filing": filing,
+            "checked_at": checked_at,
+        }
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as file:
+                json.dump(self.entries, file)
+            os.replace(tmp_path, self.path)
+
+    def latest(self, ticker, form_type):
+        """The newest ``form_type`` filing of ``ticker``, or None if it has none."""
+        ticker = ticker.strip().upper()
+        entry = self.entries.get(self._key(ticker, form_type))
+        if entry is not None and time.time() - entry["checked_at"] < self.ttl:
+            return entry["filing"]
+        filings = self.query_api.get_filings(_query([ticker], form_type))["filings"]
+        with self._lock:
+            self._store(ticker, form_type, filings[0] if filings else None, time.time())
+        self.save()
+        return filings[0] if filings else None
+
+    def latest_many(self, tickers, form_type):
+        """Map each ticker to its newest ``form_type`` filing, refreshing stale ones together."""
+        tickers = {ticker.strip().upper() for ticker in tickers if ticker.strip()}
+        now = time.time()
+        stale = [
+            ticker
+            for ticker in tickers
+            if now
+            - self.entries.get(self._key(ticker, form_type), {}).get("checked_at", 0)
+            >= self.ttl
+        ]
+        if stale:
+            self.refresh(stale, [form_type])
+        return {
+            ticker: self.entries[self._key(ticker, form_type)]["filing"]
+            for ticker in tickers
+        }
+
+    def history(self, ticker, form_type, filed_from):
+        """Every ``form_type`` filing of ``ticker`` filed since ``filed_from`` (YYYY-MM-DD), newest first."""
+        filings = []
+        for page in range(MAX_PAGES):
+            response = self.query_api.get_filings(
+                _query(
+                    [ticker.upper()], form_type, page * PAGE_SIZE, PAGE_SIZE, filed_from
+                )
+            )
+            filings += [
+                {field: filing.get(field) for field in FILING_FIELDS}
+                for filing in response["filings"]
+            ]
+            if len(response["filings"]) < PAGE_SIZE:
+                break
+        return filings
+
+    def refresh(self, tickers, form_types=FORM_TYPES):
+        """Re-resolve the latest filings of every ticker in ``tickers``."""
+        tickers = sorted(
+            {ticker.strip().upper() for ticker in tickers if ticker.strip()}
+        )
+        for form_type in form_types:
+            for start in range(0, len(tickers), TICKERS_PER_QUERY):
+                group = tickers[start : start + TICKERS_PER_QUERY]
+                checked_at = time.time()
+                latest = {}
+                # Results are newest first, so the first filing seen per ticker is its latest
+                for page in range(MAX_PAGES):
+                    response = self.query_api.get_filings(
+                        _query(group, form_type, page * PAGE_SIZE, PAGE_SIZE)
+                    )
+                    for filing in response["filings"]:
+                        latest.setdefault(filing["ticker"].upper(), filing)
+                    if (
+                        len(latest) == len(group)
+                        or len(response["filings"]) < PAGE_SIZE
+                    ):
+                        break
+                unresolved = [ticker for ticker in group if ticker not in latest]
+                if len(response["filings"]) == PAGE_SIZE:
+                    # Paging stopped early; look the rest up one by one
+                    for ticker in unresolved:
+                        filings = self.query_api.get_filings(
+                            _query([ticker], form_type)
+                        )
+                        if filings["filings"]:
+                            latest[ticker] = filings["filings"][0]
+                with self._lock:
+                    for ticker in group:
+                        self._store(ticker, form_type, latest.get(ticker), checked_at)
+        self.save()
+
+
+def read_watchlist(path):
+    with open(path) as file:
+        return [
+            line.split("#")[0].strip() for line in file if line.split("#")[0].strip()
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Refresh the latest 10-K/10-Q filing of every ticker in a watchlist"
+    )
+    parser.add_argument("tickers", nargs="*")
+    parser.add_argument("--watchlist", help="File with one ticker per line")
+    parser.add_argument("--forms", nargs="+", default=FORM_TYPES)
+    args = parser.parse_args()
+
+    tickers = list(args.tickers)
+    if args.watchlist:
+        tickers += read_watchlist(args.watchlist)
+    index = FilingIndex()
+    index.refresh(tickers, args.forms)
+    for ticker in sorted(set(ticker.upper() for ticker in tickers)):
+        for form_type in args.forms:
+            filing = index.entries[FilingIndex._key(ticker, form_type)]["filing"]
+            print(ticker, form_type, filing["filedAt"] if filing else "no filing")
+
+
+if __name__ == "__main__":
+    main()
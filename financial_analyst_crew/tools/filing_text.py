@@ -0,0 +1,258 @@
+import re
+from html.parser import HTMLParser
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 150
+
+BLOCK_TAGS = {
+    "p",
+    "div",
+    "br",
+    "tr",
+    "li",
+    "table",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "title",
+}
+CELL_TAGS = {"td", "th"}
+SKIPPED_TAGS = {"script", "style", "head", "ix:header"}
+
+PART_PATTERN = re.compile(r"^part\s+(iv|i{1,3})\b", re.IGNORECASE)
+ITEM_PATTERN = re.compile(r"^item\s*(\d{1,2}[a-c]?)\b", re.IGNORECASE)
+MAX_HEADING_CHARS = 200
+
+# Sections that answer each kind of question, per form type. 10-Q item
+# numbers repeat between Part I and Part II, so they are qualified by part.
+SECTION_TOPICS = {
+    "10-K": [
+        (("risk",), ["Item 1A"]),
+        (("business", "segment", "competition", "employees", "products"), ["Item 1"]),
+        (("legal", "litigation", "lawsuit"), ["Item 3"]),
+        (("dividend", "repurchase", "buyback", "share price"), ["Item 5"]),
+        (
+            (
+                "revenue",
+                "sales",
+                "margin",
+                "outlook",
+                "results",
+                "liquidity",
+                "cash flow",
+                "md&a",
+                "management's discussion",
+                "guidance",
+            ),
+            ["Item 7"],
+        ),
+        (("interest rate", "currency", "market risk", "hedg"), ["Item 7A"]),
+        (
+            (
+                "balance sheet",
+                "income statement",
+                "deferred",
+                "goodwill",
+                "debt",
+                "note ",
+                "financial statements",
+                "earnings per share",
+                "tax",
+            ),
+            ["Item 8"],
+        ),
+        (("executive", "compensation", "director", "officer"), ["Item 10", "Item 11"]),
+    ],
+    "10-Q": [
+        (("risk",), ["Part II Item 1A"]),
+        (("legal", "litigation", "lawsuit"), ["Part II Item 1"]),
+        (
+            (
+                "revenue",
+                "sales",
+                "margin",
+                "outlook",
+                "results",
+                "liquidity",
+                "cash flow",
+                "md&a",
+                "management's discussion",
+                "guidance",
+            ),
+            ["Part I Item 2"],
+        ),
+        (("interest rate", "currency", "market risk", "hedg"), ["Part I Item 3"]),
+        (
+            (
+                "balance sheet",
+                "income statement",
+                "deferred",
+                "goodwill",
+                "debt",
+                "note ",
+                "financial statements",
+                "earnings per share",
+                "tax",
+            ),
+            ["Part I Item 1"],
+        ),
+        (("repurchase", "buyback"), ["Part II Item 2"]),
+    ],
+}
+
+
+class _BlockParser(HTMLParser):
+    # Collects the text of each block-level element; fed incrementally
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self._parts = []
+        self._skip_depth = 0
+
+    def _flush(self):
+        text = " ".join("".join(self._parts).split())
+        self._parts = []
+        if text:
+            self.blocks.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+        elif tag in CELL_TAGS:
+            self._parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._parts.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def iter_blocks(html_chunks):
+    """Yield the text of each paragraph, row or heading as the HTML streams in."""
+    parser = _BlockParser()
+    for html in html_chunks:
+        parser.feed(html)
+        yield from parser.blocks
+        parser.blocks = []
+    parser.close()
+    yield from parser.blocks
+
+
+def iter_sections(html_chunks):
+    """Yield ``(section, block)`` pairs, where section is e.g. ``"Part I Item 2"``.
+
+    A short block starting with "Part ..." or "Item ..." opens a new section;
+    text before the first Item belongs to section ``""``.
+    """
+    part, section = None, ""
+    for block in iter_blocks(html_chunks):
+        if len(block) <= MAX_HEADING_CHARS:
+            part_match = PART_PATTERN.match(block)
+            item_match = ITEM_PATTERN.match(block)
+            if part_match:
+                part = part_match.group(1).upper()
+            elif item_match:
+                item = f"Item {item_match.group(1).upper()}"
+                section = f"Part {part} {item}" if part else item
+        yield section, block
+
+
+def _windows(text, chunk_size, chunk_overlap):
+    step = chunk_size - chunk_overlap
+    for start in range(0, max(len(text) - chunk_overlap, 1), step):
+        yield text[start : start + chunk_size]
+
+
+def in_sections(section, sections):
+    """Whether ``section`` is one of ``sections``; no sections means all of them."""
+    return not sections or any(section.endswith(name) for name in sections)
+
+
+def iter_chunks(
+    html_chunks, sections=None, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+):
+    """Yield ``(text, section)`` chunks of the filing HTML streamed in as ``html_chunks``."""
+    return chunk_sections(
+        iter_sections(html_chunks), sections, chunk_size, chunk_overlap
+    )
+
+
+def chunk_sections(
+    section_blocks, sections=None, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+):
+    """Yield ``(text, section)`` chunks of at most ``chunk_size`` characters.
+
+    Takes the ``(section, block)`` pairs of ``iter_sections``. Blocks are
+    joined with newlines like ``CharacterTextSplitter`` does, and each chunk
+    starts with the trailing blocks of the previous one, up to
+    ``chunk_overlap`` characters. Chunks never span two sections. With
+    ``sections``, only sections ending with one of those names are chunked.
+    """
+    current, current_section, size = [], None, 0
+
+    def flush():
+        return "\n".join(current), current_section
+
+    for section, block in section_blocks:
+        if not in_sections(section, sections):
+            continue
+        if section != current_section:
+            if current:
+                yield flush()
+            current, current_section, size = [], section, 0
+        if len(block) > chunk_size:
+            if current:
+                yield flush()
+            for window in _windows(block, chunk_size, chunk_overlap):
+                yield window, section
+            current, size = [], 0
+            continue
+        if current and size + 1 + len(block) > chunk_size:
+            yield flush()
+            while current and (
+                size > chunk_overlap or size + 1 + len(block) > chunk_size
+            ):
+                current.pop(0)
+                size = len("\n".join(current))
+        current.append(block)
+        size += len(block) + (1 if len(current) > 1 else 0)
+    if current:
+        yield flush()
+
+
+def relevant_sections(ask, form_type):
+    """Section names whose topics the question mentions, to favour when ranking chunks."""
+    ask = ask.lower()
+    sections = []
+    for keywords, names in SECTION_TOPICS.get(form_type, []):
+        if any(keyword in ask for keyword in keywords):
+            sections += [name for name in names if name not in sections]
+    return sections
+
+
+def parse_sections(items):
+    """Turn ``"1A, Part II Item 7"`` into ``["Item 1A", "Part II Item 7"]``."""
+    sections = []
+    for item in items.split(","):
+        part = re.search(r"\bpart\s+(iv|i{1,3})\b", item, re.IGNORECASE)
+        number = re.search(r"(\d{1,2}[a-c]?)\s*$", item, re.IGNORECASE)
+        if number:
+            section = f"Item {number.group(1).upper()}"
+            sections.append(
+                f"Part {part.group(1).upper()} {section}" if part else section
+            )
+    return sections
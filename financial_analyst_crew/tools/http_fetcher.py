@@ -0,0 +1,188 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_CACHE_DIR = os.path.join(".sec_cache", "http")
+SEC_MAX_REQUESTS_PER_SECOND = 10
+DEFAULT_TIMEOUT = (5, 60)
+DEFAULT_POOL_SIZE = 16
+STREAM_CHUNK_CHARS = 64 * 1024
+# Statuses retried with backoff, honouring Retry-After; each retry takes a token
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 1
+MAX_RETRY_AFTER_SECONDS = 60
+
+# The User-Agent comes from SEC_USER_AGENT: the SEC's fair-access policy asks
+# for a declared one with a contact, e.g. "Acme Research admin@acme.com"
+DEFAULT_HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+}
+
+
+class TokenBucket:
+    """Blocks callers so that at most ``rate`` requests per second go out on average."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def is_immutable(url):
+    # Documents under an EDGAR accession folder never change once filed;
+    # directory listings and search pages do
+    path = urlparse(url).path
+    name = path.rsplit("/", 1)[-1]
+    return "/Archives/edgar/data/" in path and "." in name and name != "index.json"
+
+
+class Fetcher:
+    """Shared HTTP client for SEC downloads.
+
+    Keeps a pool of keep-alive connections and a gzip-compressed disk cache
+    keyed by URL. Filing documents are served from the cache without a
+    request. Other pages are revalidated with ETag / Last-Modified. Every
+    request, retries included, waits on a token bucket so all threads
+    together stay within the SEC's fair-access rate. Requests need a declared
+    ``user_agent``, by default from ``SEC_USER_AGENT``; without one, fetching
+    anything not cached raises.
+    """
+
+    def __init__(
+        self,
+        cache_dir=HTTP_CACHE_DIR,
+        rate=SEC_MAX_REQUESTS_PER_SECOND,
+        timeout=DEFAULT_TIMEOUT,
+        pool_size=DEFAULT_POOL_SIZE,
+        headers=None,
+        user_agent=None,
+        backoff=RETRY_BACKOFF_SECONDS,
+    ):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.backoff = backoff
+        self.bucket = TokenBucket(rate, capacity=1)
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        self.user_agent = user_agent or os.environ.get("SEC_USER_AGENT")
+        if self.user_agent:
+            self.session.headers["User-Agent"] = self.user_agent
+        # Retries are made by ``_get``, where they take a token like any request
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + ".gz", base + ".json"
+
+    def _read(self, body_path):
+        with gzip.open(body_path, "rt", encoding="utf-8") as file:
+            return file.read()
+
+    def _write(self, body_path, meta_path, text, meta):
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(body_path + suffix, "wt", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(body_path + suffix, body_path)
+        with open(meta_path + suffix, "w") as file:
+            json.dump(meta, file)
+        os.replace(meta_path + suffix, meta_path)
+
+    def fetch(self, url):
+        body_path, meta_path = self._paths(url)
+        immutable = is_immutable(url)
+        if immutable and os.path.exists(body_path):
+            return self._read(body_path)
+
+        headers = {}
+        if os.path.exists(meta_path) and os.path.exists(body_path):
+            with open(meta_path) as file:
+                meta = json.load(file)
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = self._get(url, headers)
+        if response.status_code == 304:
+            return self._read(body_path)
+        if response.status_code != 200:
+            # SEC answers rate limits and missing User-Agents with an error
+            # page; returning it would get it parsed, embedded and cached
+            response.raise_for_status()
+            raise requests.HTTPError(
+                f"Unexpected status {response.status_code} for url: {url}",
+                response=response,
+            )
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+        self._write(body_path, meta_path, response.text, meta)
+        return response.text
+
+    def _get(self, url, headers):
+        if not self.user_agent:
+            raise RuntimeError(
+                "Set SEC_USER_AGENT to a name and contact email, e.g. "
+                '"Acme Research admin@acme.com"; the SEC blocks undeclared clients'
+            )
+        for attempt in range(MAX_RETRIES + 1):
+            delay = self.backoff * 2**attempt
+            self.bucket.acquire()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == MAX_RETRIES:
+                    raise
+                time.sleep(delay)
+                continue
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = min(int(retry_after), MAX_RETRY_AFTER_SECONDS)
+            time.sleep(delay)
+
+    def iter_text(self, url, chunk_chars=STREAM_CHUNK_CHARS):
+        """Yield the document in slices, streaming it from the disk cache when possible."""
+        body_path, _ = self._paths(url)
+        if not (is_immutable(url) and os.path.exists(body_path)):
+            text = self.fetch(url)
+            if not os.path.exists(body_path):
+                for start in range(0, len(text), chunk_chars):
+                    yield text[start : start + chunk_chars]
+                return
+            del text
+        with gzip.open(body_path, "rt", encoding="utf-8") as file:
+            while chunk := file.read(chunk_chars):
+                yield chunk
@@ -0,0 +1,218 @@
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+import faiss
+import numpy as np
+
+from tools.filing_text import in_sections
+
+KEYWORD_INDEX_FILE = "keywords.json"
+DEFAULT_FETCH_K = 20
+RRF_K = 60
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,'][a-z0-9]+)*")
+STOPWORDS = set(
+    "a an and are as at be by did do does for from has have how in is it its last "
+    "of on or that the their this to was were what when which who will with".split()
+)
+
+
+def tokenize(text):
+    # Figures like "1,234.5" and words like "company's" stay one token
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS
+    ]
+
+
+class KeywordIndex:
+    """BM25 inverted index over the chunks of one filing.
+
+    Document ids are positions in the FAISS index, so keyword and vector
+    results can be fused. Dense retrieval misses exact line items and
+    figures ("deferred revenue", "$4.2 billion"); keywords catch them.
+    """
+
+    def __init__(self, postings, doc_lengths, k1=1.5, b=0.75):
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0
+
+    @classmethod
+    def from_texts(cls, texts, **kwargs):
+        postings = defaultdict(list)
+        doc_lengths = []
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for token, count in Counter(tokens).items():
+                postings[token].append((doc_id, count))
+        return cls(dict(postings), doc_lengths, **kwargs)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, **kwargs):
+        return cls.from_texts(
+            [
+                document(vectorstore, i).page_content
+                for i in range(vectorstore.index.ntotal)
+            ],
+            **kwargs,
+        )
+
+    def save(self, directory):
+        with open(os.path.join(directory, KEYWORD_INDEX_FILE), "w") as file:
+            json.dump(
+                {
+                    "k1": self.k1,
+                    "b": self.b,
+                    "doc_lengths": self.doc_lengths,
+                    "postings": self.postings,
+                },
+                file,
+            )
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, KEYWORD_INDEX_FILE)) as file:
+            data = json.load(file)
+        return cls(data["postings"], data["doc_lengths"], data["k1"], data["b"])
+
+    def search(self, query, k=DEFAULT_FETCH_K, allowed=None):
+        """The ids of the ``k`` best matching chunks, with their BM25 scores.
+
+        With ``allowed``, a set of ids, other chunks are ignored.
+        """
+        scores = defaultdict(float)
+        total = len(self.doc_lengths)
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token, [])
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, count in postings:
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length
+                scores[doc_id] += idf * count * (self.k1 + 1) / (count + self.k1 * norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Merge ranked id lists; ids ranked high in any list come first."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def document(vectorstore, doc_id):
+    return vectorstore.docstore.search(vectorstore.index_to_docstore_id[doc_id])
+
+
+@lru_cache(maxsize=None)
+def load_reranker(model_name=None):
+    """A local cross-encoder named by ``SEC_RERANK_MODEL``, or None.
+
+    Reranking is off unless the variable is set and ``sentence_transformers``
+    is installed.
+    """
+    model_name = model_name or os.environ.get("SEC_RERANK_MODEL")
+    if not model_name:
+        return None
+    try:
+        from sentence_transformers import CrossEncoder
+    except ImportError:
+        return None
+    return CrossEncoder(model_name)
+
+
+class HybridRetriever:
+    """Retrieves filing chunks by fusing vector and keyword rankings.
+
+    The top ``fetch_k`` chunks of each ranking are merged with reciprocal
+    rank fusion. With a ``reranker`` (a cross-encoder with ``predict``), the
+    fused candidates are re-scored against the question before the best
+    ``k`` are returned. With ``sections``, only chunks from those filing
+    sections are searched, so a full filing index can answer a question
+    about e.g. Item 1A alone. ``search`` can instead favour some sections
+    while still searching the whole filing.
+    """
+
+    def __init__(
+        self,
+        vectorstore,
+        keyword_index=None,
+        reranker=None,
+        fetch_k=DEFAULT_FETCH_K,
+        sections=None,
+    ):
+        self.vectorstore = vectorstore
+        self.keyword_index = keyword_index or KeywordIndex.from_vectorstore(vectorstore)
+        self.reranker = reranker
+        self.fetch_k = fetch_k
+        self.allowed = None
+        if sections:
+            allowed = {
+                doc_id
+                for doc_id in range(vectorstore.index.ntotal)
+                if in_sections(
+                    document(vectorstore, doc_id).metadata.get("section", ""), sections
+                )
+            }
+            # A filing without recognisable Items is searched whole
+            self.allowed = allowed or None
+
+    def dense_search(self, query, k):
+        vector = np.array([self.vectorstore._embed_query(query)], dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            vector /= np.linalg.norm(vector, axis=1, keepdims=True)
+        params = None
+        if self.allowed is not None:
+            selector = faiss.IDSelectorBatch(
+                np.array(sorted(self.allowed), dtype=np.int64)
+            )
+            params = faiss.SearchParameters(sel=selector)
+        _, ids = self.vectorstore.index.search(vector, k, params=params)
+        return [int(doc_id) for doc_id in ids[0] if doc_id >= 0]
+
+    def keyword_search(self, query, k):
+        return [
+            doc_id for doc_id, _ in self.keyword_index.search(query, k, self.allowed)
+        ]
+
+    def search(self, query, k=4, mode="hybrid", boost_sections=None):
+        """The ``k`` most relevant chunks; ``mode`` is "hybrid", "dense" or "keyword".
+
+        Chunks from ``boost_sections`` are ranked higher, but answers found in
+        other sections are still returned.
+        """
+        rankings = []
+        if mode in ("hybrid", "dense"):
+            rankings.append(self.dense_search(query, self.fetch_k))
+        if mode in ("hybrid", "keyword"):
+            rankings.append(self.keyword_search(query, self.fetch_k))
+        if boost_sections:
+            # The candidates from those sections count as one more ranking
+            rankings.append(
+                [
+                    doc_id
+                    for doc_id in reciprocal_rank_fusion(rankings)
+                    if in_sections(
+                        document(self.vectorstore, doc_id).metadata.get("section", ""),
+                        boost_sections,
+                    )
+                ]
+            )
+        candidates = reciprocal_rank_fusion(rankings)
+        if self.reranker is None:
+            return [document(self.vectorstore, i) for i in candidates[:k]]
+        docs = [document(self.vectorstore, i) for i in candidates[: self.fetch_k]]
+        scores = self.reranker.predict([(query, doc.page_content) for doc in docs])
+        ranked = sorted(zip(scores, range(len(docs))), reverse=True)
+        return [docs[i] for _, i in ranked[:k]]
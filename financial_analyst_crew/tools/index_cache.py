@@ -0,0 +1,101 @@
+import hashlib
+import os
+import shutil
+import threading
+
+from langchain_community.vectorstores import FAISS
+
+from tools.hybrid_search import KeywordIndex
+
+INDEX_CACHE_DIR = os.path.join(".sec_cache", "indexes")
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+class FilingIndexCache:
+    """On-disk cache of FAISS indexes built from SEC filings.
+
+    Indexes are keyed by the filing URL (which contains the accession number),
+    the embedding model and the chunking settings, so a follow-up question on
+    the same filing loads the saved index instead of downloading, splitting and
+    embedding the filing again. The least recently used indexes are evicted
+    once the cache grows past ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir=INDEX_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(url, model, settings=""):
+        return hashlib.sha256(f"{url}|{model}|{settings}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def __contains__(self, key):
+        return os.path.isdir(self._path(key))
+
+    def get(self, key, embeddings):
+        path = self._path(key)
+        try:
+            vectorstore = FAISS.load_local(
+                path, embeddings, allow_dangerous_deserialization=True
+            )
+        except (FileNotFoundError, RuntimeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        os.utime(path)
+        with self._lock:
+            self.hits += 1
+        return vectorstore
+
+    def get_keyword_index(self, key):
+        try:
+            return KeywordIndex.load(self._path(key))
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, vectorstore, keyword_index=None):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        vectorstore.save_local(tmp_path)
+        if keyword_index is not None:
+            # Saved in the same folder so the two indexes are replaced together
+            keyword_index.save(tmp_path)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Another caller stored the same filing first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_dir() and not entry.name.endswith(".tmp"):
+                entries.append(
+                    (entry.stat().st_mtime, _dir_size(entry.path), entry.path)
+                )
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,282 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from datetime import date, timedelta
+
+from langchain.embeddings import OpenAIEmbeddings
+from langchain_community.vectorstores import FAISS
+
+from tools.embedding_cache import CachedEmbeddings
+from tools.filing_index import FORM_TYPES, read_watchlist
+from tools.filing_text import chunk_sections, iter_sections
+from tools.hybrid_search import KeywordIndex
+from tools.sec_tools import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    corpus_index,
+    embedding_cache,
+    fetcher,
+    filing_index,
+    index_cache,
+    index_key,
+)
+
+QUEUE_SIZE = 8
+# Stages in pipeline order, with their default number of worker threads
+STAGE_WORKERS = {"fetch": 4, "parse": 2, "chunk": 1, "embed": 2, "index": 1}
+_DONE = object()
+
+
+class StageStats:
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.chunks = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, chunks=0, error=False):
+        with self._lock:
+            self.busy_seconds += seconds
+            if error:
+                self.errors += 1
+            else:
+                self.items += 1
+                self.chunks += chunks
+
+    def to_record(self, wall_seconds):
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "filings": self.items,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "filings_per_second": round(self.items / wall_seconds, 3),
+            "chunks_per_second": round(self.chunks / wall_seconds, 1),
+            # Near 1 means the stage's workers never waited: the bottleneck
+            "utilisation": round(self.busy_seconds / (wall_seconds * self.workers), 3),
+        }
+
+
+class IngestPipeline:
+    """Pre-indexes SEC filings so interactive questions only load a warm index.
+
+    Filings flow through bounded queues between five stages, each with its
+    own worker threads: fetch (download into the HTTP cache), parse (HTML to
+    sectioned text), chunk, embed (through the embedding cache) and index
+    (save the FAISS and keyword indexes to the index cache, and with
+    ``corpus`` also add the filing to the corpus index). A full queue blocks
+    the stage feeding it, so a slow stage, usually embedding, throttles the
+    downloads instead of letting parsed filings pile up in memory.
+    """
+
+    def __init__(self, workers=None, queue_size=QUEUE_SIZE, corpus=False):
+        self.workers = {**STAGE_WORKERS, **(workers or {})}
+        self.queue_size = queue_size
+        self.corpus = corpus
+        self.embeddings = CachedEmbeddings(OpenAIEmbeddings(), embedding_cache)
+        self.stats = {
+            name: StageStats(name, count) for name, count in self.workers.items()
+        }
+        self.failures = []
+        self.wall_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def needs_ingest(self, filing):
+        url = filing["linkToFilingDetails"]
+        if index_key(url, self.embeddings.model) not in index_cache:
+            return True
+        return self.corpus and not corpus_index.has_filing(url)
+
+    def fetch(self, job):
+        fetcher.fetch(job["url"])
+        return job
+
+    def parse(self, job):
+        job["blocks"] = list(iter_sections(fetcher.iter_text(job["url"])))
+        return job
+
+    def chunk(self, job):
+        job["chunks"] = list(
+            chunk_sections(job.pop("blocks"), None, CHUNK_SIZE, CHUNK_OVERLAP)
+        )
+        if not job["chunks"]:
+            raise ValueError("No text extracted from the filing")
+        return job
+
+    def embed(self, job):
+        job["vectors"] = self.embeddings.embed_documents(
+            [text for text, _ in job["chunks"]]
+        )
+        return job
+
+    def index(self, job):
+        key = index_key(job["url"], self.embeddings.model)
+        if key not in index_cache:
+            vectorstore = FAISS.from_embeddings(
+                [
+                    (text, vector)
+                    for (text, _), vector in zip(job["chunks"], job["vectors"])
+                ],
+                self.embeddings,
+                metadatas=[{"section": section} for _, section in job["chunks"]],
+            )
+            index_cache.put(
+                key, vectorstore, KeywordIndex.from_vectorstore(vectorstore)
+            )
+        if self.corpus:
+            corpus_index.add_filing(job["filing"], job["chunks"], job["vectors"])
+        return job
+
+    def _work(self, name, inbox, outbox, remaining):
+        step = getattr(self, name)
+        stats = self.stats[name]
+        while True:
+            job = inbox.get()
+            if job is _DONE:
+                # Leave the marker for the other workers of this stage; the
+                # last one to stop passes it downstream
+                inbox.put(_DONE)
+                with self._lock:
+                    remaining[name] -= 1
+                    last = remaining[name] == 0
+                if last and outbox is not None:
+                    outbox.put(_DONE)
+                return
+            started = time.perf_counter()
+            try:
+                job = step(job)
+            except Exception as exc:
+                stats.record(time.perf_counter() - started, error=True)
+                with self._lock:
+                    self.failures.append(
+                        {"url": job["url"], "stage": name, "error": repr(exc)}
+                    )
+                continue
+            stats.record(time.perf_counter() - started, len(job.get("chunks", ())))
+            if outbox is not None:
+                outbox.put(job)
+
+    def run(self, filings):
+        """Ingest ``filings`` (``FilingIndex`` entries) and return per-stage throughput."""
+        names = list(self.workers)
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in names]
+        remaining = dict(self.workers)
+        threads = []
+        for position, name in enumerate(names):
+            outbox = queues[position + 1] if position + 1 < len(names) else None
+            for _ in range(self.workers[name]):
+                thread = threading.Thread(
+                    target=self._work,
+                    args=(name, queues[position], outbox, remaining),
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        started = time.perf_counter()
+        for filing in filings:
+            queues[0].put({"filing": filing, "url": filing["linkToFilingDetails"]})
+        queues[0].put(_DONE)
+        for thread in threads:
+            thread.join()
+        self.wall_seconds = time.perf_counter() - started
+        if self.corpus:
+            corpus_index.flush()
+        return self.report()
+
+    def report(self):
+        wall_seconds = self.wall_seconds or 1e-9
+        return {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "stages": [stats.to_record(wall_seconds) for stats in self.stats.values()],
+            "failures": self.failures,
+        }
+
+
+def resolve_filings(tickers, form_types=FORM_TYPES, years=0):
+    """The latest filing per ticker and form, or with ``years`` every filing since then."""
+    filings = []
+    for form_type in form_types:
+        if not years:
+            latest = filing_index.latest_many(tickers, form_type)
+            filings += [filing for filing in latest.values() if filing]
+            continue
+        filed_from = (date.today() - timedelta(days=365 * years)).isoformat()
+        for ticker in tickers:
+            filings += filing_index.history(ticker, form_type, filed_from)
+    return filings
+
+
+def _stage_workers(values):
+    workers = {}
+    for value in values:
+        name, _, count = value.partition("=")
+        if name not in STAGE_WORKERS or not count.isdigit() or int(count) < 1:
+            raise argparse.ArgumentTypeError(f"Expected STAGE=COUNT, got {value!r}")
+        workers[name] = int(count)
+    return workers
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Download, chunk, embed and index the filings of a watchlist ahead of queries"
+    )
+    parser.add_argument("tickers", nargs="*")
+    parser.add_argument("--watchlist", help="File with one ticker per line")
+    parser.add_argument("--forms", nargs="+", default=FORM_TYPES)
+    parser.add_argument(
+        "--years", type=int, default=0, help="Ingest every filing of the last N years"
+    )
+    parser.add_argument(
+        "--corpus", action="store_true", help="Also add the filings to the corpus index"
+    )
+    parser.add_argument(
+        "--workers",
+        nargs="+",
+        default=[],
+        metavar="STAGE=COUNT",
+        help=f"Worker threads per stage, of {', '.join(STAGE_WORKERS)}",
+    )
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    tickers = list(args.tickers)
+    if args.watchlist:
+        tickers += read_watchlist(args.watchlist)
+    tickers = sorted({ticker.strip().upper() for ticker in tickers if ticker.strip()})
+    pipeline = IngestPipeline(
+        _stage_workers(args.workers), args.queue_size, corpus=args.corpus
+    )
+    filings = resolve_filings(tickers, args.forms, args.years)
+    pending = [filing for filing in filings if pipeline.needs_ingest(filing)]
+    print(f"{len(filings)} filings, {len(filings) - len(pending)} already indexed")
+
+    report = pipeline.run(pending)
+    print(f"\nIngested in {report['wall_seconds']:.1f}s")
+    print(
+        f"{'stage':<7} {'workers':>7} {'filings':>8} {'errors':>7} {'busy s':>9} "
+        f"{'filings/s':>10} {'chunks/s':>9} {'util':>6}"
+    )
+    for stage in report["stages"]:
+        print(
+            f"{stage['stage']:<7} {stage['workers']:>7} {stage['filings']:>8} "
+            f"{stage['errors']:>7} {stage['busy_seconds']:>9.1f} "
+            f"{stage['filings_per_second']:>10.2f} {stage['chunks_per_second']:>9.1f} "
+            f"{stage['utilisation']:>6.2f}"
+        )
+    for failure in report["failures"]:
+        print(f"failed at {failure['stage']}: {failure['url']}: {failure['error']}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,32 @@
-import os
-
-import requests
+import json
+from concurrent.futures import ThreadPoolExecutor
 
 from langchain.tools import tool
-from langchain.text_splitter import CharacterTextSplitter
 from langchain.embeddings import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 
-from sec_api import QueryApi
-from unstructured.partition.html import partition_html
+from tools.corpus_index import CorpusIndex
+from tools.embedding_cache import CachedEmbeddings, EmbeddingCache
+from tools.filing_index import FORM_TYPES, FilingIndex
+from tools.filing_text import iter_chunks, parse_sections, relevant_sections
+from tools.http_fetcher import Fetcher
+from tools.hybrid_search import HybridRetriever, KeywordIndex, load_reranker
+from tools.index_cache import FilingIndexCache
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 150
+BATCH_WORKERS = 8
+
+index_cache = FilingIndexCache()
+embedding_cache = EmbeddingCache()
+fetcher = Fetcher()
+filing_index = FilingIndex()
+corpus_index = CorpusIndex()
+
+
+def index_key(url, model, sections=None):
+    settings = f"{CHUNK_SIZE}/{CHUNK_OVERLAP}/{','.join(sorted(sections or []))}"
+    return FilingIndexCache.key(url, model, settings)
 
 
 class SECTools:
@@ -21,21 +39,18 @@ class SECTools:
         length two, representing the stock ticker you are interested and what
         question you have from it.
                     For example, `AAPL|what was last quarter's revenue`.
+        Optionally add a third part with the Items to search, for
+        example `AAPL|what are the main risks|Part II Item 1A`.
         """
-        stock, ask = data.split("|")
-        queryApi = QueryApi(api_key=os.environ["SEC_API_API_KEY"])
-        query = {
-            "query": {"query_string": {"query": f'ticker:{stock} AND formType:"10-Q"'}},
-            "from": "0",
-            "size": "1",
-            "sort": [{"filedAt": {"order": "desc"}}],
-        }
-
-        fillings = queryApi.get_filings(query)["filings"]
-        if len(fillings) == 0:
+        stock, ask, *items = data.split("|")
+        filling = filing_index.latest(stock, "10-Q")
+        if filling is None:
             return "Sorry, I couldn't find any filling for this stock, check if the ticker is correct."
-        link = fillings[0]["linkToFilingDetails"]
-        answer = SECTools.__embedding_search(link, ask)
+        link = filling["linkToFilingDetails"]
+        sections = parse_sections(items[0]) if items else None
+        answer = SECTools.__embedding_search(
+            link, ask, sections, relevant_sections(ask, "10-Q")
+        )
         return answer
 
     @tool("Search 10-K form")
@@ -47,57 +62,224 @@ class SECTools:
         length two, representing the stock ticker you are interested, what
         question you have from it.
         For example, `AAPL|what was last year's revenue`.
+        Optionally add a third part with the Items to search, for
+        example `AAPL|what are the main risks|1A,7`.
         """
-        stock, ask = data.split("|")
-        queryApi = QueryApi(api_key=os.environ["SEC_API_API_KEY"])
-        query = {
-            "query": {"query_string": {"query": f'ticker:{stock} AND formType:"10-K"'}},
-            "from": "0",
-            "size": "1",
-            "sort": [{"filedAt": {"order": "desc"}}],
-        }
-
-        fillings = queryApi.get_filings(query)["filings"]
-        if len(fillings) == 0:
+        stock, ask, *items = data.split("|")
+        filling = filing_index.latest(stock, "10-K")
+        if filling is None:
             return "Sorry, I couldn't find any filling for this stock, check if the ticker is correct."
-        link = fillings[0]["linkToFilingDetails"]
-        answer = SECTools.__embedding_search(link, ask)
+        link = filling["linkToFilingDetails"]
+        sections = parse_sections(items[0]) if items else None
+        answer = SECTools.__embedding_search(
+            link, ask, sections, relevant_sections(ask, "10-K")
+        )
         return answer
 
-    def __embedding_search(url, ask):
-        text = SECTools.__download_form_html(url)
-        elements = partition_html(text=text)
-        content = "\n".join([str(el) for el in elements])
-        text_splitter = CharacterTextSplitter(
-            separator="\n",
-            chunk_size=1000,
-            chunk_overlap=150,
-            length_function=len,
-            is_separator_regex=False,
+    @tool("Search many SEC filings")
+    def search_filings(data):
+        """
+        Useful to ask questions about the latest 10-K or 10-Q forms of
+        several stocks at once, for example to compare peers.
+        The input to this tool should be a semicolon (;) separated list of
+        queries, each a pipe (|) separated text of the stock ticker, the
+        form type (10-K or 10-Q) and the question.
+        For example, `AAPL|10-K|what was last year's revenue;MSFT|10-K|what was last year's revenue`.
+        The answers are returned as JSON, one entry per query.
+        """
+        queries = [query.split("|") for query in data.split(";") if query.strip()]
+        return json.dumps(SECTools.batch_search(queries), indent=2)
+
+    @tool("Search all indexed SEC filings")
+    def search_corpus(data):
+        """
+        Useful to search every indexed 10-K and 10-Q form, across companies
+        and years, instead of only the latest filing of one stock.
+        The input to this tool should be a pipe (|) separated text with the
+        question, then optionally comma separated stock tickers, the form
+        type, and the first and last period of report (YYYY-MM-DD).
+        Leave a part empty to not filter on it.
+        For example, `how did data center revenue grow|NVDA,AMD|10-K|2019-01-01|`.
+        """
+        ask, *filters = data.split("|")
+        tickers, form_type, period_from, period_to = [
+            value.strip() for value in (filters + [""] * 4)[:4]
+        ]
+        embeddings = CachedEmbeddings(OpenAIEmbeddings(), embedding_cache)
+        hits = corpus_index.search(
+            embeddings.embed_query(ask),
+            k=4,
+            tickers=[ticker for ticker in tickers.split(",") if ticker.strip()],
+            form_types=[form_type.upper()] if form_type else None,
+            period_from=period_from or None,
+            period_to=period_to or None,
+        )
+        if not hits:
+            return "Sorry, no indexed filing matches these filters."
+        return "\n\n".join(
+            f"[{hit['ticker']} {hit['form_type']} {hit['period']} {hit['section']}]\n{hit['text']}"
+            for hit in hits
+        )
+
+    def add_to_corpus(filing):
+        """Chunk, embed and add one filing (a ``FilingIndex`` entry) to the corpus index."""
+        url = filing["linkToFilingDetails"]
+        if corpus_index.has_filing(url):
+            return 0
+        chunks = list(
+            iter_chunks(fetcher.iter_text(url), None, CHUNK_SIZE, CHUNK_OVERLAP)
         )
-        docs = text_splitter.create_documents([content])
-        retriever = FAISS.from_documents(docs, OpenAIEmbeddings()).as_retriever()
-        answers = retriever.get_relevant_documents(ask, top_k=4)
+        embeddings = CachedEmbeddings(OpenAIEmbeddings(), embedding_cache)
+        vectors = embeddings.embed_documents([text for text, _ in chunks])
+        return corpus_index.add_filing(filing, chunks, vectors)
+
+    def batch_search(queries, max_workers=BATCH_WORKERS):
+        """Answer many ``(ticker, form_type, question[, items])`` queries at once.
+
+        Filing links are resolved with one index refresh per form type, each
+        filing is downloaded and indexed once however many queries share it,
+        and the downloads, index builds and searches run on a thread pool.
+        Without items, the whole filing is searched and the sections the
+        question seems to be about, listed in ``boost_sections``, rank higher.
+        Returns one dict per query, in order, with the filing it was answered
+        from and either ``answers`` or an ``error``; a malformed query, such
+        as one missing its question, only gets an ``error`` of its own.
+        """
+        results = [SECTools.__parse_query(query) for query in queries]
+
+        for form_type in {r["form_type"] for r in results if "error" not in r}:
+            tickers = [
+                r["ticker"]
+                for r in results
+                if r["form_type"] == form_type and "error" not in r
+            ]
+            try:
+                filings = filing_index.latest_many(tickers, form_type)
+            except Exception as exc:
+                filings = {ticker: exc for ticker in tickers}
+            for result in results:
+                if result["form_type"] != form_type or "error" in result:
+                    continue
+                filing = filings.get(result["ticker"])
+                if isinstance(filing, Exception):
+                    result["error"] = f"Filing lookup failed: {filing}"
+                elif filing is None:
+                    result["error"] = "No filing found, check if the ticker is correct."
+                else:
+                    result["filed_at"] = filing["filedAt"]
+                    result["url"] = filing["linkToFilingDetails"]
+        pending = [result for result in results if "url" in result]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Download every filing once before the index builds read it
+            urls = list({result["url"] for result in pending})
+            downloads = dict(zip(urls, executor.map(SECTools.__try_fetch, urls)))
+            for result in pending:
+                if downloads[result["url"]] is not None:
+                    result["error"] = f"Download failed: {downloads[result['url']]}"
+            pending = [result for result in pending if "error" not in result]
+
+            builds = {}
+            for result in pending:
+                key = (result["url"], tuple(result["sections"]))
+                if key not in builds:
+                    builds[key] = executor.submit(
+                        SECTools.load_retriever, result["url"], result["sections"]
+                    )
+
+            def answer(result):
+                try:
+                    retriever = builds[
+                        (result["url"], tuple(result["sections"]))
+                    ].result()
+                    docs = retriever.search(
+                        result["question"],
+                        k=4,
+                        boost_sections=result["boost_sections"],
+                    )
+                except Exception as exc:
+                    result["error"] = f"Search failed: {exc}"
+                    return
+                result["answers"] = [
+                    {
+                        "section": doc.metadata.get("section", ""),
+                        "text": doc.page_content,
+                    }
+                    for doc in docs
+                ]
+
+            list(executor.map(answer, pending))
+        return results
+
+    def __parse_query(query):
+        # A malformed query becomes an error result instead of failing the batch
+        try:
+            ticker, form_type, ask, *items = query
+            result = {
+                "ticker": ticker.strip().upper(),
+                "form_type": form_type.strip().upper(),
+                "question": ask.strip(),
+            }
+            if not result["ticker"] or not result["question"]:
+                raise ValueError("ticker and question must not be empty")
+            if result["form_type"] not in FORM_TYPES:
+                raise ValueError(f"form type must be one of {', '.join(FORM_TYPES)}")
+            result["sections"] = parse_sections(items[0]) if items else []
+            result["boost_sections"] = (
+                [] if items else relevant_sections(ask, result["form_type"])
+            )
+        except (TypeError, ValueError) as exc:
+            return {
+                "query": query,
+                "form_type": None,
+                "error": f"Invalid query, expected ticker|form type|question: {exc}",
+            }
+        return result
+
+    def __try_fetch(url):
+        try:
+            fetcher.fetch(url)
+        except Exception as exc:
+            return exc
+
+    def __embedding_search(url, ask, sections=None, boost_sections=None):
+        retriever = SECTools.load_retriever(url, sections)
+        answers = retriever.search(ask, k=4, boost_sections=boost_sections)
         answers = "\n\n".join([a.page_content for a in answers])
         return answers
 
-    def __download_form_html(url):
-        headers = {
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Accept-Language": "en-US,en;q=0.9,pt-BR;q=0.8,pt;q=0.7",
-            "Cache-Control": "max-age=0",
-            "Dnt": "1",
-            "Sec-Ch-Ua": '"Not_A Brand";v="8", "Chromium";v="120"',
-            "Sec-Ch-Ua-Mobile": "?0",
-            "Sec-Ch-Ua-Platform": '"macOS"',
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "none",
-            "Sec-Fetch-User": "?1",
-            "Upgrade-Insecure-Requests": "1",
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        }
-
-        response = requests.get(url, headers=headers)
-        return response.text
+    def load_retriever(url, sections=None):
+        # Only the requested sections are embedded, so each selection is its own index
+        embeddings = CachedEmbeddings(OpenAIEmbeddings(), embedding_cache)
+        key = index_key(url, embeddings.model, sections)
+        vectorstore = index_cache.get(key, embeddings)
+        if vectorstore is not None:
+            keyword_index = index_cache.get_keyword_index(key)
+            return HybridRetriever(vectorstore, keyword_index, load_reranker())
+        if sections:
+            # A full index of the filing, e.g. pre-built by tools.ingest, is
+            # searched restricted to the sections instead
+            full_key = index_key(url, embeddings.model)
+            vectorstore = index_cache.get(full_key, embeddings)
+            if vectorstore is not None:
+                keyword_index = index_cache.get_keyword_index(full_key)
+                return HybridRetriever(
+                    vectorstore, keyword_index, load_reranker(), sections=sections
+                )
+        vectorstore = SECTools.__build_index(url, embeddings, sections)
+        keyword_index = KeywordIndex.from_vectorstore(vectorstore)
+        index_cache.put(key, vectorstore, keyword_index)
+        return HybridRetriever(vectorstore, keyword_index, load_reranker())
+
+    def __build_index(url, embeddings, sections=None):
+        chunks = list(
+            iter_chunks(fetcher.iter_text(url), sections, CHUNK_SIZE, CHUNK_OVERLAP)
+        )
+        if not chunks:
+            # The filing has no recognisable Item headings; search all of it
+            chunks = list(
+                iter_chunks(fetcher.iter_text(url), None, CHUNK_SIZE, CHUNK_OVERLAP)
+            )
+        texts = [text for text, _ in chunks]
+        metadatas = [{"section": section} for _, section in chunks]
+        return FAISS.from_texts(texts, embeddings, metadatas=metadatas)